@@ -0,0 +1,121 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import fixture_index
+from fake_embeddings import fake_embedding
+from fake_faults import FaultPlan
+from fake_weaviate import FakeWeaviateClient
+from legalrag import adjacency as adjacency_module
+from legalrag.adjacency import NEIGHBOR_MAX, build_adjacency, expand_neighbors, get_adjacency
+from legalrag.context_builder import build_context
+from legalrag.rerank import RERANK_TOP_N, rerank
+from legalrag.resilience import SCAN
+from legalrag.retrieval import retrieve
+
+# 🧭 Offline check + micro-benchmark of neighbor expansion (legalrag/adjacency.py).
+# Each case is a question whose answer needs a companion article next to the best hit
+# (the general rule opening its section, or the adjacent article). Compares the reranked
+# context, a wider cut of the same search (rerank top_n + NEIGHBOR_MAX), and the reranked
+# context plus neighbor expansion: is the companion there, and at what context tokens.
+# There is no local index, so the adjacency index is built from the Weaviate stand-in
+# and the expanded articles cost one batched by-id fetch per question. Last, a refresh
+# that comes due under concurrent requests must cost one background scan while every
+# request keeps being served, a Weaviate that fails every call must leave the hits
+# unexpanded instead of failing the question, and a stalled scan must give up at
+# SCAN_DEADLINE.
+#
+#   python bench/bench_adjacency.py
+
+CASES = [
+    ("ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟", "450", "449"),
+    ("ما حكم انقطاع سريان مدة عدم سماع الدعوى إذا أقر المدين؟", "458", "457"),
+    ("هل تجوز الشهادة في إثبات التزام تعاقدي تزيد قيمته على مئة دينار؟", "28", "30"),
+    ("هل يجوز للمستأجر أن يؤجر المأجور لغيره دون موافقة المالك؟", "7", "8"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    fake = FakeWeaviateClient(fixture_index(), 0)
+
+    started = time.perf_counter()
+    adjacency = build_adjacency(fake)
+    print(f"adjacency: {len(adjacency)} articles, built in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    failures = 0
+    tokens = {"reranked": 0, "wider cut": 0, "expanded": 0}
+    found = dict.fromkeys(tokens, 0)
+    lookups = []
+    print(f"{'case':<14} {'reranked':>9} {'wider cut':>10} {'expanded':>9} {'added':>6} {'fetches':>8}")
+    for question, hit, companion in CASES:
+        vector = fake_embedding(question)
+        candidates = retrieve(fake, question, vector, args.candidates, None, "hybrid")
+        contexts = {
+            "reranked": rerank(question, candidates, vector),
+            "wider cut": rerank(question, candidates, vector, top_n=RERANK_TOP_N + NEIGHBOR_MAX),
+        }
+        before = fake.calls.get("fetch_objects", 0)
+        contexts["expanded"] = expand_neighbors(fake, contexts["reranked"])
+        fetches = fake.calls.get("fetch_objects", 0) - before
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            adjacency.expand(contexts["reranked"])
+        lookups.append((time.perf_counter() - started) / args.repeat)
+
+        marks = []
+        for name, articles in contexts.items():
+            numbers = [a.properties["article_number"] for a in articles]
+            ok = hit in numbers and companion in numbers
+            found[name] += ok
+            tokens[name] += build_context(articles)[1]["tokens"]
+            marks.append("ok" if ok else "missing")
+        failures += marks[-1] != "ok" or fetches > 1
+        added = len(contexts["expanded"]) - len(contexts["reranked"])
+        print(f"{f'{hit} + {companion}':<14} {marks[0]:>9} {marks[1]:>10} {marks[2]:>9} {added:>6} {fetches:>8}")
+
+    for name in tokens:
+        print(f"{name:<10} companion found {found[name]}/{len(CASES)}, context tokens {tokens[name]}")
+    print(f"expand: {sum(lookups) / len(lookups) * 1e6:.1f} µs per question")
+
+    adjacency_module._adjacency_due = 0.0  # refresh due now
+    scans = fake.calls["iterator"]
+    with ThreadPoolExecutor(8) as pool:
+        served = list(pool.map(lambda _: get_adjacency(fake), range(32)))
+    while adjacency_module._adjacency_building:
+        time.sleep(0.01)
+    scans = fake.calls["iterator"] - scans
+    ok = scans == 1 and None not in served and get_adjacency(fake) is not adjacency
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} refresh under 32 requests: {scans} scan, "
+          f"{served.count(adjacency)} served the stale index meanwhile")
+
+    failing = FakeWeaviateClient(fixture_index(), 0, FaultPlan(error_rate=1.0))
+    reranked = rerank(CASES[0][0], retrieve(fake, CASES[0][0], fake_embedding(CASES[0][0]), args.candidates, None, "hybrid"))
+    ok = build_adjacency(failing) is None and expand_neighbors(failing, reranked) == reranked
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} Weaviate down: scan and fetch fail, hits returned unexpanded "
+          f"({failing.faults.counts['errors']} failed calls)")
+
+    stalled = FakeWeaviateClient(fixture_index(), 0, FaultPlan(stall_rate=1.0, stall_seconds=3.0))
+    deadline, SCAN.deadline = SCAN.deadline, 0.5
+    SCAN.breaker.success()  # closed again after the outage above
+    started = time.perf_counter()
+    ok = build_adjacency(stalled) is None
+    seconds = time.perf_counter() - started
+    SCAN.deadline = deadline
+    ok = ok and 0.5 <= seconds < 1.5
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} stalled scan: gave up after {seconds:.2f}s (deadline 0.5s, stall 3s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
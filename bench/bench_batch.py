@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import WORKDIR, fixture_index, fresh_engine, start_openai, use_weaviate
+from fake_openai import FakeOpenAIConfig
+from legalrag.batch import read_questions, run_batch
+
+# 📦 Offline throughput benchmark of the batch CLI (legalrag/batch.py).
+# Answers the question corpus once one-at-a-time and once with batched embeddings and
+# a worker pool, against the fake OpenAI server and the Weaviate stand-in, then checks
+# that a restarted run skips everything already written.
+#
+#   python bench/bench_batch.py --repeat 5 --workers 8
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "questions.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", default="app")
+    parser.add_argument("--repeat", type=int, default=3, help="copies of the question corpus (each with its own ids)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.3)
+    parser.add_argument("--chat-ttft", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--weaviate-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.embed_latency, args.chat_ttft, args.token_delay, 60, args.dim)
+    server = start_openai(config)
+    use_weaviate(fixture_index(args.dim), args.weaviate_latency)
+
+    # Every copy gets a suffix so neither the embedding nor the answer cache short-circuits it
+    questions_path = os.path.join(WORKDIR, "questions.jsonl")
+    with open(questions_path, "w", encoding="utf-8") as f:
+        for copy in range(args.repeat):
+            for question in read_questions(QUESTIONS_PATH):
+                row = {"id": f"{copy}-{question['id']}", "question": f"{question['question']} ({copy})"}
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    runs = [("sequential", 1, 1), ("batched", args.workers, 64)]
+    for name, workers, embed_batch in runs:
+        engine = fresh_engine(args.variant)
+        before = dict(config.requests)
+        output = os.path.join(WORKDIR, f"{name}.jsonl")
+        summary = run_batch(engine, read_questions(questions_path), output, workers, embed_batch)
+        requests = {k: config.requests[k] - before[k] for k in before}
+        rate = summary["answered"] / summary["elapsed"] if summary["elapsed"] else 0.0
+        print(f"{name:<11} {summary['answered']:>4} answered  {summary['failed']} failed  "
+              f"{summary['elapsed']:7.2f}s  {rate:6.2f} q/s  upstream={requests}")
+
+    resumed = run_batch(engine, read_questions(questions_path), output, args.workers, 64)
+    print(f"resume      {resumed['skipped']} skipped, {resumed['answered']} answered")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import time
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import fixture_index, fresh_engine, start_openai, use_weaviate
+from fake_openai import FakeOpenAIConfig
+from legalrag import rerank, retrieval
+from legalrag.conversation import Conversation
+
+# 💬 Offline benchmark of multi-turn mode (legalrag/conversation.py).
+# Each conversation is answered twice against the fake OpenAI server (which simulates
+# prompt-prefix caching) and the Weaviate stand-in: once question by question as the
+# apps did before, once as turns of one Conversation. Reports latency and prompt tokens
+# of the opening questions and of the follow-ups separately, and the tokens they bill
+# with cached prompt tokens at CACHED_PRICE of the regular input price.
+#
+#   python bench/bench_conversation.py --variant app-test-enhancing-query
+#
+# Fixture articles are short; their text is repeated up to --article-chars so prompts
+# have the size of real statutes (prefix caching only starts at 1024 tokens). --mirror
+# serves retrieval from the local index instead of the Weaviate stand-in.
+
+CACHED_PRICE = 0.25  # gpt-4.1 bills cached input tokens at a quarter of the price
+
+CONVERSATIONS = [
+    [
+        "ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟",
+        "ومتى يبدأ سريان هذه المدة؟",
+        "وهل ينقطع التقادم إذا أقر المدين بالحق؟",
+    ],
+    [
+        "هل يجوز للمستأجر أن يؤجر المأجور لغيره دون موافقة المالك؟",
+        "وماذا لو أخلّ المستأجر بشروط العقد؟",
+        "وهل يحق للمالك أن يطلب الإخلاء في هذه الحالة؟",
+    ],
+    [
+        "هل تجوز الشهادة في إثبات التزام تعاقدي تزيد قيمته على مئة دينار؟",
+        "وماذا لو وجد مبدأ ثبوت بالكتابة؟",
+    ],
+]
+
+
+def _lengthened(properties, chars):
+    text = properties["text"]
+    while len(text) < chars:
+        text = f"{text}\n{properties['text']}"
+    return {**properties, "text": text}
+
+
+def _run(engine, config, conversation_factory):
+    samples = {"first": [], "follow-up": []}
+    for questions in CONVERSATIONS:
+        conversation = conversation_factory()
+        for turn, question in enumerate(questions):
+            before = (config.prompt_tokens, config.cached_tokens)
+            started = time.perf_counter()
+            engine.answer(question, conversation=conversation)
+            seconds = time.perf_counter() - started
+            tokens = (config.prompt_tokens - before[0], config.cached_tokens - before[1])
+            samples["follow-up" if turn else "first"].append((seconds, *tokens))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", default="app")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--article-chars", type=int, default=900)
+    parser.add_argument("--embed-latency", type=float, default=0.3)
+    parser.add_argument("--chat-ttft", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--weaviate-latency", type=float, default=0.05)
+    parser.add_argument("--mirror", action="store_true")
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.embed_latency, args.chat_ttft, args.token_delay, 60, args.dim)
+    server = start_openai(config)
+    index = fixture_index(args.dim, lambda properties: _lengthened(properties, args.article_chars))
+    use_weaviate(index, args.weaviate_latency)
+    if args.mirror:
+        retrieval.get_local_index = rerank.get_local_index = lambda: index
+
+    print(f"variant={args.variant}, {sum(map(len, CONVERSATIONS))} questions in {len(CONVERSATIONS)} conversations"
+          + (" (local mirror)" if args.mirror else ""))
+    print(f"{'mode':<13} {'turns':<10} {'n':>3} {'mean s':>7} {'prompt tok':>11} {'uncached tok':>13} {'billed tok':>11}")
+    for mode, factory in (("one-by-one", lambda: None), ("conversation", Conversation)):
+        engine = fresh_engine(args.variant)
+        config.recent_prompts.clear()
+        engine.embed_query("تهيئة الاتصال")  # connection setup is not part of either mode
+        for turns, rows in _run(engine, config, factory).items():
+            seconds, prompt, cached = (sum(column) / len(rows) for column in zip(*rows))
+            print(f"{mode:<13} {turns:<10} {len(rows):>3} {seconds:7.2f} {prompt:11.0f} {prompt - cached:13.0f} {prompt - cached + CACHED_PRICE * cached:11.0f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
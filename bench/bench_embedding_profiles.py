@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_embeddings import load_fixture_articles
+from legalrag.arabic_normalize import canonical_key
+from legalrag.embeddings import shorten
+from legalrag.local_index import LocalIndex, build_index
+
+# 📐 Recall-vs-latency benchmark of embedding profiles (dimensions × quantization) on the
+# local index. Ground truth is the exact float32 top-k at full size; every profile is
+# built from the same vectors shortened the way text-embedding-3 allows (truncate +
+# renormalize), so no re-embedding is needed to compare them.
+#
+#   python bench/bench_embedding_profiles.py                      # fixture corpus + synthetic articles
+#   python bench/bench_embedding_profiles.py --index .cache/local_index --live   # synced corpus, real query embeddings
+#
+# --live embeds the questions with text-embedding-3-large (needs OPENAI_API_KEY).
+# Offline, vectors come from profile_embedding(): like the model, its leading 256 / 512 /
+# 1024 dimensions are usable embeddings on their own, and it is dense (randomly
+# rotated), so sign bits and int8 codes behave as they do on real vectors.
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "questions.jsonl")
+FULL_DIM = 3072
+SEGMENTS = (256, 256, 512, 2048)  # nested prefixes of 256 / 512 / 1024 / 3072 dimensions
+_rng = np.random.default_rng(7)
+_rotations = [np.linalg.qr(_rng.standard_normal((n, n)).astype(np.float32))[0] for n in SEGMENTS]
+
+
+def profile_embedding(text):
+    padded = f" {canonical_key(text)} "
+    digests = [hashlib.blake2b(padded[i:i + 3].encode("utf-8"), digest_size=8).digest() for i in range(len(padded) - 2)]
+    buckets = np.array([int.from_bytes(d[:4], "little") for d in digests], dtype=np.int64)
+    signs = np.array([1.0 if d[4] & 1 else -1.0 for d in digests], dtype=np.float32)
+    parts = []
+    for size, rotation in zip(SEGMENTS, _rotations):
+        segment = np.zeros(size, dtype=np.float32)
+        np.add.at(segment, buckets % size, signs)
+        parts.append(rotation @ (segment / (np.linalg.norm(segment) or 1.0)))
+    vector = np.concatenate(parts)
+    return vector / np.linalg.norm(vector)
+
+
+def _corpus(args):
+    if args.index:
+        index = LocalIndex.load(args.index)
+        return [(a["uuid"], a["properties"], np.asarray(index.vectors[i]), 0.0) for i, a in enumerate(index.articles)]
+
+    records = [
+        (uuid, properties, profile_embedding(properties["text"]), 0.0)
+        for uuid, properties in load_fixture_articles()
+    ]
+    # Synthetic articles stitched from fixture vocabulary, so the top-k is contested as in a large corpus
+    rng = np.random.default_rng(11)
+    words = " ".join(properties["text"] for _, properties in load_fixture_articles()).split()
+    for i in range(args.size - len(records)):
+        text = " ".join(rng.choice(words, size=int(rng.integers(15, 40))))
+        properties = {"law_title": "synthetic", "article_number": f"s{i}", "article_title": "", "text": text}
+        records.append((f"synthetic-{i}", properties, profile_embedding(text), 0.0))
+    return records
+
+
+def _queries(args):
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    if not args.live:
+        return [profile_embedding(q) for q in questions]
+
+    from dotenv import load_dotenv
+    import openai
+
+    load_dotenv()
+    response = openai.OpenAI().embeddings.create(input=questions, model="text-embedding-3-large")
+    return [np.asarray(item.embedding, dtype=np.float32) for item in response.data]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", help="benchmark an existing local index directory instead of the fixture corpus")
+    parser.add_argument("--live", action="store_true", help="embed the questions with the real OpenAI API")
+    parser.add_argument("--size", type=int, default=20000, help="synthetic corpus size (fixture mode)")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3072, 1024, 512, 256])
+    parser.add_argument("--quantizations", nargs="+", default=["none", "int8", "binary"])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = _corpus(args)
+    queries = _queries(args)
+    full_dim = len(records[0][2])
+
+    with tempfile.TemporaryDirectory() as workdir:
+        truth_index = build_index(records, os.path.join(workdir, "truth"), dimensions=None, quantization="none")
+        truth = [{str(a.uuid) for a in truth_index.search(q, args.limit)} for q in queries]
+
+        print(f"{len(records)} articles, {len(queries)} questions, recall@{args.limit} vs float32 × {full_dim}")
+        print(f"{'dims':>5} {'quant':<7} {'recall':>7} {'ms/query':>9} {'index MB':>9} {'vs full':>8}")
+        baseline = None
+        for dimensions in args.dimensions:
+            if dimensions > full_dim:
+                continue
+            for quantization in args.quantizations:
+                path = os.path.join(workdir, f"{dimensions}-{quantization}")
+                index = build_index(records, path, dimensions=dimensions, quantization=quantization)
+                shortened = [shorten(q, dimensions) for q in queries]
+
+                hits = 0
+                for q, expected in zip(shortened, truth):
+                    hits += len({str(a.uuid) for a in index.search(q, args.limit)} & expected)
+                recall = hits / sum(len(t) for t in truth)
+
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    for q in shortened:
+                        index.search(q, args.limit)
+                ms = (time.perf_counter() - started) / (args.repeat * len(shortened)) * 1000
+
+                megabytes = index.memory_bytes() / 1e6
+                baseline = baseline or megabytes
+                print(f"{dimensions:>5} {quantization:<7} {recall:7.3f} {ms:9.2f} {megabytes:9.1f} {baseline / megabytes:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legalrag.arabic_normalize import canonical_key, normalize_arabic
+
+# ⏱️ Micro-benchmark for the query normalizer.
+# Run with: python bench/bench_normalize.py
+
+QUESTIONS = [
+    "ما هي مدة التقادم في الدعاوى المدنية؟",
+    "مَا هِيَ مُـــدَّةُ التَّقَادُمِ فِي الدَّعَاوَى الْمَدَنِيَّةِ؟",
+    "ما التعديل الذي جرى على المادة ٨؟",
+    "هل الشهادة وحدها تكفي لإثبات حق مالي كبير؟",
+    "إذا أخلّ المستأجر بشروط عقد الإيجار   فهل يحق للمؤجر فسخ العقد؟",
+]
+
+
+def main(number=20000):
+    for name, fn in (("normalize_arabic", normalize_arabic), ("canonical_key", canonical_key)):
+        total = timeit.timeit(lambda: [fn(q) for q in QUESTIONS], number=number)
+        per_query_us = total / (number * len(QUESTIONS)) * 1e6
+        print(f"{name:<17} {per_query_us:6.2f} µs/query")
+
+    keys = {canonical_key(q) for q in QUESTIONS[:2]}
+    print(f"placeholder variants collapse to {len(keys)} key(s)")
+
+
+if __name__ == "__main__":
+    main()
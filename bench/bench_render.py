@@ -0,0 +1,55 @@
+import os
+import re
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_embeddings import load_fixture_articles
+from legalrag.rendering import ARTICLE_CARDS, clean_article_body, render_articles
+
+# 🧱 Micro-benchmark of the retrieved-articles expander (legalrag/rendering.py).
+# "inline" is what the apps used to do per rerun: an f-string regex compiled per article
+# and one st.markdown call per article; "cached" is render_articles() with a warm cache.
+# Run with: python bench/bench_render.py
+
+
+def _inline(articles):
+    calls = []
+    for obj in articles:
+        law_title = obj.properties.get("law_title", "قانون غير معروف")
+        article_number = obj.properties.get("article_number", "")
+        article_title = obj.properties.get("article_title", "")
+        article_body = obj.properties.get("text", "")
+        cleaned_body = re.sub(rf"^المادة\s+{article_number}\s*", "", article_body).strip()
+        calls.append(
+            f"<div style='direction: rtl; text-align: right; background-color: #012348; border-radius: 8px; "
+            f"padding: 8px; margin-bottom: 10px; color: #fff;'>"
+            f"<strong>{law_title} - المادة {article_number}: {article_title}</strong><br><br>{cleaned_body.replace(chr(10), '<br>')}</div>"
+        )
+    return calls
+
+
+def main(number=2000):
+    fixtures = [SimpleNamespace(uuid=uuid, properties=properties) for uuid, properties in load_fixture_articles()]
+    style = "app-test-enhancing-query"
+
+    # Same markup as before, now in one block
+    assert render_articles(fixtures, style) == "\n".join(_inline(fixtures))
+    # "المادة 450" is not the header of article 45
+    assert clean_article_body("المادة 450 تنص على", "45") == "المادة 450 تنص على"
+    assert clean_article_body("المادة 45\nنص", "45") == "نص"
+    assert set(ARTICLE_CARDS) == {"app", "app2", "app-test-enhancing-query"}
+
+    print(f"{'articles':>8} {'inline µs':>10} {'cached µs':>10} {'markdown calls':>15}")
+    for size in (6, 15, 50):
+        articles = (fixtures * (size // len(fixtures) + 1))[:size]
+        inline = timeit.timeit(lambda: _inline(articles), number=number) / number * 1e6
+        render_articles(articles, style)
+        cached = timeit.timeit(lambda: render_articles(articles, style), number=number) / number * 1e6
+        print(f"{size:>8} {inline:10.1f} {cached:10.1f} {size:>7} → 1")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The index location is read when legalrag is first imported
+WORKDIR = tempfile.mkdtemp()
+os.environ["LOCAL_INDEX_PATH"] = os.path.join(WORKDIR, "index")
+
+from fake_embeddings import fake_embedding, load_fixture_articles
+from fake_weaviate import FakeWeaviateClient
+from legalrag import metrics
+from legalrag import rerank as rerank_module
+from legalrag.context_builder import build_context
+from legalrag.local_index import build_index
+from legalrag.rerank import DEPTH_MAX, DEPTH_MIN, RERANK_TOP_N, RERANKER, choose_depth, rerank, rerank_adaptive
+from legalrag.retrieval import COLLECTION, hybrid_query_kwargs, local_hybrid_search
+
+# 🏅 Offline check + micro-benchmark of the reranking stage (legalrag/rerank.py).
+# Retrieves 15 hybrid candidates from a local index over the fixture corpus, reranks
+# them down to RERANK_TOP_N, and reports where the expected article lands, how many
+# context tokens reach the LLM before and after, and the reranking latency. Then compares
+# the fixed cut with the adaptive depth (RETRIEVAL_DEPTH=adaptive): articles kept, why
+# the cut happened, and whether the expected article survived. Last, the adaptive cut over
+# remote hybrid results (Weaviate stand-in, no mirror), scored from the vectors they carry.
+# Questions whose article is well ahead of the rest (EASY) must be cut below the maximum
+# in both adaptive runs. Synthetic inputs check choose_depth(), the per-source score
+# normalization, and build_context() over empty article texts on their own.
+#
+#   python bench/bench_rerank.py
+#   RERANKER=cross-encoder python bench/bench_rerank.py   # needs sentence-transformers
+
+CASES = [
+    ("ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟", "450"),
+    ("متى يبدأ سريان المدة المقررة لعدم سماع الدعوى؟", "455"),
+    ("هل تجوز الشهادة في إثبات التزام تعاقدي تزيد قيمته على مئة دينار؟", "28"),
+    ("هل يجوز للمستأجر أن يؤجر المأجور لغيره دون موافقة المالك؟", "7"),
+    ("ماذا تنص المادة 8 من قانون المالكين والمستأجرين؟", "8"),
+    ("ما أحكام مرور الزمن على الدعوى من حيث المدة وبدء السريان والوقف والانقطاع؟", "458"),
+]
+EASY = {"450", "28", "7"}
+
+
+# Why the last rerank_adaptive() call cut where it did ("rerank_depth.<reason>" values)
+def _depth_reason(before):
+    return next(name.split(".")[1] for name, s in metrics.value_snapshot().items()
+                if s["count"] > before.get(name, {"count": 0})["count"])
+
+
+# An easy question (top hit well ahead in raw score) is cut at DEPTH_MIN; a flat one is not
+def _check_choose_depth():
+    easy = choose_depth(np.array([0.8, 0.45, 0.42, 0.41, 0.4, 0.4]), 6)
+    flat = choose_depth(np.array([0.33, 0.32, 0.31, 0.31, 0.3, 0.29]), 6)
+    ok = easy[:2] == (max(1, DEPTH_MIN), "gap") and flat[:2] == (6, "max")
+    print(f"{'ok  ' if ok else 'FAIL'} choose_depth: easy → {easy[0]} ({easy[1]}), flat → {flat[0]} ({flat[1]})")
+    return not ok
+
+
+# near_vector hits (cosine) and fused-score hits share the ranking scale only after each
+# source is normalized on its own: the best hit of each source ranks first within it
+def _check_mixed_sources():
+    hits = [SimpleNamespace(uuid=f"mixed-{i}", vector=None, metadata=SimpleNamespace(distance=distance, score=score))
+            for i, (distance, score) in enumerate([(0.2, None), (0.4, None), (None, 0.016), (None, 0.01)])]
+    cosine, ranking = rerank_module._semantic_scores(hits, [1.0, 0.0])
+    ok = np.allclose(ranking, [1, 0, 1, 0]) and np.allclose(cosine[:2], [0.8, 0.6]) and np.isnan(cosine[2:]).all()
+    print(f"{'ok  ' if ok else 'FAIL'} mixed sources: ranking {np.round(ranking, 2).tolist()}")
+    return not ok
+
+
+# An article with an empty text is neither dropped as a duplicate nor hides the others
+def _check_empty_text():
+    def article(number, text):
+        return SimpleNamespace(properties={"law_title": "القانون المدني", "article_number": number,
+                                           "article_title": "", "text": text})
+    _, report = build_context([article("1", ""), article("2", "نص المادة الثانية"), article("3", "")])
+    ok = report["included"] == 3 and report["duplicates"] == 0
+    print(f"{'ok  ' if ok else 'FAIL'} empty texts: {report['included']} included, {report['duplicates']} duplicates")
+    return not ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        index = build_index(
+            [(uuid, properties, fake_embedding(properties["text"]), 0.0) for uuid, properties in load_fixture_articles()],
+            os.environ["LOCAL_INDEX_PATH"],
+        )
+
+        failures = _check_empty_text()
+        failures += _check_choose_depth() + _check_mixed_sources() if RERANKER == "lexical" else 0
+        timings = []
+        tokens_before = tokens_after = 0
+        print(f"reranker={RERANKER} top_n={RERANK_TOP_N} candidates={args.candidates}")
+        for question, expected in CASES:
+            vector = fake_embedding(question)
+            candidates = local_hybrid_search(question, vector, args.candidates)
+            kept = rerank(question, candidates, vector)
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                rerank(question, candidates, vector)
+            timings.append((time.perf_counter() - started) / args.repeat)
+
+            before = [c.properties["article_number"] for c in candidates]
+            after = [c.properties["article_number"] for c in kept]
+            ok = expected in after
+            failures += not ok
+            tokens_before += build_context(candidates)[1]["tokens"]
+            tokens_after += build_context(kept)[1]["tokens"]
+            rank_before = before.index(expected) + 1 if expected in before else None
+            rank_after = after.index(expected) + 1 if ok else None
+            print(f"{'ok  ' if ok else 'FAIL'} المادة {expected}: rank {rank_before} → {rank_after} of {len(after)}")
+
+        print(f"context tokens: {tokens_before} → {tokens_after} ({tokens_after / tokens_before:.0%})")
+        print(f"rerank: {sum(timings) / len(timings) * 1e6:.0f} µs per question")
+
+        print(f"\nadaptive depth (fixed cut: {RERANK_TOP_N}, max after expansion: {DEPTH_MAX})")
+        tokens_adaptive = 0
+        for question, expected in CASES:
+            vector = fake_embedding(question)
+            candidates = local_hybrid_search(question, vector, args.candidates)
+            before = metrics.value_snapshot()
+            kept, expand = rerank_adaptive(question, candidates, vector)
+            reason = _depth_reason(before)
+            if expand:
+                known = {str(c.uuid) for c in candidates}
+                deeper = local_hybrid_search(question, vector, 2 * args.candidates)
+                kept = rerank_adaptive(question, candidates + [c for c in deeper if str(c.uuid) not in known], vector, DEPTH_MAX)[0]
+            after = [c.properties["article_number"] for c in kept]
+            ok = expected in after and (expected not in EASY or reason != "max")
+            failures += not ok
+            tokens_adaptive += build_context(kept)[1]["tokens"]
+            print(f"{'ok  ' if ok else 'FAIL'} المادة {expected}: {len(kept)} articles ({reason}{', expanded' if expand else ''})")
+        print(f"context tokens: fixed {tokens_after} → adaptive {tokens_adaptive} ({tokens_adaptive / tokens_after:.0%})")
+
+        print("\nadaptive depth over remote hybrid results (no local mirror)")
+        query = FakeWeaviateClient(index, latency=0).collections.get(COLLECTION).query
+        rerank_module.get_local_index = lambda: None
+        for question, expected in CASES:
+            vector = fake_embedding(question)
+            candidates = query.hybrid(**hybrid_query_kwargs(question, vector, args.candidates)).objects
+            before = metrics.value_snapshot()
+            kept = rerank_adaptive(question, candidates, vector)[0]
+            reason = _depth_reason(before)
+            after = [c.properties["article_number"] for c in kept]
+            ok = expected in after and (expected not in EASY or reason != "max")
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} المادة {expected}: {len(kept)} articles ({reason})")
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import fixture_index, fresh_engine, start_openai, use_weaviate
+from fake_faults import FaultPlan
+from fake_openai import FakeOpenAIConfig
+from legalrag import resilience
+from legalrag.resilience import is_degraded
+
+# 🛡️ Offline fault-injection benchmark of the upstream policy (legalrag/resilience.py).
+# Unique questions are answered by --workers concurrent sessions against the fake OpenAI
+# server and the Weaviate stand-in while they stall or fail on purpose, once with the
+# policy stripped down (single attempt, no hedging, breaker never opens) and once as
+# configured. Reports answer latency, how questions ended (answered / retrieval-only /
+# error) and the upstream requests the run cost.
+#
+#   python bench/bench_resilience.py --questions 40
+
+QUESTIONS = [
+    "ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟",
+    "متى يبدأ سريان المدة المقررة لعدم سماع الدعوى؟",
+    "هل تجوز الشهادة في إثبات التزام تعاقدي تزيد قيمته على مئة دينار؟",
+    "هل يجوز للمستأجر أن يؤجر المأجور لغيره دون موافقة المالك؟",
+]
+
+# scenario → FaultPlan settings for (embeddings, chat, Weaviate)
+SCENARIOS = {
+    "slow tail": (dict(stall_rate=0.1, stall_seconds=3), {}, dict(stall_rate=0.1, stall_seconds=3)),
+    "rate limited": (dict(error_rate=0.1, status=429, retry_after=0.2), dict(error_rate=0.3, status=429, retry_after=0.2), {}),
+    "flaky search": ({}, {}, dict(error_rate=0.2)),
+    "chat outage": ({}, dict(error_rate=1.0, status=503), {}),
+}
+
+
+def _configure(resilient):
+    for upstream in (resilience.EMBED, resilience.SEARCH, resilience.REPHRASE, resilience.CHAT):
+        upstream.retries = resilience.UPSTREAM_RETRIES if resilient else 0
+        upstream.breaker = resilience.CircuitBreaker() if resilient else resilience.CircuitBreaker(failures=float("inf"))
+    resilience.EMBED.hedge_after = resilience.HEDGE_EMBED_AFTER if resilient else 0
+    resilience.SEARCH.hedge_after = resilience.HEDGE_SEARCH_AFTER if resilient else 0
+
+
+def _ask(engine, question):
+    started = time.perf_counter()
+    try:
+        answer = engine.answer(question)[0]
+        outcome = "retrieval-only" if is_degraded(answer) else "answered"
+    except Exception:
+        outcome = "error"
+    return time.perf_counter() - started, outcome
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(0.05, 0.3, 0.002, 30, args.dim)
+    server = start_openai(config)
+    index = fixture_index(args.dim)
+
+    print(f"{args.questions} questions, {args.workers} concurrent sessions")
+    print(f"{'scenario':<13} {'policy':<10} {'p50 s':>6} {'p95 s':>6} {'max s':>6} "
+          f"{'answered':>9} {'retr-only':>10} {'error':>6} {'embed':>6} {'chat':>5} {'search':>7}")
+    run = 0
+    for scenario, (embed_faults, chat_faults, search_faults) in SCENARIOS.items():
+        for resilient in (False, True):
+            run += 1
+            _configure(resilient)
+            config.faults = {"embeddings": FaultPlan(**embed_faults), "chat": FaultPlan(**chat_faults)}
+            fake = use_weaviate(index, 0.03, FaultPlan(**search_faults))
+            engine = fresh_engine("app")
+
+            before = dict(config.requests)
+            questions = [f"{QUESTIONS[i % len(QUESTIONS)]} ({run}.{i})" for i in range(args.questions)]
+            with ThreadPoolExecutor(args.workers) as pool:
+                results = list(pool.map(lambda q: _ask(engine, q), questions))
+            seconds = [s for s, _ in results]
+            outcomes = [o for _, o in results]
+            requests = {k: config.requests[k] - before[k] for k in before}
+            print(f"{scenario:<13} {'resilient' if resilient else 'none':<10} {_percentile(seconds, 0.5):6.2f} "
+                  f"{_percentile(seconds, 0.95):6.2f} {max(seconds):6.2f} {outcomes.count('answered'):>9} "
+                  f"{outcomes.count('retrieval-only'):>10} {outcomes.count('error'):>6} "
+                  f"{requests['embeddings']:>6} {requests['chat']:>5} {sum(fake.calls.values()):>7}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import SETTINGS, fixture_index, start_openai, use_async_weaviate
+from fake_openai import FakeOpenAIConfig
+
+# 🌐 Offline load test of the async HTTP API (legalrag/server.py).
+# Runs the server in-process against the fake OpenAI server and an async Weaviate
+# stand-in, then fires the question corpus at /v1/ask with increasing client
+# concurrency, and measures time-to-first-delta on /v1/ask/stream. Last, streams whose
+# client is gone before the response starts must give their admission slot back.
+#
+#   python bench/bench_server.py --concurrency 1 16 64
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "questions.jsonl")
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+async def _load(http, base, questions, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(question):
+        async with slots:
+            started = time.perf_counter()
+            response = await http.post(f"{base}/v1/ask", json={"question": question})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return time.perf_counter() - started, latencies, statuses
+
+
+async def _first_delta(http, base, question):
+    started = time.perf_counter()
+    async with http.stream("POST", f"{base}/v1/ask/stream", json={"question": question}) as response:
+        first = None
+        events = 0
+        async for line in response.aiter_lines():
+            if line.startswith("event: delta"):
+                events += 1
+                if first is None:
+                    first = time.perf_counter() - started
+    return first, time.perf_counter() - started, events
+
+
+# Drives the ASGI app directly with a client that disconnects as the headers go out, so
+# the event stream is never iterated
+async def _abandoned_stream(app, question):
+    body = json.dumps({"question": question}).encode("utf-8")
+    scope = {"type": "http", "method": "POST", "path": "/v1/ask/stream", "raw_path": b"/v1/ask/stream",
+             "query_string": b"", "headers": [(b"content-type", b"application/json")],
+             "http_version": "1.1", "scheme": "http", "server": ("127.0.0.1", 0), "client": ("127.0.0.1", 0),
+             "root_path": "", "app": app}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("client disconnected")
+
+    try:
+        await app(scope, receive, send)
+    except OSError:
+        pass
+
+
+async def run(args):
+    import httpx
+    import uvicorn
+
+    from legalrag.server import create_app
+
+    app = create_app(SETTINGS)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    base = f"http://127.0.0.1:{args.port}"
+
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        corpus = [json.loads(line)["question"] for line in f if line.strip()]
+
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 8)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+        print(f"{'clients':>7} {'q/s':>7} {'p50 s':>7} {'p95 s':>7}  status")
+        for round_number, concurrency in enumerate(args.concurrency):
+            # Fresh suffix per round so the answer and embedding caches do not short-circuit it
+            questions = [f"{q} ({round_number}-{i})" for i in range(args.repeat) for q in corpus]
+            elapsed, latencies, statuses = await _load(http, base, questions, concurrency)
+            print(f"{concurrency:>7} {len(questions) / elapsed:7.2f} {_percentile(latencies, 50):7.3f} "
+                  f"{_percentile(latencies, 95):7.3f}  {statuses}")
+
+        first, total, events = await _first_delta(http, base, corpus[0] + " (stream)")
+        print(f"stream: first delta {first:.3f}s, complete {total:.3f}s, {events} delta events")
+
+        for i in range(3):
+            await _abandoned_stream(app, f"{corpus[0]} (gone {i})")
+        in_flight = (await http.get(f"{base}/healthz")).json()["in_flight"]
+        print(f"{'ok  ' if in_flight == 0 else 'FAIL'} 3 streams abandoned before the response started: {in_flight} slots held")
+
+    server.should_exit = True
+    await serving
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--repeat", type=int, default=2, help="copies of the question corpus per round")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.3)
+    parser.add_argument("--chat-ttft", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--weaviate-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.embed_latency, args.chat_ttft, args.token_delay, 80, args.dim)
+    fake_openai = start_openai(config)
+    use_async_weaviate(fixture_index(args.dim), args.weaviate_latency)
+    asyncio.run(run(args))
+
+    fake_openai.shutdown()
+    print(f"upstream requests: {config.requests}")
+
+
+if __name__ == "__main__":
+    main()
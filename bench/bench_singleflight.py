@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import sys
+import threading
+import time
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import SETTINGS, fixture_index, fresh_caches, fresh_engine, start_openai, use_async_weaviate, use_weaviate
+from fake_openai import FakeOpenAIConfig
+from legalrag import clients, metrics, pipeline
+from legalrag.async_pipeline import AsyncRagEngine, Upstreams
+from legalrag.singleflight import AsyncSingleFlight, SingleFlight
+
+# 🛬 Offline burst benchmark of request coalescing (legalrag/singleflight.py).
+# --burst sessions submit the same question at the same moment, once with single-flight
+# disabled and once enabled, on the threaded engine (Streamlit / batch) and on the async
+# engine (HTTP API), answering both in one piece and streamed. Reports wall time and the
+# upstream requests the burst cost, and checks every waiter got the full answer. Last, a
+# burst of embed_query() calls on one new text: one embedding request, and the callers that
+# joined the flight must not be counted as embed_query cache hits.
+#
+#   python bench/bench_singleflight.py --burst 32
+
+QUESTION = "ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟"
+
+
+def _threaded(question, burst, stream):
+    engine = fresh_engine("app")
+    start = threading.Barrier(burst)
+    answers = []
+
+    def session():
+        start.wait()
+        if not stream:
+            answers.append(engine.answer(question)[0])
+            return
+        articles = engine.retrieve_articles(question)
+        answers.append("".join(engine.generate_answer(question, articles, stream=True)).strip())
+
+    threads = [threading.Thread(target=session) for _ in range(burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return answers
+
+
+async def _async(weaviate, question, burst, stream, enabled):
+    upstreams = Upstreams(SETTINGS)
+    upstreams.flights = AsyncSingleFlight(enabled)
+    upstreams.openai = clients.make_async_openai_client(SETTINGS.openai_api_key)
+    upstreams.weaviate = weaviate
+    engine = fresh_caches(AsyncRagEngine(upstreams, "app"))
+
+    async def session():
+        if not stream:
+            return (await engine.answer(question))[0]
+        articles = await engine.retrieve_articles(question)
+        return "".join([delta async for delta in engine.stream_answer(question, articles)]).strip()
+
+    try:
+        return await asyncio.gather(*(session() for _ in range(burst)))
+    finally:
+        await upstreams.close()
+
+
+def _embed_burst(question, burst, config):
+    before = config.requests["embeddings"]
+    hits = metrics.snapshot().get("embed_query", {}).get("cache_hits", 0)
+
+    pipeline._flights = SingleFlight(True)
+    engine = fresh_engine("app")
+    start = threading.Barrier(burst)
+
+    def session():
+        start.wait()
+        engine.embed_query(question)
+
+    threads = [threading.Thread(target=session) for _ in range(burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def sessions():
+        upstreams = Upstreams(SETTINGS)
+        upstreams.openai = clients.make_async_openai_client(SETTINGS.openai_api_key)
+        engine = fresh_caches(AsyncRagEngine(upstreams, "app"))
+        try:
+            await asyncio.gather(*(engine.embed_query(f"{question} (async)") for _ in range(burst)))
+        finally:
+            await upstreams.close()
+
+    asyncio.run(sessions())
+    requests = config.requests["embeddings"] - before
+    hits = metrics.snapshot()["embed_query"]["cache_hits"] - hits
+    ok = requests == 2 and hits == 0
+    print(f"{'ok  ' if ok else 'FAIL'} embed_query burst: {requests} embedding requests for 2 x {burst} calls, {hits} counted as cache hits")
+    return not ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--burst", type=int, default=32)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(0.3, 0.8, 0.005, 60, args.dim)
+    server = start_openai(config)
+    index = fixture_index(args.dim)
+    fake = use_weaviate(index, 0.05)
+    fake_async = use_async_weaviate(index, 0.05)
+
+    print(f"{args.burst} identical questions at once")
+    print(f"{'engine':<9} {'answer':<9} {'coalesce':<9} {'wall s':>7} {'embed':>6} {'chat':>5} {'search':>7}")
+    run = 0
+    for engine in ("threaded", "async"):
+        for stream in (False, True):
+            for enabled in (False, True):
+                run += 1
+                question = f"{QUESTION} ({run})"  # nothing carried over between runs
+                before = dict(config.requests)
+                searches = sum(fake.calls.values()) + sum(fake_async.calls.values())
+                started = time.perf_counter()
+                if engine == "threaded":
+                    pipeline._flights = SingleFlight(enabled)
+                    answers = _threaded(question, args.burst, stream)
+                else:
+                    answers = asyncio.run(_async(fake_async, question, args.burst, stream, enabled))
+                elapsed = time.perf_counter() - started
+                requests = {k: config.requests[k] - before[k] for k in before}
+                assert len(answers) == args.burst and len(set(answers)) == 1 and answers[0], "waiters got different answers"
+                searched = sum(fake.calls.values()) + sum(fake_async.calls.values()) - searches
+                print(f"{engine:<9} {'streamed' if stream else 'whole':<9} {'on' if enabled else 'off':<9} "
+                      f"{elapsed:7.2f} {requests['embeddings']:>6} {requests['chat']:>5} {searched:>7}")
+
+    failures = _embed_burst(f"{QUESTION} (embed)", args.burst, config)
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
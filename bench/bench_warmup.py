@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import WORKDIR, fixture_index, fresh_engine, start_openai, use_weaviate
+from fake_openai import FakeOpenAIConfig
+from legalrag import warmup
+
+# 🔥 Offline benchmark of the warm start (legalrag/warmup.py).
+# A query log is written with the fixture questions asked with Zipf-like frequencies.
+# Each run then "restarts" (fresh engine and caches) and serves --users questions drawn
+# from the same distribution by --sessions concurrent sessions: without a warm-up, after
+# a warm-up that only embeds, searches and reranks, and after a warm-up that also
+# pre-generates answers. The last row is steady state: the same traffic again on the
+# process that served the cold run. Reports how long start_warmup() held the caller, how
+# long warming took, the chat requests it made, and the latency of the traffic.
+# First checks that the query log writer compacts the log to QUERY_LOG_WINDOW lines.
+#
+#   python bench/bench_warmup.py --users 80
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "questions.jsonl")
+
+
+def _load_questions():
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def _write_log(path, questions, variant):
+    with open(path, "w", encoding="utf-8") as f:
+        for rank, question in enumerate(questions):
+            for _ in range(max(1, 40 // (rank + 1))):
+                f.write(json.dumps({"t": 0, "variant": variant, "question": question}, ensure_ascii=False) + "\n")
+
+
+def _traffic(questions, users, seed):
+    weights = [1 / (rank + 1) for rank in range(len(questions))]
+    return random.Random(seed).choices(questions, weights, k=users)
+
+
+def _serve(engine, traffic, sessions):
+    def ask(question):
+        started = time.perf_counter()
+        engine.answer(question)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(sessions) as pool:
+        return sorted(pool.map(ask, traffic))
+
+
+def _check_log_compaction(path, window=50):
+    default_window, warmup.QUERY_LOG_WINDOW = warmup.QUERY_LOG_WINDOW, window
+    warmup.QUERY_LOG_PATH = path
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"t": 0, "variant": "app", "question": f"old{i}"}) + "\n" for i in range(2 * window - 10))
+    new = [f"new{i}" for i in range(20)]
+    for question in new:
+        warmup.log_question("app", question)
+    deadline = time.monotonic() + 5
+    while True:
+        with open(path, encoding="utf-8") as f:
+            logged = [json.loads(line)["question"] for line in f]
+        if logged[-1] == new[-1] or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    warmup.QUERY_LOG_WINDOW = default_window
+    ok = logged[-len(new):] == new and len(logged) < 2 * window
+    print(f"query log: {2 * window - 10} + {len(new)} lines with a window of {window} → {len(logged)} lines "
+          f"{'ok' if ok else 'FAIL'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", default="app")
+    parser.add_argument("--users", type=int, default=80)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(0.3, 0.8, 0.005, 60, args.dim)
+    server = start_openai(config)
+    use_weaviate(fixture_index(args.dim), 0.05)
+
+    # first: the writer thread keeps the path it starts with, so the traffic below logs there
+    _check_log_compaction(os.path.join(WORKDIR, "compacted.jsonl"))
+    questions = _load_questions()
+    # offline.py disables the query log; this run reads a synthetic one instead
+    warmup.QUERY_LOG_PATH = os.path.join(WORKDIR, "queries.jsonl")
+    _write_log(warmup.QUERY_LOG_PATH, questions, args.variant)
+    traffic = _traffic(questions, args.users, seed=1)
+
+    print(f"variant={args.variant}, {args.users} questions from {args.sessions} sessions, "
+          f"top {warmup.WARMUP_QUESTIONS} logged questions warmed by {warmup.WARMUP_WORKERS} workers")
+    print(f"{'start':<22} {'blocked ms':>10} {'warm-up s':>10} {'chat':>5} {'p50 s':>6} {'p95 s':>6} {'max s':>6}")
+    cold_engine = None
+    for mode in ("cold", "warm-up", "warm-up + answers", "steady state"):
+        if mode == "steady state":
+            engine = cold_engine
+        else:
+            engine = fresh_engine(args.variant)
+        blocked = warm_seconds = 0.0
+        chat_before = config.requests["chat"]
+        if mode.startswith("warm-up"):
+            warmup._warmups.clear()
+            started = time.perf_counter()
+            progress = warmup.start_warmup(engine, generate=mode.endswith("answers"))
+            blocked = time.perf_counter() - started
+            while progress.running:
+                time.sleep(0.05)
+            warm_seconds = progress.status()["seconds"]
+        warm_chat = config.requests["chat"] - chat_before
+        seconds = _serve(engine, traffic, args.sessions)
+        if mode == "cold":
+            cold_engine = engine
+        p50, p95 = (seconds[min(len(seconds) - 1, int(q * len(seconds)))] for q in (0.5, 0.95))
+        print(f"{mode:<22} {blocked * 1e3:10.1f} {warm_seconds:10.2f} {warm_chat:5d} {p50:6.2f} {p95:6.2f} {seconds[-1]:6.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai import FakeOpenAIConfig, start_fake_openai
+from legalrag.ingest import Ingestor, article_uuid, read_chunks
+
+# ✅ Offline check of the ingestion pipeline (legalrag/ingest.py) against the fake
+# OpenAI server and an in-memory writable collection whose batches drop a share of
+# objects on the first attempt. Run with: python bench/check_ingest.py
+
+LAW_TEXT = """قانون تجريبي للمالكين والمستأجرين
+قانون رقم 11 لسنة 1994 وتعديلاته.
+
+المادة 1 - اسم القانون
+يسمى هذا القانون (قانون المالكين والمستأجرين) ويعمل به من تاريخ نشره في الجريدة الرسمية.
+المادة (2): التعاريف
+يكون للكلمات والعبارات التالية حيثما وردت في هذا القانون المعاني المخصصة لها أدناه.
+المادة 5 من هذا القانون تطبق على جميع عقود الإيجار المبرمة قبل نفاذه وبعده ولا يجوز الاتفاق على خلافها بأي حال.
+المادة 7
+لا يجوز للمستأجر أن يؤجر المأجور أو جزءا منه لغيره إلا بموافقة المالك الخطية.
+"""
+
+
+class _Batch:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def add_object(self, properties, uuid, vector):
+        # 🎲 Every third object fails on its first attempt
+        attempts = self.collection.attempts[uuid] = self.collection.attempts.get(uuid, 0) + 1
+        if attempts == 1 and len(self.collection.attempts) % 3 == 0:
+            self.collection.failed.append(types.SimpleNamespace(original_uuid=uuid))
+            return
+        self.collection.objects[uuid] = (dict(properties), vector)
+
+
+class _BatchWrapper:
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed_objects = []
+
+    def dynamic(self):
+        collection = self.collection
+
+        class _Context:
+            def __enter__(self):
+                collection.failed = []
+                return _Batch(collection)
+
+            def __exit__(self, *exc):
+                collection.batch.failed_objects = collection.failed
+
+        return _Context()
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.objects = {}
+        self.attempts = {}
+        self.failed = []
+        self.batch = _BatchWrapper(self)
+        self.data = types.SimpleNamespace(delete_many=self._delete_many)
+
+    def iterator(self, return_properties=None):
+        for object_id, (properties, _) in list(self.objects.items()):
+            yield types.SimpleNamespace(uuid=object_id, properties=properties)
+
+    def _delete_many(self, where):
+        ids = [str(i) for i in where.value]
+        for object_id in ids:
+            self.objects.pop(object_id, None)
+        return types.SimpleNamespace(successful=len(ids))
+
+
+def _check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    return not ok
+
+
+def main():
+    import openai
+
+    config = FakeOpenAIConfig(embed_latency=0.05, dim=64)
+    server, base_url = start_fake_openai(config)
+    client = openai.OpenAI(api_key="sk-offline", base_url=base_url)
+    collection = MemoryCollection()
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        law_path = os.path.join(workdir, "landlords.txt")
+        with open(law_path, "w", encoding="utf-8") as f:
+            f.write(LAW_TEXT)
+
+        chunks = list(read_chunks([law_path]))
+        numbers = [c["article_number"] for c in chunks]
+        failures += _check(f"parsed metadata + articles {numbers}", numbers == ["", "1", "2", "7"])
+        failures += _check("citing sentence stays in article 2", "المادة 5 من هذا القانون" in chunks[2]["text"])
+        failures += _check("heading title", chunks[1]["article_title"] == "اسم القانون" and chunks[2]["article_title"] == "التعاريف")
+
+        fixture = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "law_articles.jsonl")
+        started = time.perf_counter()
+        stats = Ingestor(client, collection, embed_batch=8, embed_workers=2).run(read_chunks([fixture, law_path]))
+        print(f"     first run  {stats}  {time.perf_counter() - started:.2f}s")
+        failures += _check("all chunks upserted despite failed batch objects",
+                           stats["upserted"] == stats["parsed"] == len(collection.objects) and stats["failed"] == 0)
+        failures += _check("embeddings batched", config.requests["embeddings"] == -(-stats["parsed"] // 8))
+
+        requests = config.requests["embeddings"]
+        stats = Ingestor(client, collection, embed_batch=8).run(read_chunks([fixture, law_path]))
+        print(f"     re-run     {stats}")
+        failures += _check("unchanged corpus is skipped", stats["unchanged"] == stats["parsed"] and config.requests["embeddings"] == requests)
+
+        with open(law_path, "w", encoding="utf-8") as f:
+            # Article 7 amended, article 2 repealed
+            amended = LAW_TEXT.replace("الخطية", "الخطية المسبقة")
+            f.write(amended[:amended.index("المادة (2)")] + amended[amended.index("المادة 7"):])
+        stats = Ingestor(client, collection, embed_batch=8).run(read_chunks([law_path]), prune=True)
+        print(f"     amended    {stats}")
+        failures += _check("only the amended article is re-embedded", stats["embedded"] == 1 and stats["upserted"] == 1)
+        failures += _check("removed article is pruned", stats["pruned"] == 1
+                           and article_uuid("قانون تجريبي للمالكين والمستأجرين", "2") not in collection.objects)
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
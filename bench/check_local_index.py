@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+# offline first: it sets up the environment legalrag reads on import
+from offline import WORKDIR, fixture_index, fresh_engine, use_weaviate
+from fake_embeddings import fake_embedding
+from legalrag import retrieval
+from legalrag.local_index import sync_from_weaviate
+
+# ✅ Offline check of the local vector index against the fixture corpus.
+# Run with: python bench/check_local_index.py
+
+EXPECTED = [
+    ("ما هي مدة التقادم في الحقوق الدورية المتجددة كالأجرة والرواتب؟", "450"),
+    ("متى يبدأ سريان المدة المقررة لعدم سماع الدعوى؟", "455"),
+    ("هل تجوز الشهادة في إثبات التزام تعاقدي تزيد قيمته على مئة دينار؟", "28"),
+    ("هل يجوز للمستأجر أن يؤجر المأجور لغيره دون موافقة المالك؟", "7"),
+]
+
+
+def main(repeat=2000):
+    index = fixture_index()
+
+    failures = 0
+    for question, article_number in EXPECTED:
+        hits = index.search(fake_embedding(question), limit=3)
+        found = [h.properties["article_number"] for h in hits]
+        ok = article_number in found and all(h.properties["article_title"] != "LAW METADATA" for h in hits)
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} المادة {article_number} in top-3 {found}")
+
+    vector = fake_embedding(EXPECTED[0][0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.search(vector, limit=10)
+    per_query_us = (time.perf_counter() - start) / repeat * 1e6
+    print(f"search: {per_query_us:.1f} µs/query over {len(index)} articles")
+
+    # 🔄 A sync from the stand-in is one streamed export, no per-object fetches
+    fake = use_weaviate(index, latency=0)
+    summary = sync_from_weaviate(fake, os.path.join(WORKDIR, "synced"), dimensions=index.dim, quantization="none")
+    ok = summary["total"] == len(index.articles) and fake.calls == {"iterator": 1}
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} sync {summary} with upstream calls {fake.calls}")
+
+    # 🔤 Without the mirror, the remote BM25 leg must get the question as written
+    # (Weaviate does not normalize ة / ى / أ) and rank like the mirror's keyword search
+    sent = []
+    query = fake.collections.get("LawArticle").query
+    hybrid = query.hybrid
+    query.hybrid = lambda **kwargs: sent.append(kwargs["query"]) or hybrid(**kwargs)
+    retrieval.get_local_index = lambda: None
+    engine = fresh_engine("app")
+    engine.embed_query = fake_embedding
+    for question, _ in EXPECTED:
+        engine.retrieve_articles(question)
+        remote = [h.properties["article_number"] for h in query._bm25(sent[-1], None)[:1]]
+        local = [h.properties["article_number"] for h in index.keyword_search(question, 1)]
+        ok = sent[-1] == question and remote == local
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} keyword leg sent as asked, top {remote} (mirror {local})")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(main())
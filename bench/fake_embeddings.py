@@ -0,0 +1,35 @@
+import hashlib
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legalrag.arabic_normalize import canonical_key
+
+# 🧪 Deterministic offline stand-in for text-embedding-3-large.
+# Hashes character trigrams of the normalized text into a fixed-size unit vector, so
+# lexically similar Arabic texts land close together and every run gives the same vectors.
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "law_articles.jsonl")
+DEFAULT_DIM = 256
+
+
+def fake_embedding(text, dim=DEFAULT_DIM):
+    vector = [0.0] * dim
+    padded = f" {canonical_key(text)} "
+    for i in range(len(padded) - 2):
+        digest = hashlib.blake2b(padded[i:i + 3].encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+# 📚 Fixture LawArticle corpus: (uuid, properties) pairs
+def load_fixture_articles(path=FIXTURE_PATH):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            yield record.pop("uuid"), record
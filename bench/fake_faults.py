@@ -0,0 +1,31 @@
+import random
+import threading
+
+# 💥 Fault injection for the local stand-ins (fake_openai.py, fake_weaviate.py).
+# A plan fails a share of requests (with an HTTP status and optional Retry-After) and
+# stalls another share for extra seconds, to exercise legalrag/resilience.py offline.
+# Draws come from a seeded generator, so a benchmark run is repeatable.
+
+
+class FaultPlan:
+    def __init__(self, error_rate=0.0, stall_rate=0.0, stall_seconds=0.0, status=500, retry_after=None, seed=0):
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.status = status
+        self.retry_after = retry_after
+        self.counts = {"errors": 0, "stalls": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # "error", "stall" or None for the next request
+    def draw(self):
+        with self._lock:
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                self.counts["errors"] += 1
+                return "error"
+            if roll < self.error_rate + self.stall_rate:
+                self.counts["stalls"] += 1
+                return "stall"
+            return None
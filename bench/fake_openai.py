@@ -0,0 +1,205 @@
+import argparse
+import base64
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_embeddings import fake_embedding
+from fake_faults import FaultPlan
+
+# 🧪 Local stand-in for the OpenAI embeddings and chat completions endpoints.
+# Vectors are deterministic (see fake_embeddings.py) and every response can be
+# delayed to mimic real provider latency. Point the apps at it with
+# OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+#
+# Chat requests mimic the provider's automatic prompt caching: the longest prefix shared
+# with a recent prompt counts as cached once it reaches 1024 tokens (in 128-token steps),
+# is reported in usage.prompt_tokens_details.cached_tokens, and only the uncached share
+# of the prompt pays for prefill (half of chat_ttft for a fully uncached prompt).
+#
+# config.faults["embeddings" | "chat"] is a FaultPlan (fake_faults.py): failed requests get
+# its status (429 with Retry-After, 5xx) and an OpenAI-style error body, stalled ones wait
+# stall_seconds before responding.
+
+ANSWER = (
+    "وفقاً للنصوص القانونية المسترجعة، لا تسمع الدعوى على المنكر بعد تركها من غير عذر شرعي "
+    "خلال المدة التي حددها القانون، وتبدأ المدة من اليوم الذي يصبح فيه الحق مستحق الأداء. "
+    "هذه المعلومات للاستدلال فقط وليست استشارة قانونية رسمية."
+)
+
+
+class FakeOpenAIConfig:
+    def __init__(self, embed_latency=0.3, chat_ttft=0.8, token_delay=0.02, answer_tokens=120, dim=3072):
+        self.embed_latency = embed_latency
+        self.chat_ttft = chat_ttft
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.dim = dim
+        self.requests = {"embeddings": 0, "chat": 0}
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.recent_prompts = deque(maxlen=256)
+        self.faults = {"embeddings": FaultPlan(), "chat": FaultPlan()}
+        self.lock = threading.Lock()
+
+
+def _answer_words(count):
+    words = ANSWER.split()
+    return [words[i % len(words)] for i in range(count)]
+
+
+def _cached_tokens(config, prompt):
+    shared = max((len(os.path.commonprefix([prompt, seen])) for seen in config.recent_prompts), default=0)
+    tokens = shared // 3
+    return tokens // 128 * 128 if tokens >= 1024 else 0
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            try:
+                if self.path.endswith("/embeddings"):
+                    if self._fault("embeddings"):
+                        self._embeddings(body)
+                elif self.path.endswith("/chat/completions"):
+                    if self._fault("chat"):
+                        self._chat(body)
+                else:
+                    self.send_error(404)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # the client gave up (deadline, cancelled hedge)
+
+        # False when the request was answered with an injected error
+        def _fault(self, endpoint):
+            plan = config.faults[endpoint]
+            fault = plan.draw()
+            if fault == "stall":
+                time.sleep(plan.stall_seconds)
+            if fault != "error":
+                return True
+            with config.lock:
+                config.requests[endpoint] += 1
+            headers = {"Retry-After": str(plan.retry_after)} if plan.retry_after is not None else {}
+            error = {"message": "injected fault", "type": "rate_limit_exceeded" if plan.status == 429 else "server_error"}
+            self._json({"error": error}, plan.status, headers)
+            return False
+
+        def _embeddings(self, body):
+            with config.lock:
+                config.requests["embeddings"] += 1
+            time.sleep(config.embed_latency)
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            dim = body.get("dimensions") or config.dim
+            data = []
+            for i, text in enumerate(inputs):
+                vector = fake_embedding(text, dim)
+                if body.get("encoding_format") == "base64":
+                    vector = base64.b64encode(struct.pack(f"<{dim}f", *vector)).decode("ascii")
+                data.append({"object": "embedding", "index": i, "embedding": vector})
+            tokens = sum(len(t) // 3 + 1 for t in inputs)
+            self._json({
+                "object": "list",
+                "data": data,
+                "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        def _chat(self, body):
+            prompt = "".join(f"{m.get('role')}\x00{m.get('content') or ''}\x00" for m in body.get("messages", []))
+            prompt_tokens = len(prompt) // 3 + 1
+            with config.lock:
+                config.requests["chat"] += 1
+                cached_tokens = _cached_tokens(config, prompt)
+                config.recent_prompts.append(prompt)
+                config.prompt_tokens += prompt_tokens
+                config.cached_tokens += cached_tokens
+            words = _answer_words(config.answer_tokens)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(words),
+                "total_tokens": prompt_tokens + len(words),
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            }
+            base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model")}
+
+            time.sleep(config.chat_ttft * (0.5 + 0.5 * (prompt_tokens - cached_tokens) / prompt_tokens))
+            if not body.get("stream"):
+                time.sleep(config.token_delay * len(words))
+                self._json({
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, word in enumerate(words):
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(config.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def _json(self, payload, status=200, headers=None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# 🚀 Start the server on a background thread; returns (server, base_url)
+def start_fake_openai(config=None, host="127.0.0.1", port=0):
+    config = config or FakeOpenAIConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI server in the foreground.")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--embed-latency", type=float, default=0.3)
+    parser.add_argument("--chat-ttft", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.embed_latency, args.chat_ttft, args.token_delay, args.answer_tokens)
+    server, url = start_fake_openai(config, port=args.port)
+    print(f"fake OpenAI listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import asyncio
+import math
+import re
+import time
+import types
+from collections import Counter
+
+from fake_faults import FaultPlan
+from legalrag.local_index import LocalIndex
+from legalrag.retrieval import reciprocal_rank_fusion
+
+# 🧪 Local stand-in for the Weaviate client, serving a LocalIndex built from the fixture
+# corpus. Implements the subset of the v4 collection API used by the apps
+# (near_vector / hybrid / fetch_objects / fetch_object_by_id / iterator) and adds a
+# configurable per-call latency to mimic the network round trip to Weaviate Cloud.
+# client.faults (a FaultPlan, fake_faults.py) makes query calls stall or fail with a
+# gRPC-UNAVAILABLE WeaviateQueryError.
+# The BM25 leg of hybrid() tokenizes like Weaviate's "word" tokenization (lowercased
+# alphanumeric runs, no Arabic normalization), so a query whose letter forms were
+# normalized away ("المدنيه") misses here as it does against the real collection.
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _operator(f):
+    op = getattr(f, "operator", None)
+    return str(getattr(op, "value", op))
+
+
+# Evaluates Filter.by_property(...) trees built by retrieval.article_filter() and the
+# Filter.by_id() lookups of adjacency.expand_neighbors()
+def _matches(f, properties, uuid=None):
+    if f is None:
+        return True
+    children = getattr(f, "filters", None)
+    if children is not None:
+        if "or" in type(f).__name__.lower():
+            return any(_matches(c, properties, uuid) for c in children)
+        return all(_matches(c, properties, uuid) for c in children)
+
+    target = getattr(f, "target", None)
+    value = getattr(f, "value", None)
+    actual = str(uuid) if target == "_id" else properties.get(target, "")
+    op = _operator(f)
+    if op == "Equal":
+        return actual == value
+    if op == "NotEqual":
+        return actual != value
+    if op in ("ContainsAny", "ContainsAll"):
+        values = [str(v) for v in value]
+        return str(actual) in values
+    return True
+
+
+def _unavailable():
+    from weaviate.exceptions import WeaviateQueryError
+
+    return WeaviateQueryError("<AioRpcError: StatusCode.UNAVAILABLE, injected fault>", "GRPC")
+
+
+class _Query:
+    def __init__(self, index, latency, counter, faults=None):
+        self._index = index
+        self._latency = latency
+        self._counter = counter
+        self._faults = faults
+        self._postings = None
+
+    def _call(self, name):
+        self._counter[name] = self._counter.get(name, 0) + 1
+        fault = self._faults.draw() if self._faults is not None else None
+        time.sleep(self._latency + (self._faults.stall_seconds if fault == "stall" else 0))
+        if fault == "error":
+            raise _unavailable()
+
+    def _ranked(self, vector, filters):
+        hits = self._index.search(vector, len(self._index), include_metadata_chunks=True) or []
+        return [h for h in hits if _matches(filters, h.properties)]
+
+    def near_vector(self, near_vector, limit=10, offset=0, filters=None, return_properties=None, **kwargs):
+        self._call("near_vector")
+        hits = self._ranked(near_vector, filters)
+        return types.SimpleNamespace(objects=hits[offset:offset + limit])
+
+    # BM25 over the stored text as written (see _words)
+    def _bm25(self, query, filters, k1=1.2, b=0.75):
+        articles = self._index.articles
+        if self._postings is None:
+            postings = {}
+            lengths = []
+            for position, a in enumerate(articles):
+                words = _words(f"{a['properties'].get('article_title', '')} {a['properties'].get('text', '')}")
+                lengths.append(len(words))
+                for word, tf in Counter(words).items():
+                    postings.setdefault(word, []).append((position, tf))
+            self._postings = (postings, lengths, (sum(lengths) / len(lengths)) if lengths else 1.0)
+        postings, lengths, average_length = self._postings
+        scores = {}
+        for word in set(_words(query)):
+            docs = postings.get(word, [])
+            idf = math.log(1 + (len(articles) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for position, tf in docs:
+                scores[position] = scores.get(position, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[position] / average_length))
+        hits = [self._index.get(articles[position]["uuid"]) for position in sorted(scores, key=scores.get, reverse=True)]
+        return [h for h in hits if _matches(filters, h.properties)]
+
+    # Like Weaviate: fused results carry no distance, only the fusion score and the vector when requested
+    def hybrid(self, query, vector=None, limit=10, filters=None, alpha=0.5, return_metadata=None, include_vector=False, **kwargs):
+        self._call("hybrid")
+        semantic = self._ranked(vector, filters)[:limit * 2]
+        keyword = self._bm25(query, filters)[:limit * 2]
+        scores = {}
+        for weight, results in ((alpha, semantic), (1 - alpha, keyword)):
+            for rank, hit in enumerate(results):
+                scores[str(hit.uuid)] = scores.get(str(hit.uuid), 0.0) + weight / (60 + rank + 1)
+        hits = []
+        for hit in reciprocal_rank_fusion([semantic, keyword], limit):
+            hit = self._index.get(hit.uuid)
+            hit.metadata.score = scores[str(hit.uuid)] if getattr(return_metadata, "score", False) else None
+            if include_vector:
+                hit.vector = {"default": self._index.vectors[self._index.position(hit.uuid)].tolist()}
+            hits.append(hit)
+        return types.SimpleNamespace(objects=hits)
+
+    def fetch_objects(self, filters=None, limit=None, **kwargs):
+        self._call("fetch_objects")
+        hits = [self._index.get(a["uuid"]) for a in self._index.articles]
+        hits = [h for h in hits if _matches(filters, h.properties, h.uuid)]
+        return types.SimpleNamespace(objects=hits[:limit] if limit else hits)
+
+    def fetch_object_by_id(self, uuid, include_vector=False, **kwargs):
+        self._call("fetch_object_by_id")
+        hit = self._index.get(uuid)
+        if hit is not None and include_vector:
+            hit.vector = {"default": self._index.vectors[self._index.position(uuid)].tolist()}
+        return hit
+
+
+class _Collection:
+    def __init__(self, index, latency, counter, faults=None):
+        self.query = _Query(index, latency, counter, faults)
+        self._index = index
+        self._counter = counter
+
+    def iterator(self, include_vector=False, **kwargs):
+        self.query._call("iterator")
+        for a in self._index.articles:
+            hit = self._index.get(a["uuid"])
+            hit.metadata.last_update_time = None
+            if include_vector:
+                hit.vector = {"default": self._index.vectors[self._index.position(a["uuid"])].tolist()}
+            yield hit
+
+
+class _Collections:
+    def __init__(self, index, latency, counter, faults=None):
+        self._collection = _Collection(index, latency, counter, faults)
+
+    def get(self, name):
+        return self._collection
+
+
+class FakeWeaviateClient:
+    def __init__(self, index, latency=0.05, faults=None):
+        self.calls = {}
+        self.faults = faults or FaultPlan()
+        self.collections = _Collections(index, latency, self.calls, self.faults)
+
+    @classmethod
+    def from_path(cls, path, latency=0.05):
+        return cls(LocalIndex.load(path), latency)
+
+    def is_connected(self):
+        return True
+
+    def is_ready(self):
+        return True
+
+    def close(self):
+        pass
+
+
+# ⚡ Async flavour (WeaviateAsyncClient) for the HTTP API: same data, non-blocking latency
+class _AsyncQuery:
+    def __init__(self, query, latency, faults=None):
+        self._query = query
+        self._latency = latency
+        self._faults = faults
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        async def call(*args, **kwargs):
+            await _adelay(self._latency, self._faults)
+            return method(*args, **kwargs)
+
+        return call
+
+
+async def _adelay(latency, faults):
+    fault = faults.draw() if faults is not None else None
+    await asyncio.sleep(latency + (faults.stall_seconds if fault == "stall" else 0))
+    if fault == "error":
+        raise _unavailable()
+
+
+class _AsyncCollection:
+    def __init__(self, index, latency, counter, faults=None):
+        self.query = _AsyncQuery(_Query(index, 0, counter), latency, faults)
+        self._collection = _Collection(index, 0, counter)
+        self._latency = latency
+        self._faults = faults
+
+    async def iterator(self, **kwargs):
+        await _adelay(self._latency, self._faults)
+        for hit in self._collection.iterator(**kwargs):
+            yield hit
+
+
+class _AsyncCollections:
+    def __init__(self, index, latency, counter, faults=None):
+        self._collection = _AsyncCollection(index, latency, counter, faults)
+
+    def get(self, name):
+        return self._collection
+
+
+class FakeAsyncWeaviateClient:
+    def __init__(self, index, latency=0.05, faults=None):
+        self.calls = {}
+        self.faults = faults or FaultPlan()
+        self.collections = _AsyncCollections(index, latency, self.calls, self.faults)
+
+    async def connect(self):
+        pass
+
+    async def is_ready(self):
+        return True
+
+    async def close(self):
+        pass
@@ -0,0 +1,81 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 🧪 Shared offline harness of the benchmarks. Import it before anything that imports
+# legalrag (the fake_* stand-ins do): legalrag binds its paths (embedding cache, local
+# index, query log) on first import, so they are pointed at a throwaway directory here
+# first and no bench run reads or writes the real .cache/. The helpers build the fixture
+# index, swap the Weaviate stand-ins into legalrag.clients and make engines with fresh
+# in-memory caches.
+
+if "legalrag" in sys.modules:
+    raise ImportError("import offline before legalrag: its paths are read on first import")
+
+WORKDIR = tempfile.mkdtemp(prefix="legalrag-bench-")
+atexit.register(shutil.rmtree, WORKDIR, True)
+os.environ.update(
+    EMBEDDING_CACHE_PATH="",
+    LOCAL_INDEX_PATH=os.path.join(WORKDIR, "no-local-index"),
+    QUERY_LOG_PATH="",
+)
+
+from fake_embeddings import fake_embedding, load_fixture_articles
+from fake_openai import start_fake_openai
+from fake_weaviate import FakeAsyncWeaviateClient, FakeWeaviateClient
+from legalrag import clients
+from legalrag.answer_cache import SemanticAnswerCache
+from legalrag.embedding_cache import EmbeddingCache
+from legalrag.local_index import build_index
+from legalrag.pipeline import RagEngine, Settings
+
+SETTINGS = Settings("sk-offline", "http://offline", "offline")
+
+
+# 🤖 Fake OpenAI server (fake_openai.py); OpenAI clients created afterwards talk to it
+def start_openai(config):
+    server, base_url = start_fake_openai(config)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    return server
+
+
+# 📚 Fixture corpus with fake embeddings; `transform` may rewrite each article's properties
+def fixture_index(dim=256, transform=None, name="standin-index"):
+    records = []
+    for uuid, properties in load_fixture_articles():
+        if transform is not None:
+            properties = transform(properties)
+        records.append((uuid, properties, fake_embedding(properties["text"], dim), 0.0))
+    return build_index(records, os.path.join(WORKDIR, name))
+
+
+# 🔌 Weaviate stand-ins in place of the real connections
+def use_weaviate(index, latency=0.05, faults=None):
+    fake = FakeWeaviateClient(index, latency, faults)
+    clients.get_weaviate_client = lambda *a, **k: fake
+    return fake
+
+
+def use_async_weaviate(index, latency=0.05, faults=None):
+    fake = FakeAsyncWeaviateClient(index, latency, faults)
+
+    async def connect(*a, **k):
+        return fake
+
+    clients.connect_async_weaviate = connect
+    return fake
+
+
+# 🧼 Nothing cached by an earlier run reaches this engine (works for AsyncRagEngine too)
+def fresh_caches(engine):
+    engine.embedding_cache = EmbeddingCache(path=None)
+    engine.answer_cache = SemanticAnswerCache()
+    return engine
+
+
+def fresh_engine(variant="app"):
+    return fresh_caches(RagEngine(SETTINGS, variant))
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from fake_embeddings import FIXTURE_PATH, fake_embedding, load_fixture_articles
+from fake_openai import FakeOpenAIConfig, start_fake_openai
+from legalrag.local_index import build_index
+
+# 📊 Offline end-to-end benchmark of the Streamlit app variants.
+# Starts a fake OpenAI server and a local Weaviate stand-in loaded with the fixture
+# LawArticle corpus, replays bench/fixtures/questions.jsonl against each variant, and
+# reports throughput, end-to-end and per-stage latency percentiles and peak memory.
+#
+#   python bench/run_benchmarks.py
+#   python bench/run_benchmarks.py --variants app.py app2.py --chat-ttft 1.5 --repeat 3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+VARIANTS = ["app.py", "app1.py", "app2.py", "app-test-enhancing-query.py", "appRTL-fail.py"]
+QUESTIONS_PATH = os.path.join(BENCH, "fixtures", "questions.jsonl")
+
+
+def run_variant(variant, workdir, index_path, base_url, args):
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=base_url,
+        EMBEDDING_CACHE_PATH=os.path.join(workdir, variant + ".embeddings.sqlite3"),
+        LOCAL_INDEX_PATH=index_path if args.local_index else os.path.join(workdir, "no-local-index"),
+        QUERY_LOG_PATH=os.path.join(workdir, variant + ".queries.jsonl"),
+        WARMUP_QUESTIONS="0",  # cold-start numbers; bench_warmup.py measures the warm start
+    )
+    command = [
+        sys.executable, os.path.join(BENCH, "run_pipeline.py"), os.path.join(ROOT, variant),
+        "--questions", args.questions,
+        "--index", os.path.join(workdir, "standin-index"),
+        "--weaviate-latency", str(args.weaviate_latency),
+        "--repeat", str(args.repeat),
+    ]
+    completed = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True)
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        return {"variant": variant, "error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+def print_report(results):
+    print(f"{'variant':<30} {'q/s':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'cold s':>7} {'RSS MB':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['variant']:<30} ERROR: {r['error']}")
+            continue
+        lat = r["latency"]
+        print(f"{r['variant']:<30} {r['throughput']:6.2f} {lat['p50']:7.3f} {lat['p95']:7.3f} {lat['p99']:7.3f} "
+              f"{r['cold_start']:7.3f} {r['max_rss_mb']:7.1f}")
+        for name, s in r.get("stages", {}).items():
+            print(f"    {name:<26} n={s['count']:<4} p50={s['p50'] * 1000:8.1f}ms p95={s['p95'] * 1000:8.1f}ms "
+                  f"p99={s['p99'] * 1000:8.1f}ms cache={s['cache_hits']}/{s['cache_misses']}")
+        for name, s in r.get("values", {}).items():
+            print(f"    {name:<26} n={s['count']:<4} mean={s['mean']:6.2f} p50={s['p50']:g} p95={s['p95']:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the Streamlit app variants.")
+    parser.add_argument("--variants", nargs="+", default=VARIANTS)
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--fixture", default=FIXTURE_PATH)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--embed-latency", type=float, default=0.3)
+    parser.add_argument("--chat-ttft", type=float, default=0.8)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--weaviate-latency", type=float, default=0.05)
+    parser.add_argument("--local-index", action="store_true", help="let the apps use the in-process local index")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the question corpus N times")
+    parser.add_argument("--json", help="also write raw results to this file")
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.embed_latency, args.chat_ttft, args.token_delay, args.answer_tokens, args.dim)
+    server, base_url = start_fake_openai(config)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        records = [
+            (uuid, properties, fake_embedding(properties["text"], args.dim), 0.0)
+            for uuid, properties in load_fixture_articles(args.fixture)
+        ]
+        build_index(records, os.path.join(workdir, "standin-index"))
+        index_path = os.path.join(workdir, "local-index")
+        build_index(records, index_path)
+
+        results = [run_variant(v, workdir, index_path, base_url, args) for v in args.variants]
+
+    server.shutdown()
+    print_report(results)
+    print(f"upstream requests: {config.requests}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
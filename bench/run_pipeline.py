@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_weaviate import FakeWeaviateClient
+
+# 🧪 Replays the question corpus against ONE app variant inside a headless Streamlit
+# AppTest session and prints a JSON result line. Started by run_benchmarks.py in a
+# fresh interpreter per variant so caches, clients and peak RSS are not shared.
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {f"p{q}": ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] for q in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("variant")
+    parser.add_argument("--questions", required=True)
+    parser.add_argument("--index", required=True)
+    parser.add_argument("--weaviate-latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    # 🔌 Route every Weaviate connection (shared clients or direct) to the local stand-in
+    import weaviate
+
+    from legalrag import clients
+
+    fake = FakeWeaviateClient.from_path(args.index, args.weaviate_latency)
+    clients.get_weaviate_client = lambda *a, **k: fake
+    weaviate.connect_to_weaviate_cloud = lambda *a, **k: fake
+
+    from streamlit.testing.v1 import AppTest
+
+    from legalrag import metrics
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()] * args.repeat
+
+    result = {"variant": os.path.basename(args.variant), "questions": len(questions)}
+    try:
+        with open(args.variant, encoding="utf-8") as f:
+            compile(f.read(), args.variant, "exec")
+    except SyntaxError as e:
+        result["error"] = f"SyntaxError: {e.msg} (line {e.lineno})"
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    at = AppTest.from_file(os.path.abspath(args.variant), default_timeout=600)
+    at.secrets["OPENAI_API_KEY"] = "sk-offline"
+    at.secrets["WEAVIATE_API_KEY"] = "offline"
+    at.secrets["WEAVIATE_URL"] = "http://offline"
+
+    started = time.perf_counter()
+    at.run()
+    result["cold_start"] = time.perf_counter() - started
+    if at.exception:
+        result["error"] = at.exception[0].message
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    latencies = []
+    total_started = time.perf_counter()
+    for question in questions:
+        started = time.perf_counter()
+        at.text_input(key="query").input(question).run()
+        latencies.append(time.perf_counter() - started)
+        if at.exception:
+            result["error"] = at.exception[0].message
+            break
+    elapsed = time.perf_counter() - total_started
+
+    result["throughput"] = len(latencies) / elapsed if elapsed else 0.0
+    result["latency"] = _percentiles(latencies)
+    result["stages"] = metrics.snapshot()
+    result["values"] = metrics.value_snapshot()
+    result["weaviate_calls"] = fake.calls
+    result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
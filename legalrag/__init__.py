@@ -0,0 +1,16 @@
+from .arabic_normalize import canonical_key, normalize_arabic
+from .conversation import Conversation
+from .pipeline import VARIANTS, RagEngine, Settings, Variant, get_engine
+from .resilience import UpstreamError
+
+__all__ = [
+    "Conversation",
+    "RagEngine",
+    "Settings",
+    "UpstreamError",
+    "VARIANTS",
+    "Variant",
+    "canonical_key",
+    "get_engine",
+    "normalize_arabic",
+]
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from .local_index import COLLECTION, METADATA_TITLE, PROPERTIES, get_local_index
+from .metrics import record, stage
+from .resilience import SCAN, SEARCH
+
+# 🧭 Law-structure-aware neighbor expansion.
+# A legal answer often needs the article right before or after a hit, or the general
+# rule that opens its section. ArticleAdjacency is a small in-memory index keyed by
+# (law_title, article_number) over the whole collection: each law's articles in
+# numeric order, so neighbors and section openers are dictionary / list lookups.
+#
+# The collection has no chapter field, so a section is a run of consecutive article
+# numbers in the stored corpus (excerpted laws break into runs at the gaps). Its first
+# article stands in for the chapter's general rule. Runs longer than SECTION_MAX_ARTICLES
+# (a fully ingested law) are not treated as a section.
+#
+# The index comes from the local index when one is synced (zero round trips); otherwise
+# it is built from a properties-only pass over Weaviate and rebuilt every
+# ADJACENCY_REFRESH seconds. Remote builds run in the background, one at a time for the
+# whole process: requests keep the index they have (stale during a refresh, none before
+# the first build lands, when hits go out unexpanded) and never wait for a scan. A failed
+# build is retried after ADJACENCY_RETRY seconds. Expanded articles are read from the
+# local index, or fetched from Weaviate in one batched by-id query.
+#
+# Scans and fetches go through the upstream policy of resilience.py (SCAN / SEARCH). When
+# the fetch gives up, the ranked hits are returned unexpanded ("degraded.expand_neighbors").
+
+NEIGHBOR_SPAN = int(os.getenv("NEIGHBOR_SPAN", "1"))
+NEIGHBOR_MAX = int(os.getenv("NEIGHBOR_MAX", "4"))  # expanded articles added per question
+SECTION_MAX_ARTICLES = int(os.getenv("SECTION_MAX_ARTICLES", "40"))
+ADJACENCY_REFRESH = float(os.getenv("ADJACENCY_REFRESH", "3600"))
+ADJACENCY_RETRY = float(os.getenv("ADJACENCY_RETRY", "60"))
+
+_NUMBER_RE = re.compile(r"\d+")
+
+logger = logging.getLogger(__name__)
+
+
+def _number(article_number):
+    match = _NUMBER_RE.search(str(article_number))
+    return int(match.group()) if match else None
+
+
+class ArticleAdjacency:
+    # `entries`: (uuid, law_title, article_number) for every article of the collection
+    def __init__(self, entries):
+        laws = {}
+        for uuid, law_title, article_number in entries:
+            number = _number(article_number)
+            if number is not None:
+                laws.setdefault(law_title, []).append((number, str(article_number), str(uuid)))
+
+        self._laws = {}      # law_title → [uuid, ...] in article order
+        self._slots = {}     # (law_title, article_number) → position in that list
+        self._sections = {}  # law_title → [position of the section's first article, ...]
+        for law_title, rows in laws.items():
+            rows.sort()
+            self._laws[law_title] = [uuid for _, _, uuid in rows]
+            starts = []
+            for position, (number, article_number, _) in enumerate(rows):
+                self._slots[(law_title, article_number)] = position
+                new_run = position == 0 or number - rows[position - 1][0] > 1
+                starts.append(position if new_run else starts[-1])
+            sizes = Counter(starts)
+            self._sections[law_title] = [start if sizes[start] <= SECTION_MAX_ARTICLES else None for start in starts]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def neighbors(self, law_title, article_number, around=NEIGHBOR_SPAN):
+        position = self._slots.get((law_title, str(article_number)))
+        if position is None:
+            return []
+        uuids = self._laws[law_title]
+        positions = []
+        for offset in range(1, around + 1):
+            positions += [p for p in (position - offset, position + offset) if 0 <= p < len(uuids)]
+        return [uuids[p] for p in positions]
+
+    def section_head(self, law_title, article_number):
+        position = self._slots.get((law_title, str(article_number)))
+        if position is None:
+            return None
+        start = self._sections[law_title][position]
+        return None if start is None or start == position else self._laws[law_title][start]
+
+    # ➕ uuids to add for the ranked hits: each hit's section opener, then its neighbors
+    def expand(self, articles, around=NEIGHBOR_SPAN, limit=NEIGHBOR_MAX):
+        seen = {str(obj.uuid) for obj in articles}
+        extra = []
+        for obj in articles:
+            law_title = obj.properties.get("law_title", "")
+            article_number = obj.properties.get("article_number", "")
+            for uuid in [self.section_head(law_title, article_number)] + self.neighbors(law_title, article_number, around):
+                if uuid is not None and uuid not in seen:
+                    seen.add(uuid)
+                    extra.append(uuid)
+        return extra[:limit]
+
+
+def _entries(articles):
+    return (
+        (a["uuid"], a["properties"].get("law_title", ""), a["properties"].get("article_number", ""))
+        for a in articles
+        if a["properties"].get("article_title") != METADATA_TITLE
+    )
+
+
+_adjacency = None
+_adjacency_source = None
+_adjacency_due = 0.0       # monotonic time the next remote build is due
+_adjacency_building = False
+_adjacency_lock = threading.Lock()
+_builds = set()            # running async builds (asyncio keeps only weak references to tasks)
+
+
+def _remote_query():
+    return dict(return_properties=["law_title", "article_number", "article_title"])
+
+
+def _remote_entry(obj):
+    properties = obj.properties
+    return str(obj.uuid), properties.get("law_title", ""), properties.get("article_number", ""), properties.get("article_title")
+
+
+# The local index's adjacency, or the remote-built one (possibly stale, None before the
+# first build). The second value is True for the one caller that must start a remote build.
+def _current(can_build):
+    global _adjacency, _adjacency_source, _adjacency_building
+    local_index = get_local_index()
+    with _adjacency_lock:
+        if local_index is not None:
+            if _adjacency_source is not local_index:
+                _adjacency = ArticleAdjacency(_entries(local_index.articles))
+                _adjacency_source = local_index
+            return _adjacency, False
+        adjacency = _adjacency if _adjacency_source == "remote" else None
+        build = can_build and not _adjacency_building and time.monotonic() >= _adjacency_due
+        _adjacency_building = _adjacency_building or build
+        return adjacency, build
+
+
+# Installs a finished build; rows=None records a failed one
+def _built(rows):
+    global _adjacency, _adjacency_source, _adjacency_due, _adjacency_building
+    adjacency = None
+    if rows is not None:
+        adjacency = ArticleAdjacency((uuid, law_title, number) for uuid, law_title, number, title in rows if title != METADATA_TITLE)
+    with _adjacency_lock:
+        _adjacency_building = False
+        if adjacency is None:
+            _adjacency_due = time.monotonic() + ADJACENCY_RETRY
+            return None
+        _adjacency, _adjacency_source, _adjacency_due = adjacency, "remote", time.monotonic() + ADJACENCY_REFRESH
+    return adjacency
+
+
+# 🏗️ Remote build from the calling thread (background builds, scripts); None when it failed
+def build_adjacency(client):
+    rows = None
+    try:
+        collection = client.collections.get(COLLECTION)
+        rows = SCAN.call(lambda timeout: [_remote_entry(obj) for obj in collection.iterator(**_remote_query())])
+    except Exception as e:
+        logger.warning("adjacency index build failed (%s), retrying in %.0fs", e, ADJACENCY_RETRY)
+    finally:
+        adjacency = _built(rows)
+    return adjacency
+
+
+async def _scan(collection):
+    return [_remote_entry(obj) async for obj in collection.iterator(**_remote_query())]
+
+
+async def build_adjacency_async(client):
+    rows = None
+    try:
+        collection = client.collections.get(COLLECTION)
+        rows = await SCAN.acall(lambda timeout: _scan(collection))
+    except Exception as e:
+        logger.warning("adjacency index build failed (%s), retrying in %.0fs", e, ADJACENCY_RETRY)
+    finally:
+        adjacency = _built(rows)
+    return adjacency
+
+
+# 🔁 Process-wide adjacency index (see the header for where it comes from)
+def get_adjacency(client=None):
+    adjacency, build = _current(client is not None)
+    if build:
+        threading.Thread(target=build_adjacency, args=(client,), name="adjacency", daemon=True).start()
+    return adjacency
+
+
+async def get_adjacency_async(client=None):
+    adjacency, build = _current(client is not None)
+    if build:
+        task = asyncio.create_task(build_adjacency_async(client))
+        _builds.add(task)
+        task.add_done_callback(_builds.discard)
+    return adjacency
+
+
+def _by_id_query(uuids):
+    from weaviate.classes.query import Filter
+
+    return dict(filters=Filter.by_id().contains_any(uuids), limit=len(uuids), return_properties=PROPERTIES)
+
+
+def _from_local_index(uuids):
+    local_index = get_local_index()
+    found = {}
+    if local_index is not None:
+        for uuid in uuids:
+            obj = local_index.get(uuid)
+            if obj is not None:
+                found[uuid] = obj
+    return found
+
+
+# 🛡️ Expansion is an extra: when the fetch gives up, the answer goes on with the ranked hits
+def _unexpanded(articles, error):
+    logger.warning("neighbor fetch failed (%s), answering with the unexpanded hits", error)
+    record("degraded.expand_neighbors", 0.0)
+    return articles
+
+
+# 📚 Ranked hits followed by their section openers / neighbors, in expansion order
+def expand_neighbors(client, articles, around=NEIGHBOR_SPAN, limit=NEIGHBOR_MAX):
+    if not articles or limit <= 0:
+        return articles
+    with stage("expand_neighbors") as span:
+        adjacency = get_adjacency(client)
+        uuids = adjacency.expand(articles, around, limit) if adjacency is not None else []
+        found = _from_local_index(uuids)
+        missing = [uuid for uuid in uuids if uuid not in found]
+        span.cache_hit = not missing
+        if missing:
+            query = client.collections.get(COLLECTION).query
+            try:
+                results = SEARCH.call(lambda timeout: query.fetch_objects(**_by_id_query(missing)))
+            except Exception as e:
+                return _unexpanded(articles, e)
+            found.update((str(obj.uuid), obj) for obj in results.objects)
+    return articles + [found[uuid] for uuid in uuids if uuid in found]
+
+
+async def expand_neighbors_async(client, articles, around=NEIGHBOR_SPAN, limit=NEIGHBOR_MAX):
+    if not articles or limit <= 0:
+        return articles
+    with stage("expand_neighbors") as span:
+        adjacency = await get_adjacency_async(client)
+        uuids = adjacency.expand(articles, around, limit) if adjacency is not None else []
+        found = _from_local_index(uuids)
+        missing = [uuid for uuid in uuids if uuid not in found]
+        span.cache_hit = not missing
+        if missing:
+            query = client.collections.get(COLLECTION).query
+            try:
+                results = await SEARCH.acall(lambda timeout: query.fetch_objects(**_by_id_query(missing)))
+            except Exception as e:
+                return _unexpanded(articles, e)
+            found.update((str(obj.uuid), obj) for obj in results.objects)
+    return articles + [found[uuid] for uuid in uuids if uuid in found]
@@ -0,0 +1,124 @@
+import array
+import hashlib
+import math
+import operator
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 💾 Semantic answer cache.
+# A past answer is reused when a new question (a) retrieved exactly the same set of
+# LawArticle objects, with unchanged text, for the same pipeline variant, and (b) has a
+# query embedding whose cosine similarity to the cached question is above a threshold.
+# Entries are bucketed by that article-set key, so a lookup only compares vectors
+# against the handful of answers that were generated from the same articles. Edited
+# articles need no explicit invalidation: their new text hash is a different key, and
+# the stale entries age out through the TTL and the LRU bound.
+
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+DEFAULT_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 60 * 60)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+def _unit(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array.array("f", (x / norm for x in vector))
+
+
+def _dot(a, b):
+    return sum(map(operator.mul, a, b))
+
+
+def _article_id(obj):
+    return str(obj.uuid)
+
+
+# 🔑 Article-set key: ids plus a hash of each article's text, so edited articles miss
+def article_set_key(articles, variant=""):
+    digest = hashlib.sha1(variant.encode("utf-8"))
+    for article_id, text in sorted((_article_id(o), o.properties.get("text", "")) for o in articles):
+        digest.update(article_id.encode("utf-8"))
+        digest.update(hashlib.sha1(text.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # entry id -> (set key, unit vector, answer, created_at)
+        self._buckets = {}             # set key -> {entry id}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, vector, articles, variant=""):
+        set_key = article_set_key(articles, variant)
+        query = _unit(vector)
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._buckets.get(set_key, ())):
+                _, cached_vector, _, created_at = self._entries[entry_id]
+                if now - created_at > self.ttl_seconds:
+                    self._drop(entry_id)
+                    continue
+                score = _dot(query, cached_vector)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def store(self, vector, articles, answer, variant=""):
+        set_key = article_set_key(articles, variant)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (set_key, _unit(vector), answer, time.time())
+            self._buckets.setdefault(set_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _drop(self, entry_id):
+        set_key, _, _, _ = self._entries.pop(entry_id)
+        bucket = self._buckets.get(set_key)
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[set_key]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# 🔁 One answer cache per process, shared by every Streamlit session
+def get_answer_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache()
+        return _cache
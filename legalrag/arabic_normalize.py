@@ -0,0 +1,42 @@
+import re
+
+# 🔤 Arabic query normalization.
+# Collapses spelling variants that do not change the meaning of a question so that
+# equivalent questions share one embedding and one cache entry. Everything is built
+# once at import time: normalization is a single str.translate() plus one regex pass.
+
+_DIACRITICS = (
+    [chr(c) for c in range(0x064B, 0x0653)]    # tanween, harakat, shadda, sukun
+    + [chr(c) for c in range(0x0610, 0x061B)]  # Quranic annotation signs
+    + [chr(c) for c in range(0x06D6, 0x06EE)]  # Quranic small high/low marks
+    + ["\u0670", "\u0640"]                    # superscript alef, tatweel
+)
+
+# Marks that never change a word; letter forms are left alone
+_FOLDING = {ord(c): None for c in _DIACRITICS}
+_FOLDING.update({0x0660 + i: str(i) for i in range(10)})  # Arabic-Indic digits
+_FOLDING.update({0x06F0 + i: str(i) for i in range(10)})  # Extended (Persian) digits
+_FOLDING.update({ord(c): None for c in "\u200c\u200d\u200e\u200f"})  # zero-width joiners, bidi marks
+
+_TRANSLATION = dict(_FOLDING)
+_TRANSLATION.update({ord(c): "ا" for c in "أإآٱ"})
+_TRANSLATION.update({ord("ة"): "ه", ord("ى"): "ي"})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+# ✨ Text used for embedding / caching
+def normalize_arabic(text):
+    return _WHITESPACE_RE.sub(" ", text.translate(_TRANSLATION)).strip()
+
+
+# 🔎 Text used for keyword (BM25) search and rephrasing: Weaviate tokenizes the stored
+# articles as written, so ة / ى / أ must reach it unchanged ("المدنية", not "المدنيه")
+def fold_arabic(text):
+    return _WHITESPACE_RE.sub(" ", text.translate(_FOLDING)).strip()
+
+
+# 🔑 Canonical cache key: normalized, punctuation-free, case-folded
+def canonical_key(text):
+    return _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", normalize_arabic(text))).strip().casefold()
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+
+from . import clients
+from .adjacency import expand_neighbors_async
+from .answer_cache import get_answer_cache
+from .arabic_normalize import fold_arabic, normalize_arabic
+from .context_builder import build_context
+from .embedding_cache import get_embedding_cache
+from .embeddings import embedding_cache_model, embedding_request
+from .metrics import record, stage, timed_astream
+from .pipeline import CHAT_MODEL, REPHRASE_MODEL, VARIANTS, rank_plan
+from .prompts import REPHRASE_TEMPLATE
+from .resilience import CHAT, DEGRADED_ANSWER, EMBED, REPHRASE, UpstreamError, is_degraded
+from .retrieval import REPHRASE_TIMEOUT, arun_plan, merge_rephrased, retrieve_plan, worth_searching
+from .singleflight import AsyncSingleFlight
+
+# ⚡ asyncio twin of pipeline.RagEngine for the HTTP API (server.py).
+# Same steps, prompts, caches and retrieval rules, but every upstream call is awaited on
+# AsyncOpenAI / the async Weaviate client, so one event loop serves many questions while
+# they wait on the network. Each upstream sits behind its own semaphore so a burst of
+# requests queues here instead of tripping provider rate limits or exhausting the pools.
+# Search and reranking run the retrieval plans of retrieval.py / pipeline.py (only the
+# awaiting is done here); reranking and embedding-cache disk reads and writes (SQLite) go
+# to worker threads, while the local index, answer cache and embedding memory tier stay inline.
+# Identical embed / retrieve / generate calls in flight are coalesced (singleflight.py), and
+# every upstream call goes through the deadline / retry / hedging policy of resilience.py.
+
+EMBED_CONCURRENCY = int(os.getenv("OPENAI_EMBED_CONCURRENCY", "16"))
+CHAT_CONCURRENCY = int(os.getenv("OPENAI_CHAT_CONCURRENCY", "32"))
+WEAVIATE_CONCURRENCY = int(os.getenv("WEAVIATE_CONCURRENCY", "32"))
+
+
+# 🔌 Async clients plus one concurrency limit per upstream and the in-flight registry,
+# shared by every variant
+class Upstreams:
+    def __init__(self, settings):
+        self.settings = settings
+        self.openai = None
+        self.weaviate = None
+        self.flights = AsyncSingleFlight()
+        self.embed_slots = asyncio.Semaphore(EMBED_CONCURRENCY)
+        self.chat_slots = asyncio.Semaphore(CHAT_CONCURRENCY)
+        self.weaviate_slots = asyncio.Semaphore(WEAVIATE_CONCURRENCY)
+
+    async def start(self):
+        self.openai = clients.make_async_openai_client(self.settings.openai_api_key)
+        self.weaviate = await clients.connect_async_weaviate(self.settings.weaviate_url, self.settings.weaviate_api_key)
+
+    # Per-attempt client for calls made through resilience.py, which owns retries and deadlines
+    def openai_for(self, timeout):
+        return self.openai.with_options(timeout=timeout, max_retries=0)
+
+    async def close(self):
+        if self.weaviate is not None:
+            await self.weaviate.close()
+        if self.openai is not None:
+            await self.openai.close()
+
+
+class AsyncRagEngine:
+    def __init__(self, upstreams, variant="app"):
+        self.upstreams = upstreams
+        self.variant = VARIANTS[variant] if isinstance(variant, str) else variant
+        self.embedding_cache = get_embedding_cache()
+        self.answer_cache = get_answer_cache()
+
+    async def embed_query(self, text):
+        with stage("embed_query") as span:
+            cache = self.embedding_cache
+            vector = cache.peek(text, embedding_cache_model())
+            if vector is None and cache.persistent:
+                vector = await asyncio.to_thread(cache.get, text, embedding_cache_model())
+            elif vector is None:
+                vector = cache.get(text, embedding_cache_model())
+            span.cache_hit = vector is not None
+            # 🔗 Joining another caller's flight stays a miss (counted in "singleflight.embed")
+            if vector is None:
+                vector = await self.upstreams.flights.do(("embed", embedding_cache_model(), text), lambda: self._fetch_embedding(text, span))
+            return vector
+
+    async def _fetch_embedding(self, text, span):
+        async with self.upstreams.embed_slots:
+            response = await EMBED.acall(lambda timeout: self.upstreams.openai_for(timeout).embeddings.create(input=text, **embedding_request()))
+        span.tokens = response.usage.total_tokens
+        vector = response.data[0].embedding
+        # SQLite commit → off the event loop
+        await asyncio.to_thread(self.embedding_cache.put, text, embedding_cache_model(), vector)
+        return vector
+
+    async def rephrase_question(self, original):
+        with stage("rephrase_question") as span:
+            async with self.upstreams.chat_slots:
+                completion = await REPHRASE.acall(lambda timeout: self.upstreams.openai_for(timeout).chat.completions.create(
+                    model=REPHRASE_MODEL,
+                    messages=[{"role": "system", "content": REPHRASE_TEMPLATE.format(original=original)}]
+                ))
+            span.tokens = completion.usage.total_tokens
+        return completion.choices[0].message.content.strip()
+
+    def _run(self, plan):
+        return arun_plan(self.upstreams.weaviate, plan, self.upstreams.weaviate_slots)
+
+    async def _retrieve(self, query, vector, limit, law_titles=None):
+        return await self._run(retrieve_plan(query, vector, limit, law_titles, self.variant.retrieval_mode))
+
+    # Takes the question as asked (see pipeline.RagEngine.retrieve_articles)
+    async def retrieve_articles(self, question, limit=None, law_titles=None, rephrase=True):
+        query = fold_arabic(question)
+        rephrase = rephrase and self.variant.rephrase
+        key = ("retrieve", self.variant.name, query, limit, tuple(law_titles or ()), rephrase)
+        return list(await self.upstreams.flights.do(key, lambda: self._with_neighbors(query, limit, law_titles, rephrase)))
+
+    async def _with_neighbors(self, query, limit=None, law_titles=None, rephrase=False):
+        articles = await self._retrieve_articles(query, limit, law_titles, rephrase)
+        if not self.variant.expand_neighbors:
+            return articles
+        return await expand_neighbors_async(self.upstreams.weaviate, articles)
+
+    async def _retrieve_articles(self, query, limit=None, law_titles=None, rephrase=False):
+        candidates = max(limit or 0, self.variant.limit)
+        articles, vector = await self._retrieve_candidates(query, candidates, law_titles, rephrase)
+        return await self._run(rank_plan(self.variant, query, vector, articles, limit, law_titles))
+
+    # ⏩ Rephrasing overlaps embedding and the raw-question search (see retrieval.retrieve_with_rephrase)
+    async def _retrieve_candidates(self, query, limit, law_titles=None, rephrase=False):
+        deadline = time.monotonic() + REPHRASE_TIMEOUT
+        rephrased = asyncio.create_task(self.rephrase_question(query)) if rephrase else None
+        vector = await self.embed_query(normalize_arabic(query))
+        raw_articles = await self._retrieve(query, vector, limit, law_titles)
+        if rephrased is None:
+            return raw_articles, vector
+        try:
+            improved = await asyncio.wait_for(rephrased, timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            return raw_articles, vector
+        if not worth_searching(query, improved):
+            return raw_articles, vector
+        improved_articles = await self._retrieve(improved, await self.embed_query(normalize_arabic(improved)), limit, law_titles)
+        return merge_rephrased(raw_articles, improved_articles, limit), vector
+
+    def _messages(self, question, articles):
+        prompt = self.variant.prompt
+        with stage("build_context") as span:
+            context_text, context_usage = build_context(articles, header=prompt.header)
+            span.tokens = context_usage["tokens"]
+        return prompt.messages(question, context_text)
+
+    # 🛬 The same question over the same articles shares one completion
+    def _flight_key(self, question, articles):
+        return (self.variant.name, normalize_arabic(question), tuple(str(o.uuid) for o in articles))
+
+    async def generate_answer(self, question, articles):
+        messages = self._messages(question, articles)
+        return await self.upstreams.flights.do(("answer", *self._flight_key(question, articles)), lambda: self._chat(messages))
+
+    # 🛡️ Degrades to DEGRADED_ANSWER when the chat upstream gives up (see pipeline.RagEngine._chat)
+    async def _chat(self, messages):
+        started = time.perf_counter_ns()
+        try:
+            async with self.upstreams.chat_slots:
+                completion = await CHAT.acall(lambda timeout: self.upstreams.openai_for(timeout).chat.completions.create(model=CHAT_MODEL, messages=messages))
+        except UpstreamError:
+            record("degraded.generate_answer", (time.perf_counter_ns() - started) / 1e9)
+            return DEGRADED_ANSWER
+        record("generate_answer", (time.perf_counter_ns() - started) / 1e9, tokens=completion.usage.total_tokens)
+        return completion.choices[0].message.content.strip()
+
+    # 🌊 Async generator of text deltas, fanned out to every identical request in flight
+    async def stream_answer(self, question, articles):
+        messages = self._messages(question, articles)
+        started = time.perf_counter_ns()
+        key = ("answer_stream", *self._flight_key(question, articles))
+        async for delta in timed_astream("generate_answer", self.upstreams.flights.stream(key, lambda: self._chat_stream(messages)), started):
+            yield delta
+
+    # The chat slot is held until the stream ends or every reader is gone
+    async def _chat_stream(self, messages):
+        async with self.upstreams.chat_slots:
+            started = time.perf_counter_ns()
+            try:
+                stream = await CHAT.acall(lambda timeout: self.upstreams.openai_for(timeout).chat.completions.create(
+                    model=CHAT_MODEL, messages=messages, stream=True
+                ))
+            except UpstreamError:
+                record("degraded.generate_answer", (time.perf_counter_ns() - started) / 1e9)
+                yield DEGRADED_ANSWER
+                return
+            try:
+                async for delta in self._deltas(stream):
+                    yield delta
+            finally:
+                await stream.close()
+
+    @staticmethod
+    async def _deltas(stream):
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    async def cached_answer(self, normalized_question, articles):
+        vector = await self.embed_query(normalized_question)
+        with stage("answer_cache") as span:
+            answer = self.answer_cache.lookup(vector, articles, variant=self.variant.name)
+            span.cache_hit = answer is not None
+        return answer
+
+    async def remember_answer(self, normalized_question, articles, answer):
+        if is_degraded(answer):
+            return
+        self.answer_cache.store(await self.embed_query(normalized_question), articles, answer, variant=self.variant.name)
+
+    async def answer(self, question, law_titles=None):
+        normalized_question = normalize_arabic(question)
+        articles = await self.retrieve_articles(question, law_titles=law_titles)
+        if not articles:
+            return None, []
+        answer = await self.cached_answer(normalized_question, articles)
+        if answer is None:
+            answer = await self.generate_answer(question, articles)
+            await self.remember_answer(normalized_question, articles, answer)
+        return answer, articles
@@ -0,0 +1,183 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .arabic_normalize import normalize_arabic
+from .pipeline import EMBEDDING_BATCH_SIZE, VARIANTS, RagEngine, Settings
+from .resilience import is_degraded
+
+# 📦 Batch question answering for regression sets, FAQ pre-generation and prompt
+# comparisons. Questions are embedded in large embeddings.create batches, then
+# answered by a bounded worker pool; chat completions share a requests-per-minute
+# limiter. Every result is appended to the output JSONL as soon as it is ready, and
+# questions already answered there are skipped when the run is restarted.
+#
+#   python -m legalrag.batch questions.jsonl -o answers.jsonl --variant app2 --workers 8 --rpm 300
+#
+# Input: JSONL ({"id", "question", "law_titles"}) or CSV with the same columns;
+# only "question" is required, ids default to the line number.
+
+
+# 🚦 Token bucket shared by all workers: at most `per_minute` acquisitions per minute
+class RateLimiter:
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or max(1, int(self.rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _law_titles(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = [t.strip() for t in value.split("|")]
+    return [t for t in value if t] or None
+
+
+def read_questions(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, 1):
+            question = (row.get("question") or "").strip()
+            if question:
+                yield {
+                    "id": str(row.get("id") or number),
+                    "question": question,
+                    "law_titles": _law_titles(row.get("law_titles")),
+                }
+
+
+# ♻️ Ids already answered in a previous run (failed questions are retried)
+def completed_ids(output_path):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            if "error" not in result:
+                done.add(result["id"])
+    return done
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def answer_one(engine, item):
+    started = time.perf_counter()
+    result = {"id": item["id"], "question": item["question"], "variant": engine.variant.name}
+    try:
+        answer, articles = engine.answer(item["question"], law_titles=item["law_titles"])
+        if is_degraded(answer):
+            result["error"] = "generation unavailable (retrieval-only answer)"  # retried on the next run
+        result["answer"] = answer
+        result["articles"] = [
+            {"law_title": a.properties.get("law_title"), "article_number": a.properties.get("article_number")}
+            for a in articles
+        ]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# ▶️ Answer every question not yet in `output_path`; returns a summary dict
+def run_batch(engine, questions, output_path, workers=8, embed_batch=EMBEDDING_BATCH_SIZE, progress=None):
+    done = completed_ids(output_path)
+    summary = {"skipped": 0, "answered": 0, "failed": 0}
+    write_lock = threading.Lock()
+    # Bounded hand-off: the next embedding batch is fetched while the pool is still busy,
+    # but at most one batch is queued behind the running workers
+    in_flight = threading.BoundedSemaphore(workers + embed_batch)
+    started = time.perf_counter()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(workers, thread_name_prefix="batch") as pool:
+
+        def work(item):
+            try:
+                result = answer_one(engine, item)
+                with write_lock:
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    summary["failed" if "error" in result else "answered"] += 1
+                    if progress:
+                        progress(summary)
+            finally:
+                in_flight.release()
+
+        def pending():
+            for item in questions:
+                if item["id"] in done:
+                    summary["skipped"] += 1
+                else:
+                    yield item
+
+        for chunk in _chunks(pending(), embed_batch):
+            try:
+                engine.embed_many([normalize_arabic(q["question"]) for q in chunk], embed_batch)
+            except Exception:
+                pass  # each question falls back to its own embedding call (and reports its own error)
+            for item in chunk:
+                in_flight.acquire()
+                pool.submit(work, item)
+
+    summary["elapsed"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL/CSV file of questions in bulk.")
+    parser.add_argument("input")
+    parser.add_argument("-o", "--output", required=True, help="results JSONL (appended to; existing answers are skipped)")
+    parser.add_argument("--variant", default="app", choices=sorted(VARIANTS))
+    parser.add_argument("--workers", type=int, default=8, help="questions answered concurrently")
+    parser.add_argument("--rpm", type=float, default=300, help="chat completion requests per minute (0 = unlimited)")
+    parser.add_argument("--embed-batch", type=int, default=EMBEDDING_BATCH_SIZE, help="questions per embeddings request")
+    args = parser.parse_args()
+
+    limiter = RateLimiter(args.rpm) if args.rpm else None
+    engine = RagEngine(Settings.from_env(), args.variant, rate_limiter=limiter)
+
+    def progress(summary):
+        print(f"\r✅ {summary['answered']} answered, ❌ {summary['failed']} failed", end="", flush=True)
+
+    summary = run_batch(engine, read_questions(args.input), args.output, args.workers, args.embed_batch, progress)
+    print()
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import atexit
+import threading
+import time
+
+# 🔌 Shared, process-wide clients.
+# Streamlit re-runs the app script on every interaction, but imported modules
+# stay in sys.modules, so the clients built here live for the whole process
+# and are shared by every session instead of being reopened on each rerun.
+# The SDKs are imported on first use so importing the package stays cheap.
+
+HEALTH_CHECK_INTERVAL = 30  # seconds between readiness probes of a cached client
+
+# Each client has its own lock, held only to read or swap the cached client; the
+# Weaviate probe / reconnect runs outside it, one refresh at a time
+_weaviate_lock = threading.Lock()
+_weaviate_refresh = threading.Lock()
+_openai_lock = threading.Lock()
+_weaviate_client = None
+_weaviate_key = None
+_weaviate_checked_at = 0.0
+_openai_client = None
+_openai_key = None
+
+
+def _weaviate_config():
+    from weaviate.classes.init import AdditionalConfig, Timeout
+    from weaviate.config import ConnectionConfig
+
+    return AdditionalConfig(
+        connection=ConnectionConfig(
+            session_pool_connections=20,
+            session_pool_maxsize=100,
+            session_pool_max_retries=3,
+        ),
+        timeout=Timeout(init=10, query=30, insert=120),
+    )
+
+
+def _connect_weaviate(url, api_key):
+    import weaviate
+    from weaviate.classes.init import Auth
+
+    return weaviate.connect_to_weaviate_cloud(
+        cluster_url=url,
+        auth_credentials=Auth.api_key(api_key),
+        additional_config=_weaviate_config(),
+    )
+
+
+def _is_healthy(client):
+    try:
+        return client.is_connected() and client.is_ready()
+    except Exception:
+        return False
+
+
+def _close_quietly(client):
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+# 🗄️ Weaviate: one connection (HTTP pool + gRPC channel) per process
+def get_weaviate_client(url, api_key):
+    with _weaviate_lock:
+        client, key, checked_at = _weaviate_client, _weaviate_key, _weaviate_checked_at
+    current = client is not None and key == (url, api_key)
+    if current and time.monotonic() - checked_at <= HEALTH_CHECK_INTERVAL:
+        return client
+
+    # While another thread probes or reconnects, keep serving the client we have
+    if not _weaviate_refresh.acquire(blocking=not current):
+        return client
+    try:
+        return _refresh_weaviate(url, api_key)
+    finally:
+        _weaviate_refresh.release()
+
+
+def _refresh_weaviate(url, api_key):
+    global _weaviate_client, _weaviate_key, _weaviate_checked_at
+
+    with _weaviate_lock:
+        client, key, checked_at = _weaviate_client, _weaviate_key, _weaviate_checked_at
+    current = client is not None and key == (url, api_key)
+    if current and time.monotonic() - checked_at <= HEALTH_CHECK_INTERVAL:
+        return client  # refreshed by the thread we waited for
+    if current and _is_healthy(client):
+        with _weaviate_lock:
+            _weaviate_checked_at = time.monotonic()
+        return client
+
+    # ♻️ Stale channel or changed credentials (e.g. secrets edited) → reconnect, then swap
+    fresh = _connect_weaviate(url, api_key)
+    with _weaviate_lock:
+        stale = _weaviate_client
+        _weaviate_client, _weaviate_key, _weaviate_checked_at = fresh, (url, api_key), time.monotonic()
+    if stale is not None:
+        _close_quietly(stale)
+    return fresh
+
+
+# 🤖 OpenAI: one client with a pooled keep-alive HTTP session per process
+def get_openai_client(api_key):
+    global _openai_client, _openai_key
+
+    with _openai_lock:
+        if _openai_client is not None and _openai_key != api_key:
+            _close_quietly(_openai_client)
+            _openai_client = None
+
+        if _openai_client is None:
+            import httpx
+            import openai
+
+            _openai_client = openai.OpenAI(
+                api_key=api_key,
+                timeout=60,
+                max_retries=2,
+                http_client=openai.DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                ),
+            )
+            _openai_key = api_key
+
+        return _openai_client
+
+
+# ⚡ Async clients for the HTTP API. They are bound to the event loop that creates
+# them, so the server owns and closes them instead of sharing them process-wide.
+def make_async_openai_client(api_key):
+    import httpx
+    import openai
+
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        timeout=60,
+        max_retries=2,
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        ),
+    )
+
+
+async def connect_async_weaviate(url, api_key):
+    import weaviate
+    from weaviate.classes.init import Auth
+
+    client = weaviate.use_async_with_weaviate_cloud(
+        cluster_url=url,
+        auth_credentials=Auth.api_key(api_key),
+        additional_config=_weaviate_config(),
+    )
+    await client.connect()
+    return client
+
+
+# 🧹 Close everything on interpreter shutdown
+def close_clients():
+    global _weaviate_client, _openai_client
+
+    with _weaviate_lock:
+        if _weaviate_client is not None:
+            _close_quietly(_weaviate_client)
+            _weaviate_client = None
+    with _openai_lock:
+        if _openai_client is not None:
+            _close_quietly(_openai_client)
+            _openai_client = None
+
+
+atexit.register(close_clients)
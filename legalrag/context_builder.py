@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import os
+
+from .arabic_normalize import canonical_key
+
+# 📏 Token-budgeted context assembly for generate_answer.
+# Articles are added in relevance order until CONTEXT_TOKEN_BUDGET is spent: duplicate
+# or overlapping chunks of the same law are skipped, the first article that does not
+# fit is truncated to the remaining budget, and later articles that still do not fit
+# are dropped.
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+MIN_TRUNCATED_TOKENS = 80  # below this a truncated article is not worth sending
+CHARS_PER_TOKEN = 3        # fallback estimate for Arabic text when tiktoken is absent
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional
+    _encoding = None
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        text = _encoding.decode(tokens[:max_tokens])
+    elif len(text) > max_tokens * CHARS_PER_TOKEN:
+        text = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        return text
+    # ✂️ Cut back to the last sentence / line boundary when there is one nearby
+    cut = max(text.rfind("."), text.rfind("،"), text.rfind("\n"))
+    if cut > len(text) * 0.6:
+        text = text[:cut + 1]
+    return text.rstrip() + " …"
+
+
+def default_header(o):
+    return f"المادة {o.properties.get('article_number', '')}: {o.properties.get('article_title', '')}"
+
+
+# 🔁 Same law and one text contained in the other; an empty text overlaps nothing
+def _overlaps(text, law_title, kept):
+    key = canonical_key(text)
+    if not key:
+        return False
+    for other_law, other_key in kept:
+        if other_law == law_title and other_key and (key in other_key or other_key in key):
+            return True
+    return False
+
+
+def build_context(articles, header=default_header, budget=CONTEXT_TOKEN_BUDGET, separator="\n\n"):
+    parts = []
+    kept = []
+    seen = set()
+    used = 0
+    report = {"budget": budget, "included": 0, "truncated": 0, "dropped": 0, "duplicates": 0}
+    separator_tokens = count_tokens(separator)
+
+    for o in articles:
+        law_title = o.properties.get("law_title", "")
+        text = o.properties.get("text", "")
+        fingerprint = hashlib.sha1(f"{law_title}\x00{o.properties.get('article_number', '')}\x00{text}".encode("utf-8")).digest()
+        if fingerprint in seen or _overlaps(text, law_title, kept):
+            report["duplicates"] += 1
+            continue
+
+        head = header(o)
+        cost = count_tokens(f"{head}\n{text}") + (separator_tokens if parts else 0)
+        remaining = budget - used
+        if cost > remaining:
+            body_budget = remaining - count_tokens(head) - separator_tokens - 1
+            if report["truncated"] or body_budget < MIN_TRUNCATED_TOKENS:
+                report["dropped"] += 1
+                continue
+            text = truncate_to_tokens(text, body_budget)
+            cost = count_tokens(f"{head}\n{text}") + (separator_tokens if parts else 0)
+            report["truncated"] += 1
+
+        seen.add(fingerprint)
+        kept.append((law_title, canonical_key(o.properties.get("text", ""))))
+        parts.append(f"{head}\n{text}")
+        used += cost
+        report["included"] += 1
+
+    report["tokens"] = used
+    logger.info("context: %(tokens)d/%(budget)d tokens, %(included)d included, %(truncated)d truncated, "
+                "%(dropped)d dropped, %(duplicates)d duplicates", report)
+    return separator.join(parts), report
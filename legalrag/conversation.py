@@ -0,0 +1,105 @@
+import os
+
+from .arabic_normalize import fold_arabic
+from .context_builder import CONTEXT_TOKEN_BUDGET, build_context, count_tokens, truncate_to_tokens
+
+# 💬 Per-session conversation state for multi-turn mode (kept in st.session_state).
+# The legal context is append-only: a follow-up adds the articles the session does not
+# hold yet after the ones already sent, so instructions + earlier context stay a
+# byte-identical prompt prefix that the provider serves from its prompt cache. Earlier
+# turns are kept compact (last HISTORY_TURNS, answers cut to HISTORY_ANSWER_TOKENS).
+# When the context would outgrow SESSION_CONTEXT_BUDGET it is rebuilt from the current
+# turn's articles (one cache miss) instead of growing without bound.
+#
+# A turn's articles join the context only once it was answered (not degraded), and a
+# follow-up adds at most SESSION_TURN_ARTICLES articles the session does not hold yet:
+# its best new ones, after the session's articles it ranks on top. The context it sends
+# is the cached prefix plus that small delta, so a follow-up bills fewer tokens than
+# asking the same question on its own.
+#
+# SESSION_DEPTH=adaptive (default) cuts each turn's articles with the adaptive depth like a
+# single question (rerank.py). That keeps prompts small, but a short session context stays
+# under the provider's 1024-token prompt-cache threshold, so the first follow-up is sent
+# uncached. SESSION_DEPTH=fixed keeps the fixed RERANK_TOP_N cut for session turns: larger
+# opening prompts, but follow-ups reuse a cached prefix and answer sooner.
+
+SESSION_DEPTH = os.getenv("SESSION_DEPTH", "adaptive")
+SESSION_CONTEXT_BUDGET = int(os.getenv("SESSION_CONTEXT_BUDGET", str(2 * CONTEXT_TOKEN_BUDGET)))
+SESSION_TURN_ARTICLES = int(os.getenv("SESSION_TURN_ARTICLES", "1"))
+HISTORY_TURNS = int(os.getenv("HISTORY_TURNS", "4"))
+HISTORY_ANSWER_TOKENS = int(os.getenv("HISTORY_ANSWER_TOKENS", "400"))
+CONTEXT_SEPARATOR = "\n\n"
+
+
+class Conversation:
+    def __init__(self, budget=SESSION_CONTEXT_BUDGET):
+        self.budget = budget
+        self.articles = []      # every article in the context, in the order it was added
+        self.context_text = ""
+        self.context_tokens = 0
+        self.turns = []         # (question, normalized_question, compact answer)
+        self.last = None        # (question, articles, full answer) of the latest turn
+
+    def known(self):
+        return {str(obj.uuid) for obj in self.articles}
+
+    # 🔎 Follow-ups are often elliptical ("وماذا لو كان المستأجر...") → search with the previous question too
+    def search_query(self, question):
+        if not self.turns:
+            return fold_arabic(question)
+        return fold_arabic(f"{self.turns[-1][0]} {question}")
+
+    # ✂️ A follow-up's articles with at most `limit` the context does not hold yet
+    def capped(self, articles, limit=SESSION_TURN_ARTICLES):
+        known = self.known()
+        new = [obj for obj in articles if str(obj.uuid) not in known][:limit]
+        kept = known.union(str(obj.uuid) for obj in new)
+        return [obj for obj in articles if str(obj.uuid) in kept]
+
+    # The context with the turn's articles it does not hold yet appended, as
+    # (context_text, context_tokens, articles, tokens added); the session is left as is
+    def _extended(self, articles, header):
+        known = self.known()
+        delta = [obj for obj in articles if str(obj.uuid) not in known]
+        if not delta:
+            return self.context_text, self.context_tokens, self.articles, 0
+
+        separator_tokens = count_tokens(CONTEXT_SEPARATOR) if self.context_text else 0
+        text, usage = build_context(delta, header=header, budget=self.budget - self.context_tokens - separator_tokens)
+        if usage["truncated"] or usage["dropped"]:
+            # Out of room: start a new prefix from what this turn needs
+            context_text, usage = build_context(articles, header=header)
+            return context_text, usage["tokens"], list(articles), usage["tokens"]
+
+        if not text:
+            return self.context_text, self.context_tokens, self.articles + delta, 0
+        context_text = f"{self.context_text}{CONTEXT_SEPARATOR}{text}" if self.context_text else text
+        added = usage["tokens"] + separator_tokens
+        return context_text, self.context_tokens + added, self.articles + delta, added
+
+    # 👀 The context a turn over `articles` is answered with; returns (context_text, tokens added)
+    def preview_context(self, articles, header):
+        context_text, _, _, added = self._extended(articles, header)
+        return context_text, added
+
+    # ➕ Keep the turn's articles in the context (once it was answered); returns the tokens added
+    def extend_context(self, articles, header):
+        self.context_text, self.context_tokens, self.articles, added = self._extended(articles, header)
+        return added
+
+    def history(self):
+        return [(question, answer) for question, _, answer in self.turns[-HISTORY_TURNS:]]
+
+    def messages(self, prompt, question, context_text=None):
+        return prompt.conversation_messages(self.context_text if context_text is None else context_text, self.history(), question)
+
+    def add_turn(self, question, normalized_question, articles, answer):
+        self.turns.append((question, normalized_question, truncate_to_tokens(answer, HISTORY_ANSWER_TOKENS)))
+        del self.turns[:-HISTORY_TURNS]
+        self.last = (question, articles, answer)
+
+    # 🔁 Streamlit reruns the script with the same input → replay the last turn instead of asking again
+    def replay(self, question):
+        if self.last is not None and self.last[0] == question:
+            return self.last
+        return None
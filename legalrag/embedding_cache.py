@@ -0,0 +1,169 @@
+import array
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .arabic_normalize import canonical_key
+
+# 🧊 Two-tier query-embedding cache: in-process LRU in front of an on-disk SQLite store.
+# Vectors are kept as packed float32 buffers (12 KB for a 3072-dim vector instead of
+# ~100 KB as a list of Python floats), keyed by model + canonical query key.
+
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+def _cache_key(text, model):
+    return hashlib.sha1(f"{model}\x00{canonical_key(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()  # memory tier and counters
+        self._db_lock = threading.Lock()  # SQLite; a slow disk never holds up memory hits
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, vector BLOB, size INTEGER, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db.commit()
+
+    # 🔎 Lookup: memory first, then disk (promoting disk hits into memory)
+    def get(self, text, model):
+        vector = self.peek(text, model)
+        if vector is not None:
+            return vector
+        key = _cache_key(text, model)
+        vector = self._load(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self._remember(key, vector)
+            self.disk_hits += 1
+        return vector.tolist()
+
+    # Memory tier only: never touches SQLite, so it is safe on an event loop (a miss is
+    # counted by the get() that follows it)
+    def peek(self, text, model):
+        key = _cache_key(text, model)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is None:
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector.tolist()
+
+    @property
+    def persistent(self):
+        return self._db is not None
+
+    def _load(self, key):
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        vector = array.array("f")
+        vector.frombytes(row[0])
+        return vector
+
+    def put(self, text, model, embedding):
+        key = _cache_key(text, model)
+        vector = array.array("f", embedding)
+        with self._lock:
+            self._remember(key, vector)
+        with self._db_lock:
+            if self._db is not None:
+                blob = vector.tobytes()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, blob, len(blob), time.time()),
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def get_or_embed(self, text, model, embed_fn):
+        embedding = self.get(text, model)
+        if embedding is None:
+            embedding = embed_fn(text)
+            self.put(text, model, embedding)
+        return embedding
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    # 🧹 Size-based eviction (least recently used first)
+    def _remember(self, key, vector):
+        size = vector.itemsize * len(vector)
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.itemsize * len(old)
+        self._memory[key] = vector
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.itemsize * len(evicted)
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        rows = self._db.execute("SELECT key, size FROM embeddings ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            stale.append((key,))
+            excess -= size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# 🔁 One cache per process, shared by every Streamlit session
+def get_embedding_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
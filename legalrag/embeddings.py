@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+# 📐 Embedding profile shared by the query side (pipeline, async_pipeline, batch) and
+# the corpus side (ingest, local_index).
+#
+#   EMBEDDING_DIMENSIONS=256|512|1024   → request shortened text-embedding-3-large vectors
+#                                          through the API's `dimensions` parameter
+#                                          (unset = the model's full 3072)
+#   EMBEDDING_QUANTIZATION=int8|binary   → how the local index keeps vectors in memory;
+#                                          top candidates are rescored at full precision
+#
+# Query and corpus vectors must come from the same profile: after changing
+# EMBEDDING_DIMENSIONS, re-ingest with `python -m legalrag.ingest ... --reembed`.
+# text-embedding-3 vectors can also be shortened locally (truncate + renormalize), which
+# is how the local index derives a smaller profile from full-size stored vectors.
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none")
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+def embedding_request(dimensions=EMBEDDING_DIMENSIONS):
+    if dimensions:
+        return {"model": EMBEDDING_MODEL, "dimensions": dimensions}
+    return {"model": EMBEDDING_MODEL}
+
+
+# 🔑 Cache namespace: vectors of different sizes never share cache entries
+def embedding_cache_model(dimensions=EMBEDDING_DIMENSIONS):
+    return f"{EMBEDDING_MODEL}@{dimensions}" if dimensions else EMBEDDING_MODEL
+
+
+# ✂️ Shorten unit-normalized row vectors to `dimensions` (no-op when already that size)
+def shorten(vectors, dimensions):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not dimensions or vectors.shape[-1] <= dimensions:
+        return vectors
+    vectors = vectors[..., :dimensions]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
@@ -0,0 +1,285 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid as uuidlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .context_builder import truncate_to_tokens
+from .embeddings import embedding_request
+from .local_index import COLLECTION, METADATA_TITLE, PROPERTIES
+
+# 📥 Bulk ingestion of law texts into the LawArticle collection.
+# Source files are parsed as a stream into one chunk per article plus a "LAW METADATA"
+# chunk per law. Chunks whose content hash matches what is already stored are skipped;
+# the rest are embedded with batched text-embedding-3-large requests (several batches
+# in flight) and upserted through Weaviate's dynamic batching, retrying failed objects.
+# Ids are derived from (law_title, article_number), so re-ingesting an amended law
+# overwrites its articles in place.
+#
+#   python -m legalrag.ingest laws/civil_code.txt laws/*.jsonl --prune --sync-local-index
+#
+# Text files: the first non-empty line is the law title, lines before the first
+# "المادة N" heading form the metadata chunk, and each heading starts a new article
+# (anything after the number on the heading line is taken as the article title).
+# JSONL files: one record per chunk with law_title / article_number / article_title / text.
+
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH", "128"))
+EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+EMBED_MAX_TOKENS = 8000     # per input; the model accepts 8191
+UPSERT_GROUP_SIZE = 1000    # objects held in memory per Weaviate batch before it is flushed
+MAX_ATTEMPTS = 4
+METADATA_MAX_CHARS = 4000
+HEADING_TITLE_MAX_CHARS = 60  # longer text after "المادة N" is a sentence citing an article, not a heading
+
+ID_NAMESPACE = uuidlib.UUID("6f1c1f0e-4a52-4c52-9a55-4c6177417274")
+ARTICLE_HEADING_RE = re.compile(r"^\s*(?:ال)?ماد[ةه]\s*[(\[]?\s*(\d+)\s*[)\]]?\s*[:\-–.]?\s*(.*)$")
+
+logger = logging.getLogger(__name__)
+
+
+def article_uuid(law_title, article_number):
+    return str(uuidlib.uuid5(ID_NAMESPACE, f"{law_title}\x00{article_number or METADATA_TITLE}"))
+
+
+def content_hash(properties):
+    digest = hashlib.sha1()
+    for name in PROPERTIES:
+        digest.update(str(properties.get(name) or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _chunk(law_title, article_number, article_title, lines):
+    return {
+        "law_title": law_title,
+        "article_number": article_number,
+        "article_title": article_title,
+        "text": "\n".join(lines).strip(),
+    }
+
+
+# 📄 Stream one plain-text law file into chunk dicts, article by article
+def parse_law_text(path, law_title=None):
+    preamble = []
+    current = None  # (article_number, article_title, lines)
+    with open(path, encoding="utf-8-sig") as f:
+        for raw in f:
+            line = raw.rstrip()
+            if law_title is None:
+                if line.strip():
+                    law_title = line.strip()
+                continue
+            heading = ARTICLE_HEADING_RE.match(line)
+            if heading and len(heading.group(2)) > HEADING_TITLE_MAX_CHARS:
+                heading = None
+            if heading:
+                if current is None:
+                    yield _chunk(law_title, "", METADATA_TITLE, [law_title] + preamble)
+                else:
+                    yield _chunk(law_title, *current)
+                number, title = heading.groups()
+                current = (str(int(number)), title.strip(), [f"المادة {int(number)}"])
+            elif current is None:
+                if len("\n".join(preamble)) < METADATA_MAX_CHARS:
+                    preamble.append(line)
+            else:
+                current[2].append(line)
+    if law_title is None:
+        return
+    if current is None:
+        yield _chunk(law_title, "", METADATA_TITLE, [law_title] + preamble)
+    else:
+        yield _chunk(law_title, *current)
+
+
+def parse_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield {name: str(record.get(name) or "") for name in PROPERTIES}
+
+
+def read_chunks(paths, law_title=None):
+    for path in paths:
+        if path.lower().endswith(".jsonl"):
+            yield from parse_jsonl(path)
+        else:
+            yield from parse_law_text(path, law_title)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _with_retries(fn, *args):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            delay = 2 ** attempt
+            logger.warning("attempt %d failed (%s), retrying in %ds", attempt, e, delay)
+            time.sleep(delay)
+
+
+def ensure_collection(client, name=COLLECTION):
+    if client.collections.exists(name):
+        return client.collections.get(name)
+    from weaviate.classes.config import Configure, DataType, Property
+
+    return client.collections.create(
+        name,
+        vectorizer_config=Configure.Vectorizer.none(),
+        properties=[Property(name=p, data_type=DataType.TEXT) for p in PROPERTIES],
+    )
+
+
+# 🔑 uuid → (content hash, law title) of every object already in the collection
+def stored_hashes(collection):
+    return {
+        str(obj.uuid): (content_hash(obj.properties), obj.properties.get("law_title"))
+        for obj in collection.iterator(return_properties=PROPERTIES)
+    }
+
+
+class Ingestor:
+    def __init__(self, openai_client, collection, embed_batch=EMBED_BATCH_SIZE, embed_workers=EMBED_WORKERS, dry_run=False, reembed=False):
+        self.openai = openai_client
+        self.reembed = reembed
+        self.collection = collection
+        self.embed_batch = embed_batch
+        self.embed_workers = embed_workers
+        self.dry_run = dry_run
+        self.stats = {"parsed": 0, "unchanged": 0, "embedded": 0, "upserted": 0, "failed": 0, "pruned": 0}
+        self.seen = set()
+        self.laws = set()
+
+    def _embed(self, chunks):
+        texts = [truncate_to_tokens(c["text"], EMBED_MAX_TOKENS) or c["law_title"] for c in chunks]
+        response = _with_retries(lambda: self.openai.embeddings.create(input=texts, **embedding_request()))
+        vectors = [None] * len(chunks)
+        for item in response.data:
+            vectors[item.index] = item.embedding
+        return chunks, vectors
+
+    def _upsert(self, objects):
+        attempt = 0
+        while objects:
+            attempt += 1
+            with self.collection.batch.dynamic() as batch:
+                for object_id, (properties, vector) in objects.items():
+                    batch.add_object(properties=properties, uuid=object_id, vector=vector)
+            failed = {str(e.original_uuid) for e in self.collection.batch.failed_objects}
+            self.stats["upserted"] += len(objects) - len(failed)
+            objects = {object_id: objects[object_id] for object_id in failed if object_id in objects}
+            if objects and attempt == MAX_ATTEMPTS:
+                logger.error("giving up on %d objects after %d attempts", len(objects), attempt)
+                self.stats["failed"] += len(objects)
+                return
+            if objects:
+                time.sleep(2 ** attempt)
+
+    def _changed(self, chunks, known):
+        for chunk in chunks:
+            self.stats["parsed"] += 1
+            object_id = article_uuid(chunk["law_title"], chunk["article_number"])
+            self.seen.add(object_id)
+            self.laws.add(chunk["law_title"])
+            if not self.reembed and known.get(object_id, (None,))[0] == content_hash(chunk):
+                self.stats["unchanged"] += 1
+                continue
+            yield chunk
+
+    # ▶️ Ingest a stream of chunks; embedding batches run ahead of the Weaviate upserts
+    def run(self, chunks, prune=False):
+        known = stored_hashes(self.collection)
+        pending = {}
+        with ThreadPoolExecutor(self.embed_workers, thread_name_prefix="ingest-embed") as pool:
+            in_flight = []
+            for batch in _batches(self._changed(chunks, known), self.embed_batch):
+                if self.dry_run:
+                    self.stats["embedded"] += len(batch)
+                    continue
+                in_flight.append(pool.submit(self._embed, batch))
+                if len(in_flight) >= self.embed_workers * 2:
+                    pending = self._collect(in_flight.pop(0), pending)
+            for future in in_flight:
+                pending = self._collect(future, pending)
+        if pending:
+            self._upsert(pending)
+        if prune:
+            self._prune(known)
+        return self.stats
+
+    def _collect(self, future, pending):
+        chunks, vectors = future.result()
+        self.stats["embedded"] += len(chunks)
+        for chunk, vector in zip(chunks, vectors):
+            pending[article_uuid(chunk["law_title"], chunk["article_number"])] = (chunk, vector)
+        if len(pending) >= UPSERT_GROUP_SIZE:
+            self._upsert(pending)
+            return {}
+        return pending
+
+    # 🧹 Drop stored articles of the ingested laws that are no longer in the source
+    def _prune(self, known):
+        from weaviate.classes.query import Filter
+
+        stale = [object_id for object_id, (_, law) in known.items() if law in self.laws and object_id not in self.seen]
+        for group in _batches(stale, 100):
+            if self.dry_run:
+                self.stats["pruned"] += len(group)
+                continue
+            result = self.collection.data.delete_many(where=Filter.by_id().contains_any(group))
+            self.stats["pruned"] += result.successful
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest law texts into the LawArticle collection.")
+    parser.add_argument("paths", nargs="+", help="law .txt files (one law per file) or chunk .jsonl files")
+    parser.add_argument("--law-title", help="override the law title of .txt files (defaults to their first line)")
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--prune", action="store_true", help="delete stored articles of these laws missing from the source")
+    parser.add_argument("--dry-run", action="store_true", help="parse and diff only; nothing is embedded or written")
+    parser.add_argument("--reembed", action="store_true", help="embed every chunk, e.g. after changing EMBEDDING_DIMENSIONS")
+    parser.add_argument("--sync-local-index", action="store_true", help="refresh the local index afterwards")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    from .clients import get_openai_client, get_weaviate_client
+
+    load_dotenv()
+    client = get_weaviate_client(os.environ["WEAVIATE_URL"], os.environ["WEAVIATE_API_KEY"])
+    ingestor = Ingestor(
+        get_openai_client(os.environ["OPENAI_API_KEY"]),
+        ensure_collection(client),
+        args.embed_batch,
+        args.embed_workers,
+        args.dry_run,
+        args.reembed,
+    )
+    print(ingestor.run(read_chunks(args.paths, args.law_title), prune=args.prune))
+
+    if args.sync_local_index and not args.dry_run:
+        from .local_index import sync_from_weaviate
+
+        print(sync_from_weaviate(client))
+
+
+if __name__ == "__main__":
+    main()
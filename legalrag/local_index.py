@@ -0,0 +1,344 @@
+import argparse
+import json
+import math
+import os
+import threading
+import types
+from collections import Counter
+
+import numpy as np
+
+from .arabic_normalize import canonical_key
+from .embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_QUANTIZATION, QUANTIZATIONS, shorten
+
+# ⚡ Local in-process mirror of the LawArticle collection.
+# The corpus is small, static and read-mostly, so it is exported once into a
+# memory-mapped float32 matrix (vectors.f32, unit-normalized rows) plus a JSON
+# metadata sidecar (articles.json) and searched with a single matrix-vector product.
+# sync_from_weaviate() exports the collection in one streamed pass (vectors included) and
+# reuses the stored rows of objects whose last update time did not change; retrieval
+# falls back to the remote collection when no index is available.
+#
+# With a quantized profile (see embeddings.py) the index also stores int8 codes or sign
+# bits, which are the only vectors held in memory: they rank every article, and the
+# top limit × RESCORE_OVERSAMPLE candidates are rescored against their float32 rows,
+# read from the memory map.
+
+DEFAULT_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(".cache", "local_index"))
+COLLECTION = "LawArticle"
+PROPERTIES = ["law_title", "article_number", "article_title", "text"]
+METADATA_TITLE = "LAW METADATA"
+
+_VECTORS_FILE = "vectors.f32"
+_ARTICLES_FILE = "articles.json"
+_MANIFEST_FILE = "manifest.json"
+_CODES_FILE = {"int8": "vectors.i8", "binary": "vectors.bits"}
+_SCALES_FILE = "scales.f32"
+
+RESCORE_OVERSAMPLE = int(os.getenv("RESCORE_OVERSAMPLE", "4"))
+_INT8_CHUNK_ROWS = 4096  # rows decoded to float32 at a time when scoring int8 codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# 📄 Result object shaped like a Weaviate query result (uuid / properties / metadata.distance)
+class LocalArticle:
+    __slots__ = ("uuid", "properties", "metadata", "vector")
+
+    def __init__(self, uuid, properties, distance=None, vector=None):
+        self.uuid = uuid
+        self.properties = properties
+        self.metadata = types.SimpleNamespace(distance=distance, certainty=None if distance is None else 1 - distance / 2)
+        self.vector = vector
+
+
+class LocalIndex:
+    def __init__(self, path, vectors, articles, manifest, codes=None, scales=None):
+        self.path = path
+        self.vectors = vectors
+        self.articles = articles
+        self.manifest = manifest
+        self.dim = vectors.shape[1] if vectors.ndim == 2 else 0
+        self.quantization = manifest.get("quantization", "none")
+        self.codes = codes
+        self.scales = scales
+        self._searchable = np.array(
+            [a["properties"].get("article_title") != METADATA_TITLE for a in articles], dtype=bool
+        )
+        self._law_titles = np.array([a["properties"].get("law_title", "") for a in articles], dtype=object)
+        self._positions = {a["uuid"]: i for i, a in enumerate(articles)}
+        self._by_article_number = {}
+        for i, a in enumerate(articles):
+            self._by_article_number.setdefault(str(a["properties"].get("article_number", "")), []).append(i)
+        self._postings = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(os.path.join(path, _MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(os.path.join(path, _ARTICLES_FILE), encoding="utf-8") as f:
+            articles = json.load(f)
+        count, dim = manifest["count"], manifest["dim"]
+        quantization = manifest.get("quantization", "none")
+        codes = scales = None
+        if count:
+            vectors = np.memmap(os.path.join(path, _VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+            if quantization == "int8":
+                codes = np.fromfile(os.path.join(path, _CODES_FILE["int8"]), dtype=np.int8).reshape(count, dim)
+                scales = np.fromfile(os.path.join(path, _SCALES_FILE), dtype=np.float32)
+            elif quantization == "binary":
+                codes = np.fromfile(os.path.join(path, _CODES_FILE["binary"]), dtype=np.uint8).reshape(count, -1)
+        else:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        return cls(path, vectors, articles, manifest, codes, scales)
+
+    def __len__(self):
+        return len(self.articles)
+
+    # 🔍 Vectorized top-k cosine search; returns None when the index cannot answer
+    def search(self, vector, limit=10, law_titles=None, article_numbers=None, include_metadata_chunks=False):
+        query = np.asarray(vector, dtype=np.float32)
+        if not len(self.articles) or query.shape != (self.dim,):
+            return None
+        query = query / (np.linalg.norm(query) or 1.0)
+        mask = self._mask(law_titles, article_numbers, include_metadata_chunks)
+
+        if self.codes is None:
+            positions, scores = _top_k(np.where(mask, self.vectors @ query, -np.inf), limit)
+        else:
+            # 🗜️ Coarse ranking on the quantized codes, exact rescoring of the shortlist
+            candidates, _ = _top_k(np.where(mask, self._coarse_scores(query), -np.inf), limit * RESCORE_OVERSAMPLE)
+            candidates.sort()  # sequential reads from the memory map
+            exact = np.asarray(self.vectors[candidates]) @ query
+            order, scores = _top_k(exact, limit)
+            positions = candidates[order]
+        return [self._article(i, 1.0 - float(score)) for i, score in zip(positions, scores)]
+
+    def _coarse_scores(self, query):
+        if self.quantization == "binary":
+            bits = np.packbits(query > 0)
+            differing = self.codes ^ bits
+            if hasattr(np, "bitwise_count"):
+                hamming = np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+            else:
+                hamming = _POPCOUNT[differing].sum(axis=1, dtype=np.int32)
+            return -hamming.astype(np.float32)
+        weighted = query * self.scales
+        return np.concatenate([
+            self.codes[start:start + _INT8_CHUNK_ROWS].astype(np.float32) @ weighted
+            for start in range(0, len(self.codes), _INT8_CHUNK_ROWS)
+        ])
+
+    def memory_bytes(self):
+        if self.codes is None:
+            return self.vectors.nbytes
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    # 🔤 BM25 keyword search over the normalized article text
+    def keyword_search(self, query, limit=10, law_titles=None, k1=1.2, b=0.75):
+        if self._postings is None:
+            self._build_postings()
+        postings, lengths, average_length = self._postings
+        mask = self._mask(law_titles)
+        scores = {}
+        for term in set(canonical_key(query).split()):
+            docs = postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (len(self.articles) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for position, tf in docs:
+                if mask[position]:
+                    norm = tf + k1 * (1 - b + b * lengths[position] / average_length)
+                    scores[position] = scores.get(position, 0.0) + idf * tf * (k1 + 1) / norm
+        top = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [self._article(i) for i in top]
+
+    def _build_postings(self):
+        postings = {}
+        lengths = []
+        for position, a in enumerate(self.articles):
+            terms = canonical_key(f"{a['properties'].get('article_title', '')} {a['properties'].get('text', '')}").split()
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((position, tf))
+        self._postings = (postings, lengths, (sum(lengths) / len(lengths)) if lengths else 1.0)
+
+    def _mask(self, law_titles=None, article_numbers=None, include_metadata_chunks=False):
+        mask = np.ones(len(self.articles), dtype=bool) if include_metadata_chunks else self._searchable
+        if law_titles:
+            mask = mask & np.isin(self._law_titles, list(law_titles))
+        if article_numbers:
+            # 📌 Direct article_number index lookup instead of a text scan
+            allowed = np.zeros(len(self.articles), dtype=bool)
+            for number in article_numbers:
+                allowed[self._by_article_number.get(str(number), [])] = True
+            mask = mask & allowed
+        return mask
+
+    def get(self, uuid):
+        position = self.position(uuid)
+        return None if position is None else self._article(position)
+
+    # Row of `uuid` in the vector matrix, None when the mirror does not hold it
+    def position(self, uuid):
+        return self._positions.get(str(uuid))
+
+    def _article(self, position, distance=None):
+        record = self.articles[position]
+        return LocalArticle(record["uuid"], record["properties"], distance)
+
+
+def _top_k(scores, k):
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.array([], dtype=np.int64), scores[:0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+# 💽 Write an index directory from (uuid, properties, vector, last_update) records.
+# Vectors longer than `dimensions` are shortened; `quantization` adds int8 / binary codes.
+def build_index(records, path=DEFAULT_INDEX_PATH, dimensions=EMBEDDING_DIMENSIONS, quantization=EMBEDDING_QUANTIZATION):
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+    records = list(records)
+    os.makedirs(path, exist_ok=True)
+    dim = min(len(records[0][2]), dimensions or len(records[0][2])) if records else 0
+
+    vectors_tmp = os.path.join(path, _VECTORS_FILE + ".tmp")
+    if records:
+        matrix = np.memmap(vectors_tmp, dtype=np.float32, mode="w+", shape=(len(records), dim))
+        for i, (_, _, vector, _) in enumerate(records):
+            row = shorten(vector, dim)
+            matrix[i] = row / (np.linalg.norm(row) or 1.0)
+        matrix.flush()
+        _write_codes(matrix, path, quantization)
+        del matrix
+    else:
+        open(vectors_tmp, "wb").close()
+
+    articles = [
+        {"uuid": str(uuid), "properties": properties, "last_update": last_update}
+        for uuid, properties, _, last_update in records
+    ]
+    _write_json(os.path.join(path, _ARTICLES_FILE), articles)
+    os.replace(vectors_tmp, os.path.join(path, _VECTORS_FILE))
+    # Manifest last: readers only pick up the new files once it is replaced
+    _write_json(os.path.join(path, _MANIFEST_FILE), {
+        "count": len(records),
+        "dim": dim,
+        "dimensions": dimensions,
+        "quantization": quantization if records else "none",
+    })
+    return LocalIndex.load(path)
+
+
+def _write_codes(matrix, path, quantization):
+    if quantization == "int8":
+        # Symmetric per-dimension scale: the largest magnitude in each column maps to 127
+        scales = np.abs(matrix).max(axis=0) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(matrix / scales).astype(np.int8)
+        scales.astype(np.float32).tofile(os.path.join(path, _SCALES_FILE))
+    elif quantization == "binary":
+        codes = np.packbits(np.asarray(matrix) > 0, axis=1)
+    else:
+        return
+    target = os.path.join(path, _CODES_FILE[quantization])
+    codes.tofile(target + ".tmp")
+    os.replace(target + ".tmp", target)
+
+
+def _write_json(target, payload):
+    with open(target + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(target + ".tmp", target)
+
+
+# The unnamed vector of a Weaviate object (a dict of named vectors in v4 results)
+def default_vector(obj):
+    vector = obj.vector
+    if isinstance(vector, dict):
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return vector
+
+
+def _update_time(obj):
+    updated = getattr(obj.metadata, "last_update_time", None)
+    return updated.timestamp() if updated is not None else None
+
+
+# 🔄 Sync from Weaviate in one cursor pass; the index is rebuilt only when something changed
+def sync_from_weaviate(client, path=DEFAULT_INDEX_PATH, collection_name=COLLECTION,
+                       dimensions=EMBEDDING_DIMENSIONS, quantization=EMBEDDING_QUANTIZATION):
+    from weaviate.classes.query import MetadataQuery
+
+    collection = client.collections.get(collection_name)
+    profile_changed = False
+    try:
+        current = LocalIndex.load(path)
+        known = {a["uuid"]: (a, current.vectors[i]) for i, a in enumerate(current.articles)}
+        if current.manifest.get("dimensions") != dimensions:
+            known = {}  # stored rows were shortened for another profile → fetch full vectors again
+        profile_changed = current.quantization != quantization
+    except FileNotFoundError:
+        known = {}
+
+    records = []
+    changed = 0
+    objects = collection.iterator(
+        include_vector=True,
+        return_properties=PROPERTIES,
+        return_metadata=MetadataQuery(last_update_time=True),
+    )
+    for obj in objects:
+        uuid, last_update = str(obj.uuid), _update_time(obj)
+        cached = known.get(uuid)
+        if cached is not None and last_update is not None and cached[0]["last_update"] == last_update:
+            records.append((uuid, cached[0]["properties"], np.array(cached[1]), last_update))
+            continue
+        records.append((uuid, obj.properties, default_vector(obj), last_update))
+        changed += 1
+
+    removed = len(set(known) - {uuid for uuid, _, _, _ in records})
+    if changed or removed or not known or profile_changed:
+        build_index(records, path, dimensions, quantization)
+    return {"total": len(records), "changed": changed, "removed": removed}
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+# 🔁 Process-wide index; reloaded when the manifest on disk changes, None if never synced
+def get_local_index(path=DEFAULT_INDEX_PATH):
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(os.path.join(path, _MANIFEST_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _index_lock:
+        if _index is None or _index_mtime != mtime or _index.path != path:
+            _index = LocalIndex.load(path)
+            _index_mtime = mtime
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local LawArticle vector index from Weaviate.")
+    parser.add_argument("--path", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS, help="shorten vectors to this size")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=EMBEDDING_QUANTIZATION)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from .clients import get_weaviate_client
+
+    load_dotenv()
+    client = get_weaviate_client(os.environ["WEAVIATE_URL"], os.environ["WEAVIATE_API_KEY"])
+    print(sync_from_weaviate(client, args.path, dimensions=args.dimensions, quantization=args.quantization))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ⏱️ Hot-path latency instrumentation for the RAG pipeline.
+# Each stage (rephrase_question, embed_query, search, generate_answer, render_articles, ...)
+# is timed with perf_counter_ns and recorded together with optional token counts and
+# cache-hit flags. Per-stage percentiles come from a bounded reservoir of recent samples.
+#
+# Exposure:
+#   - METRICS_PORT=9464           → Prometheus text format on http://host:9464/metrics
+#   - METRICS_LOG_INTERVAL=60     → periodic one-line-per-stage log dump
+#   - ?debug=1 in the app URL     → hidden debug panel (see debug_rows())
+#
+# Quantities that are not latencies (e.g. how many articles the adaptive rerank cut kept)
+# are recorded with observe() and reported apart from the stages (value_snapshot()).
+
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger(__name__)
+
+
+class _StageStats:
+    __slots__ = ("samples", "count", "total", "cache_hits", "cache_misses", "tokens")
+
+    def __init__(self):
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+        self.count = 0
+        self.total = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.tokens = 0
+
+
+_stats = {}
+_values = {}
+_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "cache_hit", "tokens")
+
+    def __init__(self, name):
+        self.name = name
+        self.cache_hit = None
+        self.tokens = None
+
+
+def record(name, seconds, cache_hit=None, tokens=None):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _StageStats()
+        stats.samples.append(seconds)
+        stats.count += 1
+        stats.total += seconds
+        if cache_hit is True:
+            stats.cache_hits += 1
+        elif cache_hit is False:
+            stats.cache_misses += 1
+        if tokens:
+            stats.tokens += tokens
+
+
+# 📊 One sample of a quantity, e.g. observe("rerank_depth.gap", 4)
+def observe(name, value):
+    with _lock:
+        stats = _values.get(name)
+        if stats is None:
+            stats = _values[name] = _StageStats()
+        stats.samples.append(value)
+        stats.count += 1
+        stats.total += value
+
+
+# 🔬 Time a block: `with stage("embed_query") as span: ...; span.cache_hit = True`
+@contextmanager
+def stage(name):
+    span = Span(name)
+    start = time.perf_counter_ns()
+    try:
+        yield span
+    finally:
+        record(name, (time.perf_counter_ns() - start) / 1e9, span.cache_hit, span.tokens)
+
+
+# 🌊 Time a streamed stage: records time-to-first-chunk as "<name>.first_token" and the full stream as "<name>"
+def timed_stream(name, chunks, start_ns=None):
+    start = time.perf_counter_ns() if start_ns is None else start_ns
+    first = True
+    try:
+        for chunk in chunks:
+            if first and chunk:
+                record(f"{name}.first_token", (time.perf_counter_ns() - start) / 1e9)
+                first = False
+            yield chunk
+    finally:
+        record(name, (time.perf_counter_ns() - start) / 1e9)
+
+
+# Same as timed_stream for async iterators (HTTP API streaming)
+async def timed_astream(name, chunks, start_ns=None):
+    start = time.perf_counter_ns() if start_ns is None else start_ns
+    first = True
+    try:
+        async for chunk in chunks:
+            if first and chunk:
+                record(f"{name}.first_token", (time.perf_counter_ns() - start) / 1e9)
+                first = False
+            yield chunk
+    finally:
+        record(name, (time.perf_counter_ns() - start) / 1e9)
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summary(ordered, count, total):
+    return {
+        "count": count,
+        "mean": total / count if count else 0.0,
+        **{f"p{int(q * 100)}": _quantile(ordered, q) for q in QUANTILES},
+        "sum": total,
+    }
+
+
+def snapshot():
+    with _lock:
+        copies = {
+            name: (sorted(s.samples), s.count, s.total, s.cache_hits, s.cache_misses, s.tokens)
+            for name, s in _stats.items()
+        }
+    result = {}
+    for name, (ordered, count, total, hits, misses, tokens) in sorted(copies.items()):
+        result[name] = {**_summary(ordered, count, total), "cache_hits": hits, "cache_misses": misses, "tokens": tokens}
+    return result
+
+
+def value_snapshot():
+    with _lock:
+        copies = {name: (sorted(s.samples), s.count, s.total) for name, s in _values.items()}
+    return {name: _summary(*copy) for name, copy in sorted(copies.items())}
+
+
+# 🛠️ Rows for the hidden debug panel (milliseconds)
+def debug_rows():
+    return [
+        {
+            "stage": name,
+            "count": s["count"],
+            "p50 ms": round(s["p50"] * 1000, 1),
+            "p95 ms": round(s["p95"] * 1000, 1),
+            "p99 ms": round(s["p99"] * 1000, 1),
+            "cache hit/miss": f"{s['cache_hits']}/{s['cache_misses']}",
+            "tokens": s["tokens"],
+        }
+        for name, s in snapshot().items()
+    ]
+
+
+def render_prometheus():
+    lines = [
+        "# HELP legalrag_stage_seconds Pipeline stage latency.",
+        "# TYPE legalrag_stage_seconds summary",
+    ]
+    stats = snapshot()
+    for name, s in stats.items():
+        for q in QUANTILES:
+            lines.append(f'legalrag_stage_seconds{{stage="{name}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'legalrag_stage_seconds_sum{{stage="{name}"}} {s["sum"]:.6f}')
+        lines.append(f'legalrag_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+    lines += ["# HELP legalrag_stage_cache_total Cache lookups per stage.", "# TYPE legalrag_stage_cache_total counter"]
+    for name, s in stats.items():
+        if s["cache_hits"] or s["cache_misses"]:
+            lines.append(f'legalrag_stage_cache_total{{stage="{name}",result="hit"}} {s["cache_hits"]}')
+            lines.append(f'legalrag_stage_cache_total{{stage="{name}",result="miss"}} {s["cache_misses"]}')
+    lines += ["# HELP legalrag_stage_tokens_total Tokens processed per stage.", "# TYPE legalrag_stage_tokens_total counter"]
+    for name, s in stats.items():
+        if s["tokens"]:
+            lines.append(f'legalrag_stage_tokens_total{{stage="{name}"}} {s["tokens"]}')
+    lines += ["# HELP legalrag_value Pipeline quantities other than latency.", "# TYPE legalrag_value summary"]
+    for name, s in value_snapshot().items():
+        for q in QUANTILES:
+            lines.append(f'legalrag_value{{name="{name}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:g}')
+        lines.append(f'legalrag_value_sum{{name="{name}"}} {s["sum"]:g}')
+        lines.append(f'legalrag_value_count{{name="{name}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _log_forever(interval):
+    while True:
+        time.sleep(interval)
+        for name, s in snapshot().items():
+            logger.info("stage=%s count=%d p50=%.1fms p95=%.1fms p99=%.1fms cache=%d/%d tokens=%d",
+                        name, s["count"], s["p50"] * 1000, s["p95"] * 1000, s["p99"] * 1000,
+                        s["cache_hits"], s["cache_misses"], s["tokens"])
+        for name, s in value_snapshot().items():
+            logger.info("value=%s count=%d mean=%.2f p50=%g p95=%g", name, s["count"], s["mean"], s["p50"], s["p95"])
+
+
+_exporters_started = False
+
+
+# 🚀 Start the configured exporters once per process (safe to call on every rerun)
+def start_exporters():
+    global _exporters_started
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = os.getenv("METRICS_PORT")
+    if port:
+        server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    interval = os.getenv("METRICS_LOG_INTERVAL")
+    if interval:
+        threading.Thread(target=_log_forever, args=(float(interval),), name="metrics-log", daemon=True).start()
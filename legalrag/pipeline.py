@@ -0,0 +1,359 @@
+import os
+import threading
+import time
+
+from . import clients
+from .adjacency import expand_neighbors
+from .answer_cache import get_answer_cache
+from .arabic_normalize import fold_arabic, normalize_arabic
+from .context_builder import build_context
+from .conversation import SESSION_DEPTH
+from .embedding_cache import get_embedding_cache
+from .embeddings import embedding_cache_model, embedding_request
+from .metrics import record, stage, timed_stream
+from .prompts import PROMPTS, REPHRASE_TEMPLATE
+from .rerank import DEPTH_MAX, RERANK_TOP_N, RETRIEVAL_DEPTH, rerank, rerank_adaptive
+from .resilience import CHAT, DEGRADED_ANSWER, EMBED, REPHRASE, UpstreamError, is_degraded
+from .retrieval import RETRIEVAL_MODE, retrieve, retrieve_plan, retrieve_with_rephrase, run_plan, widen
+from .singleflight import SingleFlight
+from .warmup import log_question
+
+# 🧩 The RAG pipeline behind every front-end: normalize → embed → retrieve →
+# answer-cache → generate. Importing this module has no side effects; clients are
+# built on first use and engines are shared process-wide through get_engine().
+# Identical embed / retrieve / generate calls already in flight in another session are
+# joined instead of repeated (singleflight.py).
+
+EMBEDDING_BATCH_SIZE = 256  # inputs per embeddings.create request (the API accepts up to 2048)
+CHAT_MODEL = "gpt-4.1"
+REPHRASE_MODEL = "gpt-4"
+
+# 🛬 Process-wide, shared by every engine; keys carry the variant where it matters
+_flights = SingleFlight()
+
+
+class Settings:
+    def __init__(self, openai_api_key=None, weaviate_url=None, weaviate_api_key=None):
+        self.openai_api_key = openai_api_key
+        self.weaviate_url = weaviate_url
+        self.weaviate_api_key = weaviate_api_key
+
+    # 🔐 Streamlit secrets (or any mapping with the same keys)
+    @classmethod
+    def from_secrets(cls, secrets):
+        return cls(secrets["OPENAI_API_KEY"], secrets["WEAVIATE_URL"], secrets["WEAVIATE_API_KEY"])
+
+    # 🔐 Environment / .env, for scripts and servers running outside Streamlit
+    @classmethod
+    def from_env(cls):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        return cls(os.getenv("OPENAI_API_KEY"), os.getenv("WEAVIATE_URL"), os.getenv("WEAVIATE_API_KEY"))
+
+    def key(self):
+        return (self.openai_api_key, self.weaviate_url, self.weaviate_api_key)
+
+
+# 🎛️ One pipeline variant: which prompt, how many candidates to retrieve, how many of
+# them survive reranking (at most, with adaptive depth), whether to rephrase first
+class Variant:
+    def __init__(self, name, prompt, limit=10, rephrase=False, retrieval_mode=RETRIEVAL_MODE, rerank_top_n=RERANK_TOP_N,
+                 adaptive_depth=RETRIEVAL_DEPTH == "adaptive", expand_neighbors=False):
+        self.name = name
+        self.prompt = prompt
+        self.limit = limit
+        self.rephrase = rephrase
+        self.retrieval_mode = retrieval_mode
+        self.rerank_top_n = rerank_top_n
+        self.adaptive_depth = adaptive_depth
+        self.expand_neighbors = expand_neighbors
+
+
+VARIANTS = {
+    "app": Variant("app", PROMPTS["app"], limit=10),
+    # app1 / app2 prompts insist on the general rule next to the special one → neighbor expansion
+    "app1": Variant("app1", PROMPTS["app1"], limit=15, expand_neighbors=True),
+    "app2": Variant("app2", PROMPTS["app2"], limit=15, expand_neighbors=True),
+    "app-test-enhancing-query": Variant("app-test-enhancing-query", PROMPTS["app-test-enhancing-query"], limit=10, rephrase=True),
+    "appRTL": Variant("appRTL", PROMPTS["appRTL"], limit=15),
+}
+
+
+class RagEngine:
+    def __init__(self, settings, variant="app", rate_limiter=None):
+        self.settings = settings
+        self.variant = VARIANTS[variant] if isinstance(variant, str) else variant
+        self.rate_limiter = rate_limiter
+        self.embedding_cache = get_embedding_cache()
+        self.answer_cache = get_answer_cache()
+
+    # 🔌 Shared clients, connected lazily on first use
+    @property
+    def openai(self):
+        return clients.get_openai_client(self.settings.openai_api_key)
+
+    # Per-attempt client for calls made through resilience.py, which owns retries and deadlines
+    def _openai(self, timeout):
+        return self.openai.with_options(timeout=timeout, max_retries=0)
+
+    @property
+    def weaviate(self):
+        return clients.get_weaviate_client(self.settings.weaviate_url, self.settings.weaviate_api_key)
+
+    # 🔎 Embed query using OpenAI (served from the embedding cache when possible)
+    def embed_query(self, text):
+        with stage("embed_query") as span:
+            span.cache_hit = True
+
+            def fetch(text):
+                response = EMBED.call(lambda timeout: self._openai(timeout).embeddings.create(
+                    input=text,
+                    **embedding_request()
+                ))
+                span.tokens = response.usage.total_tokens
+                return response.data[0].embedding
+
+            # 🔗 A cache miss, whether this call fetches or joins another caller's flight
+            # (the join is counted in the "singleflight.embed" samples)
+            def load(text):
+                span.cache_hit = False
+                return _flights.do(("embed", model, text), lambda: fetch(text))
+
+            model = embedding_cache_model()
+            return self.embedding_cache.get_or_embed(text, model, load)
+
+    # 📦 Embed many texts with as few requests as possible; results also land in the cache
+    def embed_many(self, texts, batch_size=EMBEDDING_BATCH_SIZE):
+        vectors = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            vector = self.embedding_cache.get(text, embedding_cache_model())
+            if vector is None:
+                missing.append(text)
+            else:
+                vectors[text] = vector
+
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            with stage("embed_batch") as span:
+                response = EMBED.call(lambda timeout: self._openai(timeout).embeddings.create(input=chunk, **embedding_request()))
+                span.tokens = response.usage.total_tokens
+            for item in response.data:
+                text = chunk[item.index]
+                vectors[text] = item.embedding
+                self.embedding_cache.put(text, embedding_cache_model(), item.embedding)
+        return [vectors[text] for text in texts]
+
+    # 🚦 Optional shared limiter in front of every chat completion (used by batch runs)
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    # 🔁 Rephrase query into precise legal language
+    def rephrase_question(self, original):
+        self._throttle()
+        with stage("rephrase_question") as span:
+            completion = REPHRASE.call(lambda timeout: self._openai(timeout).chat.completions.create(
+                model=REPHRASE_MODEL,
+                messages=[{"role": "system", "content": REPHRASE_TEMPLATE.format(original=original)}]
+            ))
+            span.tokens = completion.usage.total_tokens
+        return completion.choices[0].message.content.strip()
+
+    # Search vectors come from the normalized text, so they share cache entries with the answer cache
+    def _search_vector(self, text):
+        return self.embed_query(normalize_arabic(text))
+
+    # 🔍 Retrieval (hybrid by default; rephrasing variants overlap rephrase and raw search),
+    # then local reranking down to the articles worth sending to the LLM. Takes the question
+    # as asked: keyword search needs its letter forms (fold_arabic), embeddings normalize it.
+    # rephrase=False searches with the question alone even on rephrasing variants (warm-up).
+    def retrieve_articles(self, question, limit=None, law_titles=None, rephrase=True):
+        query = fold_arabic(question)
+        rephrase = rephrase and self.variant.rephrase
+        key = ("retrieve", self.variant.name, query, limit, tuple(law_titles or ()), rephrase)
+        return list(_flights.do(key, lambda: self._with_neighbors(self._retrieve_articles(query, limit, law_titles, rephrase))))
+
+    # 🧭 Section openers / adjacent articles of the ranked hits (adjacency.py), after them
+    def _with_neighbors(self, articles):
+        if not self.variant.expand_neighbors:
+            return articles
+        return expand_neighbors(self.weaviate, articles)
+
+    def _retrieve_articles(self, query, limit=None, law_titles=None, rephrase=False):
+        candidates = max(limit or 0, self.variant.limit)
+        if rephrase:
+            articles = retrieve_with_rephrase(self.weaviate, query, self._search_vector, self.rephrase_question, candidates, law_titles,
+                                              self.variant.retrieval_mode)
+        else:
+            articles = retrieve(self.weaviate, query, self._search_vector(query), candidates, law_titles, self.variant.retrieval_mode)
+        return run_plan(self.weaviate, rank_plan(self.variant, query, self._search_vector(query), articles, limit, law_titles))
+
+    # 🧠 Generate a legal-style answer; stream=True yields text deltas as they arrive
+    def generate_answer(self, question, articles, stream=False):
+        prompt = self.variant.prompt
+        # 📏 Fill the prompt up to the token budget, most relevant articles first
+        with stage("build_context") as span:
+            context_text, context_usage = build_context(articles, header=prompt.header)
+            span.tokens = context_usage["tokens"]
+
+        # 🛬 The same question over the same articles shares one completion (streamed ones are fanned out)
+        key = (self.variant.name, normalize_arabic(question), tuple(str(o.uuid) for o in articles))
+        return self._complete(prompt.messages(question, context_text), stream, flight_key=key)
+
+    def _complete(self, messages, stream=False, flight_key=None):
+        started = time.perf_counter_ns()
+        if stream:
+            if flight_key is None:
+                deltas = self._chat_stream(messages)
+            else:
+                deltas = _flights.stream(("answer_stream", *flight_key), lambda: self._chat_stream(messages))
+            return timed_stream("generate_answer", deltas, started)
+        if flight_key is None:
+            return self._chat(messages, started)
+        return _flights.do(("answer", *flight_key), lambda: self._chat(messages, started))
+
+    # 🛡️ When the chat upstream gives up the answer degrades to DEGRADED_ANSWER (retrieval-only)
+    def _chat(self, messages, started):
+        self._throttle()
+        try:
+            completion = CHAT.call(lambda timeout: self._openai(timeout).chat.completions.create(model=CHAT_MODEL, messages=messages))
+        except UpstreamError:
+            record("degraded.generate_answer", (time.perf_counter_ns() - started) / 1e9)
+            return DEGRADED_ANSWER
+        record("generate_answer", (time.perf_counter_ns() - started) / 1e9, tokens=completion.usage.total_tokens)
+        return completion.choices[0].message.content.strip()
+
+    # Closing the generator (reader gone) closes the HTTP stream; only opening it is retried
+    def _chat_stream(self, messages):
+        self._throttle()
+        started = time.perf_counter_ns()
+        try:
+            completion = CHAT.call(lambda timeout: self._openai(timeout).chat.completions.create(model=CHAT_MODEL, messages=messages, stream=True))
+        except UpstreamError:
+            record("degraded.generate_answer", (time.perf_counter_ns() - started) / 1e9)
+            yield DEGRADED_ANSWER
+            return
+        try:
+            for chunk in completion:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            completion.close()
+
+    # 💾 Near-duplicate questions over the same articles are served from the answer cache
+    def cached_answer(self, normalized_question, articles):
+        vector = self.embed_query(normalized_question)
+        with stage("answer_cache") as span:
+            answer = self.answer_cache.lookup(vector, articles, variant=self.variant.name)
+            span.cache_hit = answer is not None
+        return answer
+
+    def remember_answer(self, normalized_question, articles, answer):
+        if is_degraded(answer):
+            return
+        self.answer_cache.store(self.embed_query(normalized_question), articles, answer, variant=self.variant.name)
+
+    # 💬 One turn of a multi-turn session (conversation.py); with conversation=None each
+    # method falls back to the single-question path above. A follow-up searches with the
+    # previous question as context, skips rephrasing, and reranks the session's articles
+    # together with the candidates it does not hold yet, so only the delta (at most
+    # SESSION_TURN_ARTICLES new articles) reaches the prompt. How deep session turns are cut
+    # is SESSION_DEPTH's trade-off (conversation.py).
+    def retrieve_turn(self, conversation, question, law_titles=None):
+        fixed = SESSION_DEPTH == "fixed" or not self.variant.adaptive_depth
+        if conversation is None or not conversation.turns:
+            limit = self.variant.rerank_top_n if conversation is not None and fixed else None
+            return self.retrieve_articles(question, limit=limit, law_titles=law_titles)
+        search_query = conversation.search_query(question)
+        vector = self._search_vector(search_query)
+        candidates = retrieve(self.weaviate, search_query, vector, self.variant.limit, law_titles, self.variant.retrieval_mode)
+        pool = widen(conversation.articles, candidates)
+        if fixed:
+            articles = rerank(search_query, pool, vector, top_n=self.variant.rerank_top_n)
+        else:
+            # The pool already spans the session's articles, so a follow-up is never expanded
+            articles = rerank_adaptive(search_query, pool, vector, max_depth=self.variant.rerank_top_n)[0]
+        return conversation.capped(self._with_neighbors(articles))
+
+    # Answers that depend on earlier turns are not shared through the answer cache
+    def cached_turn_answer(self, conversation, normalized_question, articles):
+        if conversation is not None and conversation.turns:
+            return None
+        return self.cached_answer(normalized_question, articles)
+
+    def generate_turn(self, conversation, question, articles, stream=False):
+        if conversation is None:
+            return self.generate_answer(question, articles, stream)
+        # The session keeps the articles only in finish_turn, once the answer is in
+        with stage("build_context") as span:
+            context_text, span.tokens = conversation.preview_context(articles, self.variant.prompt.header)
+        return self._complete(conversation.messages(self.variant.prompt, question, context_text), stream)
+
+    def finish_turn(self, conversation, question, normalized_question, articles, answer, generated=True):
+        if conversation is None or not conversation.turns:
+            log_question(self.variant.name, question)  # 🔥 what the next warm start pre-runs (warmup.py)
+        if is_degraded(answer):
+            return  # neither cached nor kept as a turn: asking again retries the generation
+        if generated and (conversation is None or not conversation.turns):
+            self.remember_answer(normalized_question, articles, answer)
+        if conversation is not None:
+            conversation.extend_context(articles, self.variant.prompt.header)
+            conversation.add_turn(question, normalized_question, articles, answer)
+
+    # ▶️ Whole pipeline without a UI: returns (answer, articles); answer is None when nothing was retrieved
+    # (pass a Conversation to answer it as the next turn of that session)
+    def answer(self, question, law_titles=None, conversation=None):
+        normalized_question = normalize_arabic(question)
+        if conversation is not None:
+            return self._answer_turn(conversation, question, normalized_question, law_titles)
+        articles = self.retrieve_articles(question, law_titles=law_titles)
+        if not articles:
+            return None, []
+        answer = self.cached_answer(normalized_question, articles)
+        if answer is None:
+            answer = self.generate_answer(question, articles)
+            self.remember_answer(normalized_question, articles, answer)
+        return answer, articles
+
+    def _answer_turn(self, conversation, question, normalized_question, law_titles=None):
+        articles = self.retrieve_turn(conversation, question, law_titles)
+        if not articles:
+            return None, []
+        answer = self.cached_turn_answer(conversation, normalized_question, articles)
+        generated = answer is None
+        if generated:
+            answer = self.generate_turn(conversation, question, articles)
+        self.finish_turn(conversation, question, normalized_question, articles, answer, generated)
+        return answer, articles
+
+
+# 🏅 Reranking down to the articles worth sending to the LLM, as a retrieval plan
+# (retrieval.run_plan) shared with the async engine
+def rank_plan(variant, query, vector, articles, limit=None, law_titles=None):
+    # An explicit limit (HTTP API, batch) is honoured as is
+    if limit or not variant.adaptive_depth:
+        return (yield ("compute", rerank, (query, articles, vector, limit or variant.rerank_top_n)))
+
+    # 📐 Adaptive depth: stop at the score gap; search deeper only when the top results are close together
+    kept, expand = yield ("compute", rerank_adaptive, (query, articles, vector, variant.rerank_top_n))
+    if not expand:
+        return kept
+    deeper = yield from retrieve_plan(query, vector, 2 * max(limit or 0, variant.limit), law_titles, variant.retrieval_mode)
+    return (yield ("compute", rerank_adaptive, (query, widen(articles, deeper), vector, DEPTH_MAX)))[0]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+# 🔁 One engine per (variant, credentials) per process, shared by every session / worker thread
+def get_engine(variant="app", settings=None):
+    settings = settings or Settings.from_env()
+    name = variant if isinstance(variant, str) else variant.name
+    with _engines_lock:
+        engine = _engines.get((name, settings.key()))
+        if engine is None:
+            engine = _engines[(name, settings.key())] = RagEngine(settings, variant)
+        return engine
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 🎨 Shared HTML rendering for the Streamlit front-ends.
+
+ANSWER_BOX = """
+<div style='direction: rtl; text-align: right; font-size: 1.15em; line-height: 2.1;
+background-color: #a2d0ff; border-radius: 10px; padding: 18px 16px; margin: 10px 0 18px 0;
+border: 1px solid #006e1a; color: #181c1f;'>
+{body}
+</div>
+"""
+
+STREAM_REFRESH_SECONDS = 0.05  # throttle placeholder updates while tokens arrive
+
+
+# 🌊 Render streamed answer tokens into the RTL answer box as they arrive.
+# Each chunk's newlines are converted to <br> once, when it arrives, and the
+# placeholder is refreshed at most every STREAM_REFRESH_SECONDS.
+def stream_answer(placeholder, chunks):
+    text_parts = []
+    html_parts = []
+    last_refresh = 0.0
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not text_parts:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+        text_parts.append(chunk)
+        html_parts.append(chunk.replace("\n", "<br>"))
+
+        now = time.monotonic()
+        if now - last_refresh >= STREAM_REFRESH_SECONDS:
+            placeholder.markdown(ANSWER_BOX.format(body="".join(html_parts)), unsafe_allow_html=True)
+            last_refresh = now
+
+    answer = "".join(text_parts).rstrip()
+    placeholder.markdown(ANSWER_BOX.format(body=answer.replace("\n", "<br>")), unsafe_allow_html=True)
+    return answer
+
+
+# 📜 Retrieved-article cards, one template per front-end (same markup the apps built inline)
+ARTICLE_CARDS = {
+    "app": (
+        "<div style='direction: rtl; text-align: right; background-color: #012348; color: white; "
+        "border-radius: 8px; padding: 10px; margin-bottom: 12px; font-size: 1.05em; line-height: 1.9;'>"
+        "<strong>{law_title} - المادة {article_number}: {article_title}</strong> {body}</div>"
+    ),
+    "app2": (
+        "<div style='direction: rtl; text-align: right; font-weight: bold;'>"
+        "{law_title} - المادة {article_number} - {article_title}</div>"
+        "<div style='direction: rtl; text-align: right; background-color: #012348; "
+        "border-radius: 8px; padding: 8px; margin-bottom: 10px;'>{body}</div>"
+    ),
+    "app-test-enhancing-query": (
+        "<div style='direction: rtl; text-align: right; background-color: #012348; border-radius: 8px; "
+        "padding: 8px; margin-bottom: 10px; color: #fff;'>"
+        "<strong>{law_title} - المادة {article_number}: {article_title}</strong><br><br>{body}</div>"
+    ),
+    "app1": (
+        "<div style='direction: rtl; text-align: right;'><b>المادة {article_number}</b> - {article_title}</div>"
+        "<div style='direction: rtl; text-align: right; margin-bottom: 10px;'>{body}</div>"
+    ),
+    "appRTL": (
+        "<div style='direction: rtl; text-align: right;'><b>المادة {article_number}</b> - {article_title}</div>"
+        "<div style='direction: rtl; text-align: right; background-color: #012348; border-radius: 8px; "
+        "padding: 8px; margin-bottom: 10px;'>{body}</div>"
+    ),
+}
+
+RENDER_CACHE_SIZE = 4096
+ARTICLE_HEADER_RE = re.compile(r"^المادة\s+(\d+)\s*")
+
+_cards = OrderedDict()
+_cards_lock = threading.Lock()
+
+
+# 🧼 Drop the leading "المادة N" (only when N is this article's number) and convert newlines
+def clean_article_body(text, article_number):
+    header = ARTICLE_HEADER_RE.match(text)
+    if header and header.group(1) == str(article_number):
+        text = text[header.end():]
+    return text.strip().replace("\n", "<br>")
+
+
+def _card(obj, style):
+    p = obj.properties
+    fields = (p.get("law_title", "قانون غير معروف"), p.get("article_number", ""), p.get("article_title", ""), p.get("text", ""))
+    # Keyed by id and content, so an edited article renders afresh; str hashes are cached by Python
+    key = (style, str(obj.uuid), hash(fields))
+    with _cards_lock:
+        html = _cards.get(key)
+        if html is not None:
+            _cards.move_to_end(key)
+            return html
+
+    law_title, article_number, article_title, text = fields
+    html = ARTICLE_CARDS[style].format(
+        law_title=law_title,
+        article_number=article_number,
+        article_title=article_title,
+        body=clean_article_body(text, article_number),
+    )
+    with _cards_lock:
+        _cards[key] = html
+        while len(_cards) > RENDER_CACHE_SIZE:
+            _cards.popitem(last=False)
+    return html
+
+
+# 🧱 All cards of a result set as one HTML string → a single st.markdown call
+def render_articles(articles, style="app"):
+    return "\n".join(_card(obj, style) for obj in articles)
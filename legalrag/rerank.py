@@ -0,0 +1,225 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+from .arabic_normalize import canonical_key
+from .local_index import default_vector, get_local_index
+from .metrics import observe, stage
+from .retrieval import cited_article_numbers
+
+# 🏅 Local reranking between retrieval and generation.
+# Retrieval over-fetches (Variant.limit) and only the best RERANK_TOP_N articles reach
+# the LLM, which shortens the prompt and the generation time.
+#
+#   RERANKER=lexical (default)   embedding similarity + idf-weighted lexical overlap,
+#                                vectorized over the candidate set with NumPy
+#   RERANKER=cross-encoder       sentence-transformers CrossEncoder (RERANK_MODEL), loaded
+#                                once per process and scored in batches; falls back to
+#                                lexical when the package is not installed
+#   RERANKER=none                keep the retrieval order, no cut
+#
+# Articles whose number the question cites ("المادة 8") always stay on top.
+#
+# RETRIEVAL_DEPTH=adaptive (default) replaces the fixed RERANK_TOP_N cut with one read
+# from the raw scores of the ranked candidates (rerank_adaptive): the cosine similarity to
+# the question blended with the lexical share (lexical reranker), or the cross-encoder
+# probability. Keep articles while they score at least DEPTH_THRESHOLD and trail the best
+# one kept by less than DEPTH_GAP (never below DEPTH_MIN), both in those units. When
+# nothing cuts and the last kept article is still within DEPTH_EXPAND_WITHIN of the best,
+# the top results are close together: the caller searches deeper and may keep up to
+# DEPTH_MAX articles. RETRIEVAL_DEPTH=fixed keeps the RERANK_TOP_N cut.
+
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "6"))
+RERANK_LEXICAL_WEIGHT = float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.35"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_BATCH_SIZE = 16
+
+RETRIEVAL_DEPTH = os.getenv("RETRIEVAL_DEPTH", "adaptive")
+DEPTH_MIN = int(os.getenv("DEPTH_MIN", "2"))
+DEPTH_MAX = int(os.getenv("DEPTH_MAX", str(2 * RERANK_TOP_N)))
+DEPTH_THRESHOLD = float(os.getenv("DEPTH_THRESHOLD", "0.2"))
+DEPTH_GAP = float(os.getenv("DEPTH_GAP", "0.15"))
+DEPTH_EXPAND_WITHIN = float(os.getenv("DEPTH_EXPAND_WITHIN", "0.1"))
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _cross_encoder():
+    global _model
+    with _model_lock:
+        if _model is False:
+            raise ImportError("sentence-transformers is not installed")
+        if _model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                _model = False
+                logger.warning("sentence-transformers is not installed; using the lexical reranker")
+                raise
+            _model = CrossEncoder(RERANK_MODEL, max_length=512)
+        return _model
+
+
+def _article_text(obj):
+    return f"{obj.properties.get('article_title', '')} {obj.properties.get('text', '')}"
+
+
+def _normalized(scores):
+    low, high = scores.min(), scores.max()
+    if high - low < 1e-9:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+# Per candidate, the cosine similarity to the question (NaN when not measured) and the
+# semantic ranking score. Cosines come from the local index rows when available, else
+# from the returned distance (near_vector) or vector (remote hybrid). Candidates without
+# one fall back to the fused score (remote hybrid without vectors), else to a
+# reciprocal-rank prior from the retrieval order. Each source is min-max normalized over
+# its own candidates before they share the ranking scale.
+def _semantic_scores(articles, vector):
+    cosine = np.full(len(articles), np.nan, dtype=np.float32)
+    fused = np.full(len(articles), np.nan, dtype=np.float32)
+    query = None if vector is None else np.asarray(vector, dtype=np.float32)
+    if query is not None:
+        query = query / (np.linalg.norm(query) or 1.0)
+    for i, obj in enumerate(articles):
+        metadata = getattr(obj, "metadata", None)
+        distance = getattr(metadata, "distance", None)
+        score = getattr(metadata, "score", None)
+        row = default_vector(obj) if query is not None and getattr(obj, "vector", None) else None
+        if distance is not None:
+            cosine[i] = 1.0 - distance
+        elif row is not None and len(row) == len(query):
+            row = np.asarray(row, dtype=np.float32)
+            cosine[i] = row @ query / (np.linalg.norm(row) or 1.0)
+        elif score is not None:
+            fused[i] = score
+
+    local_index = get_local_index()
+    if query is not None and local_index is not None and query.shape == (local_index.dim,):
+        found = [(i, local_index.position(obj.uuid)) for i, obj in enumerate(articles)]
+        found = [(i, p) for i, p in found if p is not None]
+        if found:
+            rows, positions = zip(*found)
+            order = np.argsort(positions)  # sequential reads from the memory map
+            matrix = np.asarray(local_index.vectors[np.asarray(positions)[order]])
+            cosine[np.asarray(rows)[order]] = matrix @ query
+
+    ranking = np.zeros(len(articles), dtype=np.float32)
+    measured = ~np.isnan(cosine)
+    by_fused = ~measured & ~np.isnan(fused)
+    by_rank = ~measured & ~by_fused
+    prior = np.array([1.0 / (1 + rank) for rank in range(len(articles))], dtype=np.float32)
+    for mask, values in ((measured, cosine), (by_fused, fused), (by_rank, prior)):
+        if mask.any():
+            ranking[mask] = _normalized(values[mask])
+    return cosine, ranking
+
+
+# Share of the question's terms found in each article, weighted by rarity among the candidates
+def _lexical_scores(query, articles):
+    terms = sorted(set(canonical_key(query).split()))
+    if not terms:
+        return np.zeros(len(articles), dtype=np.float32)
+    column = {term: j for j, term in enumerate(terms)}
+    present = np.zeros((len(articles), len(terms)), dtype=np.float32)
+    for i, obj in enumerate(articles):
+        for token in set(canonical_key(_article_text(obj)).split()):
+            j = column.get(token)
+            if j is not None:
+                present[i, j] = 1.0
+    df = present.sum(axis=0)
+    idf = np.log1p(len(articles) / (1.0 + df))
+    return present @ idf / (idf.sum() or 1.0)
+
+
+# Ranks on the blend of the normalized scores; the raw blend (cosine and lexical share as
+# they are) is what the adaptive cut reads, NaN where no cosine was measured
+def _lexical_rerank(query, articles, vector):
+    cosine, semantic = _semantic_scores(articles, vector)
+    lexical = _lexical_scores(query, articles)
+    blend = (1 - RERANK_LEXICAL_WEIGHT) * semantic + RERANK_LEXICAL_WEIGHT * _normalized(lexical)
+    return blend, (1 - RERANK_LEXICAL_WEIGHT) * cosine + RERANK_LEXICAL_WEIGHT * lexical
+
+
+def _cross_encoder_rerank(query, articles):
+    pairs = [(query, _article_text(obj)) for obj in articles]
+    logits = np.asarray(_cross_encoder().predict(pairs, batch_size=RERANK_BATCH_SIZE), dtype=np.float32)
+    return logits, 1.0 / (1.0 + np.exp(-logits))
+
+
+# Ranking scores plus the raw relevance the adaptive cut reads (NaN: not measured, e.g.
+# a rank prior, so no depth is read from it)
+def _scores(query, articles, vector, method):
+    if method == "cross-encoder":
+        try:
+            return _cross_encoder_rerank(query, articles)
+        except ImportError:
+            pass
+    return _lexical_rerank(query, articles, vector)
+
+
+def _pinned(query, articles):
+    cited = set(cited_article_numbers(query))
+    return np.array([bool(cited) and str(obj.properties.get("article_number", "")) in cited for obj in articles])
+
+
+# ▶️ Reorder `articles` for `query` and keep the best `top_n`
+def rerank(query, articles, vector=None, top_n=RERANK_TOP_N, method=RERANKER):
+    if method == "none" or len(articles) <= 1:
+        return articles
+
+    with stage("rerank"):
+        scores = _scores(query, articles, vector, method)[0]
+        pinned = _pinned(query, articles)
+        scores = np.where(pinned, scores.max() + 1 + scores, scores)
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        return [articles[i] for i in order]
+
+
+# 📐 How many of the ranked candidates to keep; `relevance` holds their raw scores,
+# best-first by rank (NaN never cuts). Returns (depth, reason, expand).
+def choose_depth(relevance, max_depth):
+    limit = min(max_depth, len(relevance))
+    best = np.nan
+    for i in range(limit):
+        if i >= max(1, DEPTH_MIN):
+            if relevance[i] < DEPTH_THRESHOLD:
+                return i, "threshold", False
+            if best - relevance[i] >= DEPTH_GAP:
+                return i, "gap", False
+        best = np.fmax(best, relevance[i])
+    return limit, "max", limit > 0 and best - relevance[limit - 1] <= DEPTH_EXPAND_WITHIN
+
+
+# ▶️ Like rerank() with an adaptive cut; returns (articles, expand). Cited articles are
+# kept on top and count towards max_depth; a question that cites articles is never
+# expanded. When no candidate has a raw score (e.g. only the rank prior), the cut falls
+# back to max_depth ("fixed"). The number of articles kept is observed as
+# "rerank_depth.<reason>" (metrics.value_snapshot()).
+def rerank_adaptive(query, articles, vector=None, max_depth=RERANK_TOP_N, method=RERANKER):
+    if method == "none" or len(articles) <= 1:
+        return articles[:max_depth], False
+
+    with stage("rerank"):
+        scores, raw = _scores(query, articles, vector, method)
+        pinned = _pinned(query, articles)
+        order = np.argsort(-scores, kind="stable")
+        cited, free = order[pinned[order]], order[~pinned[order]]
+        if np.isnan(raw[free]).all():
+            depth, reason, expand = min(len(free), max(0, max_depth - len(cited))), "fixed", False
+        else:
+            depth, reason, expand = choose_depth(raw[free], max(0, max_depth - len(cited)))
+            expand = expand and not len(cited)
+        kept = [articles[i] for i in cited[:max_depth]] + [articles[i] for i in free[:depth]]
+
+    observe(f"rerank_depth.{reason}", len(kept))
+    logger.debug("depth %d of %d candidates (%s%s)", len(kept), len(articles), reason, ", expand" if expand else "")
+    return kept, expand
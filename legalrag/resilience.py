@@ -0,0 +1,314 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from .metrics import record
+
+# 🛡️ Resilient upstream calls (OpenAI embeddings / chat, Weaviate search).
+# Every call gets a per-stage deadline, transient failures (timeouts, connection errors,
+# 408/409/429/5xx, gRPC UNAVAILABLE) are retried with full-jitter backoff that honours
+# Retry-After, and idempotent reads (embed, search) send a hedged duplicate when the first
+# attempt is slower than HEDGE_*_AFTER; whichever answers first wins. Hedges are capped at
+# HEDGE_BUDGET of an upstream's attempts, so an upstream that is slow across the board is
+# not handed twice the load. A circuit breaker per upstream opens after BREAKER_FAILURES
+# consecutive transient failures and rejects calls for BREAKER_COOLDOWN seconds, then
+# lets one probe through.
+#
+# Giving up raises UpstreamError. The engines degrade on it: a failed rephrase falls back
+# to the raw question, and a failed generation returns DEGRADED_ANSWER next to the
+# retrieved articles (cached answers are still served, they are looked up first).
+#
+# `fn(timeout)` receives the seconds left before the deadline; OpenAI calls pass it on
+# together with max_retries=0 (retrying is done here). Hedged calls, and those of a
+# `pooled` upstream, run on a small thread pool so the deadline holds even for clients
+# without a per-call timeout (sync Weaviate): the caller stops waiting at the deadline,
+# while the abandoned attempt finishes in the background.
+#
+#   UPSTREAM_RETRIES=2            extra attempts after the first
+#   EMBED_DEADLINE / SEARCH_DEADLINE / CHAT_DEADLINE (seconds; chat: until the stream opens)
+#   SCAN_DEADLINE (seconds) for whole-collection passes, which share the search breaker
+#   HEDGE_EMBED_AFTER / HEDGE_SEARCH_AFTER (seconds, 0 → no hedging), HEDGE_BUDGET=0.1
+#
+# Samples: "retry.<upstream>" (backoff), "hedge.<upstream>" (cache hit = the hedge won),
+# "breaker.<upstream>" (rejected while open), "degraded.<stage>".
+
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.25"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "4"))
+EMBED_DEADLINE = float(os.getenv("EMBED_DEADLINE", "10"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "10"))
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "60"))
+SCAN_DEADLINE = float(os.getenv("SCAN_DEADLINE", "300"))
+HEDGE_EMBED_AFTER = float(os.getenv("HEDGE_EMBED_AFTER", "1.0"))
+HEDGE_SEARCH_AFTER = float(os.getenv("HEDGE_SEARCH_AFTER", "0.5"))
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+DEGRADED_ANSWER = (
+    "⚠️ تعذّر توليد الإجابة حالياً بسبب ضغط على خدمة الذكاء الاصطناعي. "
+    "هذه هي المواد القانونية الأقرب لسؤالك، يرجى مراجعتها أو إعادة المحاولة بعد قليل."
+)
+
+_TRANSIENT_ERRORS = {
+    "APITimeoutError", "APIConnectionError",
+    "WeaviateTimeoutError", "WeaviateConnectionError", "WeaviateGRPCUnavailableError",
+}
+_TRANSIENT_GRPC = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED")
+
+# Shared by every session; hedged attempts and deadline-bound Weaviate calls run here
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("UPSTREAM_WORKERS", "32")), thread_name_prefix="upstream")
+
+
+class UpstreamError(Exception):
+    def __init__(self, upstream, message="gave up"):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpen(UpstreamError):
+    def __init__(self, upstream):
+        super().__init__(upstream, "circuit open")
+
+
+class DeadlineExceeded(UpstreamError, TimeoutError):
+    def __init__(self, upstream):
+        super().__init__(upstream, "deadline exceeded")
+
+
+def is_degraded(answer):
+    return answer == DEGRADED_ANSWER
+
+
+def is_transient(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False  # a 429 that no amount of waiting fixes
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    name = type(error).__name__
+    if name in _TRANSIENT_ERRORS:
+        return True
+    return name == "WeaviateQueryError" and any(code in str(error) for code in _TRANSIENT_GRPC)
+
+
+# ⏳ Server-requested wait (Retry-After / retry-after-ms), if any
+def retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def backoff(attempt, error=None):
+    wait_for = retry_after(error) if error is not None else None
+    if wait_for is not None:
+        return min(wait_for, RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._count = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._probing else "open"
+
+    # Closed → always; open → nothing until the cooldown ends, then a single probe
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._count = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            self._probing = False
+            if self._count >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class Upstream:
+    def __init__(self, name, deadline, hedge_after=0.0, retries=UPSTREAM_RETRIES, breaker=None, pooled=False):
+        self.name = name
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.pooled = pooled
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedges = 0
+
+    def _started(self):
+        with self._lock:
+            self._calls += 1
+
+    # True when one more hedge stays within HEDGE_BUDGET of the attempts so far
+    def _may_hedge(self):
+        with self._lock:
+            if self._hedges >= HEDGE_BUDGET * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def _admit(self):
+        if not self.breaker.allow():
+            record(f"breaker.{self.name}", 0.0)
+            raise CircuitOpen(self.name)
+
+    # Returns the backoff before the next attempt, or raises when it is time to give up
+    def _failed(self, error, attempt, deadline):
+        if not is_transient(error):
+            self.breaker.success()  # the upstream answered; the request itself is wrong
+            raise error
+        self.breaker.failure()
+        if isinstance(error, UpstreamError):
+            raise error
+        delay = backoff(attempt, error)
+        if attempt >= self.retries or time.monotonic() + delay >= deadline:
+            raise UpstreamError(self.name, f"{type(error).__name__}: {error}") from error
+        record(f"retry.{self.name}", delay)
+        return delay
+
+    # 🧵 Blocking flavour: Streamlit sessions and batch workers
+    def call(self, fn):
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            self._admit()
+            try:
+                result = self._attempt(fn, deadline)
+            except Exception as e:
+                time.sleep(self._failed(e, attempt, deadline))
+                continue
+            self.breaker.success()
+            return result
+
+    def _attempt(self, fn, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.name)
+        self._started()
+        if not self.hedge_after and not self.pooled:
+            return fn(remaining)
+        if not self.hedge_after:
+            try:
+                return _pool.submit(fn, remaining).result(timeout=remaining)
+            except FuturesTimeout:
+                raise DeadlineExceeded(self.name)
+
+        started = time.monotonic()
+        pending = {_pool.submit(fn, remaining)}
+        hedge = None
+        hedging = True  # until the hedge is sent (or refused by the budget)
+        error = None
+        while pending:
+            timeout = deadline - time.monotonic()
+            if hedging:
+                timeout = min(timeout, started + self.hedge_after - time.monotonic())
+            done, pending = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if hedge is not None:
+                        record(f"hedge.{self.name}", time.monotonic() - started, cache_hit=future is hedge)
+                    return future.result()
+                error = future.exception()
+            if time.monotonic() >= deadline:
+                raise DeadlineExceeded(self.name)
+            if hedging and pending:
+                hedging = False
+                if self._may_hedge():
+                    hedge = _pool.submit(fn, deadline - time.monotonic())
+                    pending.add(hedge)
+        raise error
+
+    # ⚡ asyncio flavour: `fn(timeout)` returns an awaitable; losing / late attempts are cancelled
+    async def acall(self, fn):
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            self._admit()
+            try:
+                result = await self._aattempt(fn, deadline)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._failed(e, attempt, deadline))
+                continue
+            self.breaker.success()
+            return result
+
+    async def _aattempt(self, fn, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.name)
+        self._started()
+
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(fn(remaining))}
+        hedge = None
+        hedging = bool(self.hedge_after)
+        error = None
+        try:
+            while pending:
+                timeout = deadline - time.monotonic()
+                if hedging:
+                    timeout = min(timeout, started + self.hedge_after - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedge is not None:
+                            record(f"hedge.{self.name}", time.monotonic() - started, cache_hit=task is hedge)
+                        return task.result()
+                    error = task.exception()
+                if time.monotonic() >= deadline:
+                    raise DeadlineExceeded(self.name)
+                if hedging and pending:
+                    hedging = False
+                    if self._may_hedge():
+                        hedge = asyncio.ensure_future(fn(deadline - time.monotonic()))
+                        pending.add(hedge)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# 🔌 One policy (and breaker) per upstream, shared by both engines in the process
+EMBED = Upstream("embed", EMBED_DEADLINE, hedge_after=HEDGE_EMBED_AFTER)
+SEARCH = Upstream("search", SEARCH_DEADLINE, hedge_after=HEDGE_SEARCH_AFTER)
+REPHRASE = Upstream("rephrase", float(os.getenv("REPHRASE_TIMEOUT", "4")), retries=1)
+CHAT = Upstream("chat", CHAT_DEADLINE)
+# Whole-collection passes (adjacency.py) hit the same Weaviate, but are never hedged:
+# a duplicate would be a second full scan. The sync iterator takes no deadline → pooled.
+SCAN = Upstream("scan", SCAN_DEADLINE, breaker=SEARCH.breaker, pooled=True)
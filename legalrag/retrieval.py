@@ -0,0 +1,247 @@
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .arabic_normalize import fold_arabic
+from .local_index import METADATA_TITLE, PROPERTIES, get_local_index
+from .metrics import stage
+from .resilience import SEARCH
+
+# 🔍 Shared LawArticle retrieval.
+# "LAW METADATA" chunks and optional law_title restrictions are pushed into the
+# Weaviate query as filters, and only the properties we render are returned, so
+# nothing is transferred just to be thrown away.
+#
+# RETRIEVAL_MODE=hybrid (default) fuses BM25 keyword and vector rankings with
+# reciprocal-rank fusion, and answers explicit article citations ("المادة 8") with a
+# direct article_number lookup ranked ahead of the fused results. The remote BM25 leg
+# gets the question folded but not normalized (fold_arabic): Weaviate tokenizes the
+# article text as stored, so a normalized "المدنيه" would match nothing.
+
+COLLECTION = "LawArticle"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+RRF_K = 60
+EXACT_MATCHES_PER_CITATION = 3  # same article number can exist in several laws
+REPHRASE_TIMEOUT = float(os.getenv("REPHRASE_TIMEOUT", "4"))
+
+# Shared by every session; lives as long as the process (Streamlit reruns do not re-import it)
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RETRIEVAL_WORKERS", "8")), thread_name_prefix="retrieval")
+
+# Matches المادة / مادة / للمادة ... before or after normalization (ة → ه), any digit script
+ARTICLE_REF_RE = re.compile(r"ماد[ةه]\s*[(\[]?\s*(\d+)")
+
+
+def article_filter(law_titles=None, article_numbers=None):
+    from weaviate.classes.query import Filter
+
+    filters = Filter.by_property("article_title").not_equal(METADATA_TITLE)
+    if law_titles:
+        filters = filters & Filter.by_property("law_title").contains_any(list(law_titles))
+    if article_numbers:
+        filters = filters & Filter.by_property("article_number").contains_any(list(article_numbers))
+    return filters
+
+
+def cited_article_numbers(query):
+    return list(dict.fromkeys(str(int(n)) for n in ARTICLE_REF_RE.findall(query)))
+
+
+def is_article(obj):
+    return obj.properties.get("article_title") != METADATA_TITLE
+
+
+# 🔗 Reciprocal-rank fusion of several ranked result lists
+def reciprocal_rank_fusion(result_lists, limit, k=RRF_K):
+    scores = {}
+    objects = {}
+    for results in result_lists:
+        for rank, obj in enumerate(results):
+            key = str(obj.uuid)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            objects.setdefault(key, obj)
+    return [objects[key] for key in sorted(scores, key=scores.get, reverse=True)[:limit]]
+
+
+# Distances (near_vector) and, for hybrid hits, which carry no distance, the vectors feed
+# the reranker's cosine and its adaptive depth cut; the fused score is only a fallback
+def distance_metadata():
+    from weaviate.classes.query import MetadataQuery
+
+    return MetadataQuery(distance=True)
+
+
+def score_metadata():
+    from weaviate.classes.query import MetadataQuery
+
+    return MetadataQuery(score=True)
+
+
+# 🧩 Retrieval plans: the search rules are written once for both engines. A plan is a
+# generator that yields the work it needs, ("search", method, kwargs) for a LawArticle
+# collection query and ("compute", fn, args) for CPU work, and is sent each result back.
+# run_plan() carries it out on the sync client; arun_plan() awaits the async client and
+# moves compute steps to a worker thread.
+def run_plan(client, plan):
+    collection = None
+    result = None
+    try:
+        while True:
+            kind, fn, args = plan.send(result)
+            if kind == "search":
+                collection = collection or client.collections.get(COLLECTION)
+                result = SEARCH.call(_query(collection, fn, args))
+            else:
+                result = fn(*args)
+    except StopIteration as done:
+        return done.value
+
+
+async def arun_plan(client, plan, slots):
+    collection = None
+    result = None
+    try:
+        while True:
+            kind, fn, args = plan.send(result)
+            if kind == "search":
+                collection = collection or client.collections.get(COLLECTION)
+                async with slots:
+                    result = await SEARCH.acall(_query(collection, fn, args))
+            else:
+                # e.g. a cross-encoder rerank, which can take tens of ms
+                result = await asyncio.to_thread(fn, *args)
+    except StopIteration as done:
+        return done.value
+
+
+# Binds one query for resilience.py, which may issue it more than once (retries, hedges)
+def _query(collection, method, kwargs):
+    query = getattr(collection.query, method)
+    return lambda timeout: query(**kwargs)
+
+
+# 📄 Remote near-vector search returning up to `limit` real articles, paging to top up
+def near_vector_plan(vector, limit=10, law_titles=None, article_numbers=None):
+    filters = article_filter(law_titles, article_numbers)
+    articles = []
+    offset = 0
+    while len(articles) < limit:
+        wanted = limit - len(articles)
+        results = yield ("search", "near_vector", dict(
+            near_vector=vector,
+            limit=wanted,
+            offset=offset,
+            filters=filters,
+            return_properties=PROPERTIES,
+            return_metadata=distance_metadata(),
+        ))
+        page = results.objects
+        offset += len(page)
+        articles.extend(obj for obj in page if is_article(obj))
+        if len(page) < wanted:
+            break  # collection exhausted
+    return articles
+
+
+# ⚡ Local mirror first (when synced), Weaviate otherwise
+def search_plan(vector, limit=10, law_titles=None, article_numbers=None):
+    local_index = get_local_index()
+    if local_index is not None:
+        articles = local_index.search(vector, limit, law_titles=law_titles, article_numbers=article_numbers)
+        if articles:
+            return articles
+    return (yield from near_vector_plan(vector, limit, law_titles, article_numbers))
+
+
+# BM25 + vector fusion over the local mirror; None when it cannot serve the query
+def local_hybrid_search(query, vector, limit=10, law_titles=None):
+    local_index = get_local_index()
+    if local_index is None:
+        return None
+    semantic = local_index.search(vector, limit, law_titles=law_titles)
+    if not semantic:
+        return None
+    keyword = local_index.keyword_search(query, limit, law_titles=law_titles)
+    return reciprocal_rank_fusion([semantic, keyword], limit)
+
+
+def hybrid_query_kwargs(query, vector, limit, law_titles=None, alpha=HYBRID_ALPHA):
+    from weaviate.classes.query import HybridFusion
+
+    return dict(
+        query=fold_arabic(query),
+        vector=vector,
+        alpha=alpha,
+        fusion_type=HybridFusion.RANKED,
+        limit=limit,
+        filters=article_filter(law_titles),
+        return_properties=PROPERTIES,
+        return_metadata=score_metadata(),
+        include_vector=True,
+    )
+
+
+# 🔀 BM25 + vector search with RRF and an exact-article fast path: citation matches
+# first, then the fused ranking without duplicates
+def hybrid_plan(query, vector, limit=10, law_titles=None, alpha=HYBRID_ALPHA):
+    numbers = cited_article_numbers(query)
+    exact = []
+    if numbers:
+        exact_limit = min(limit, EXACT_MATCHES_PER_CITATION * len(numbers))
+        exact = yield from search_plan(vector, exact_limit, law_titles, numbers)
+
+    fused = local_hybrid_search(query, vector, limit, law_titles)
+    if fused is None:
+        results = yield ("search", "hybrid", hybrid_query_kwargs(query, vector, limit, law_titles, alpha))
+        fused = [obj for obj in results.objects if is_article(obj)]
+
+    seen = {str(obj.uuid) for obj in exact}
+    return (exact + [obj for obj in fused if str(obj.uuid) not in seen])[:limit]
+
+
+def retrieve_plan(query, vector, limit=10, law_titles=None, mode=RETRIEVAL_MODE):
+    with stage("search"):
+        if mode == "hybrid":
+            return (yield from hybrid_plan(query, vector, limit, law_titles))
+        return (yield from search_plan(vector, limit, law_titles))
+
+
+def retrieve(client, query, vector, limit=10, law_titles=None, mode=RETRIEVAL_MODE):
+    return run_plan(client, retrieve_plan(query, vector, limit, law_titles, mode))
+
+
+# Candidates found again by a wider search are appended after the ones already held
+def widen(articles, more):
+    known = {str(obj.uuid) for obj in articles}
+    return articles + [obj for obj in more if str(obj.uuid) not in known]
+
+
+# ⏩ Rephrase and raw-question retrieval run concurrently; results are merged with RRF.
+# If rephrasing fails or misses its deadline, the raw-question results are returned as is.
+def retrieve_with_rephrase(client, query, embed_fn, rephrase_fn, limit=10, law_titles=None, mode=RETRIEVAL_MODE,
+                           timeout=REPHRASE_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    rephrased = _executor.submit(rephrase_fn, query)
+    raw_articles = retrieve(client, query, embed_fn(query), limit, law_titles, mode)
+
+    try:
+        improved = rephrased.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception:
+        return raw_articles
+    if not worth_searching(query, improved):
+        return raw_articles
+
+    improved_articles = retrieve(client, improved, embed_fn(improved), limit, law_titles, mode)
+    return merge_rephrased(raw_articles, improved_articles, limit)
+
+
+# A rephrasing only earns a second search when it says something else
+def worth_searching(query, improved):
+    return bool(improved) and improved != query
+
+
+# The rephrased (precise legal wording) ranking leads the raw-question one
+def merge_rephrased(raw_articles, improved_articles, limit):
+    return reciprocal_rank_fusion([improved_articles, raw_articles], limit)
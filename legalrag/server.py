@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from .arabic_normalize import normalize_arabic
+from .async_pipeline import AsyncRagEngine, Upstreams
+from .metrics import render_prometheus, stage
+from .pipeline import VARIANTS, Settings
+from .resilience import BREAKER_COOLDOWN, CircuitOpen, UpstreamError
+from .warmup import log_question, warm_up_async, warmup_status
+
+# 🌐 Async HTTP JSON API over the legal QA pipeline.
+#
+#   POST /v1/ask          {"question", "variant"?, "law_titles"?}   → {"answer", "cached", "articles"}
+#   POST /v1/retrieve     {"question", "variant"?, "law_titles"?, "limit"?} → {"articles"}
+#   POST /v1/ask/stream   same body as /v1/ask → text/event-stream:
+#                         event: articles → event: delta (repeated) → event: done
+#   GET  /healthz (questions in flight / queued, warm-up progress), GET /metrics (Prometheus text)
+#
+#   python -m legalrag.server --port 8000
+#
+# Backpressure: at most SERVER_MAX_IN_FLIGHT questions run at once; up to
+# SERVER_MAX_QUEUED more wait up to SERVER_QUEUE_TIMEOUT seconds for a slot, and
+# anything beyond that is rejected immediately with 503 + Retry-After.
+# A search / embedding upstream that gives up (resilience.py) is also a 503; a failed
+# generation is not an error, the answer degrades to the retrieval-only notice.
+#
+# Asked questions go to the query log, and on startup the most asked ones are warmed in
+# the background (warmup.py) while the server already accepts requests.
+
+MAX_IN_FLIGHT = int(os.getenv("SERVER_MAX_IN_FLIGHT", "64"))
+MAX_QUEUED = int(os.getenv("SERVER_MAX_QUEUED", "256"))
+QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "10"))
+MAX_QUESTION_CHARS = 2000
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+# 🚦 Admission control in front of the pipeline
+class Admission:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queued=MAX_QUEUED, timeout=QUEUE_TIMEOUT):
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.queued = 0
+        self.in_flight = 0
+
+    async def acquire(self):
+        if self._slots.locked() and self.queued >= self.max_queued:
+            raise Overloaded()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+
+# 🌊 A stream that holds an admission slot: released once the response is over, whether it
+# was streamed to the end, the client went away mid-stream, or sending the headers already
+# failed and the body was never iterated
+class AdmittedStream(StreamingResponse):
+    def __init__(self, admission, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.admission.release()
+
+
+def article_json(obj):
+    distance = getattr(obj.metadata, "distance", None) if getattr(obj, "metadata", None) else None
+    return {
+        "uuid": str(obj.uuid),
+        "law_title": obj.properties.get("law_title"),
+        "article_number": obj.properties.get("article_number"),
+        "article_title": obj.properties.get("article_title"),
+        "text": obj.properties.get("text"),
+        "distance": distance,
+    }
+
+
+async def _parse(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("body must be a JSON object")
+    question = body.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise BadRequest("'question' is required")
+    if len(question) > MAX_QUESTION_CHARS:
+        raise BadRequest(f"'question' is longer than {MAX_QUESTION_CHARS} characters")
+    variant = body.get("variant", "app")
+    if variant not in VARIANTS:
+        raise BadRequest(f"unknown variant {variant!r}")
+    law_titles = body.get("law_titles") or None
+    if law_titles is not None and not (isinstance(law_titles, list) and all(isinstance(t, str) for t in law_titles)):
+        raise BadRequest("'law_titles' must be a list of strings")
+    limit = body.get("limit")
+    if limit is not None and not (isinstance(limit, int) and 0 < limit <= 50):
+        raise BadRequest("'limit' must be an integer between 1 and 50")
+    engine = request.app.state.engines[variant]
+    return engine, question.strip(), law_titles, limit
+
+
+def _error(status, message, headers=None):
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+def _overloaded():
+    return _error(503, "server busy, retry later", {"Retry-After": "1"})
+
+
+def _unavailable(error):
+    retry_after = int(BREAKER_COOLDOWN) if isinstance(error, CircuitOpen) else 1
+    return _error(503, f"upstream unavailable ({error}), retry later", {"Retry-After": str(retry_after)})
+
+
+async def ask(request):
+    try:
+        engine, question, law_titles, _ = await _parse(request)
+        await request.app.state.admission.acquire()
+    except BadRequest as e:
+        return _error(400, str(e))
+    except Overloaded:
+        return _overloaded()
+    try:
+        with stage("api.ask"):
+            log_question(engine.variant.name, question)
+            normalized_question = normalize_arabic(question)
+            articles = await engine.retrieve_articles(question, law_titles=law_titles)
+            if not articles:
+                return JSONResponse({"answer": None, "cached": False, "articles": []})
+            answer = await engine.cached_answer(normalized_question, articles)
+            cached = answer is not None
+            if not cached:
+                answer = await engine.generate_answer(question, articles)
+                await engine.remember_answer(normalized_question, articles, answer)
+        return JSONResponse({"answer": answer, "cached": cached, "articles": [article_json(a) for a in articles]})
+    except UpstreamError as e:
+        return _unavailable(e)
+    finally:
+        request.app.state.admission.release()
+
+
+async def retrieve(request):
+    try:
+        engine, question, law_titles, limit = await _parse(request)
+        await request.app.state.admission.acquire()
+    except BadRequest as e:
+        return _error(400, str(e))
+    except Overloaded:
+        return _overloaded()
+    try:
+        with stage("api.retrieve"):
+            articles = await engine.retrieve_articles(question, limit=limit, law_titles=law_titles)
+        return JSONResponse({"articles": [article_json(a) for a in articles]})
+    except UpstreamError as e:
+        return _unavailable(e)
+    finally:
+        request.app.state.admission.release()
+
+
+def _event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def ask_stream(request):
+    try:
+        engine, question, law_titles, _ = await _parse(request)
+        await request.app.state.admission.acquire()
+    except BadRequest as e:
+        return _error(400, str(e))
+    except Overloaded:
+        return _overloaded()
+
+    async def events():
+        try:
+            log_question(engine.variant.name, question)
+            normalized_question = normalize_arabic(question)
+            articles = await engine.retrieve_articles(question, law_titles=law_titles)
+            yield _event("articles", [article_json(a) for a in articles])
+            if not articles:
+                yield _event("done", {"cached": False})
+                return
+            answer = await engine.cached_answer(normalized_question, articles)
+            if answer is not None:
+                yield _event("delta", {"text": answer})
+                yield _event("done", {"cached": True})
+                return
+            parts = []
+            async for delta in engine.stream_answer(question, articles):
+                if delta:
+                    parts.append(delta)
+                    yield _event("delta", {"text": delta})
+            await engine.remember_answer(normalized_question, articles, "".join(parts).strip())
+            yield _event("done", {"cached": False})
+        except Exception as e:
+            yield _event("error", {"error": f"{type(e).__name__}: {e}"})
+
+    return AdmittedStream(request.app.state.admission, events(), media_type="text/event-stream",
+                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def healthz(request):
+    admission = request.app.state.admission
+    return JSONResponse({"ok": True, "in_flight": admission.in_flight, "queued": admission.queued, "warmup": warmup_status()})
+
+
+async def metrics(request):
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def create_app(settings=None):
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        upstreams = Upstreams(settings or Settings.from_env())
+        await upstreams.start()
+        app.state.upstreams = upstreams
+        app.state.engines = {name: AsyncRagEngine(upstreams, name) for name in VARIANTS}
+        app.state.admission = Admission()
+        warming = asyncio.create_task(warm_up_async(app.state.engines.values()))
+        try:
+            yield
+        finally:
+            warming.cancel()
+            await upstreams.close()
+
+    return Starlette(
+        routes=[
+            Route("/v1/ask", ask, methods=["POST"]),
+            Route("/v1/retrieve", retrieve, methods=["POST"]),
+            Route("/v1/ask/stream", ask_stream, methods=["POST"]),
+            Route("/healthz", healthz),
+            Route("/metrics", metrics),
+        ],
+        lifespan=lifespan,
+    )
+
+
+# For `uvicorn legalrag.server:app`; nothing connects until the lifespan starts
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the legal QA pipeline over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
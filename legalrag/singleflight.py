@@ -0,0 +1,212 @@
+import asyncio
+import os
+import threading
+import time
+
+from .metrics import record
+
+# 🛬 Single-flight request coalescing.
+# Identical work that is already in flight (same key: stage, variant, normalized
+# question, ...) is not started again: later callers wait for the first caller's result.
+# Streamed answers are pumped once and fanned out to every subscriber, each of which
+# replays the deltas received so far and then follows live. When every subscriber has
+# gone the upstream stream is closed. A flight is forgotten as soon as it lands, so
+# nothing is cached here; repeated questions after that are the answer cache's job.
+#
+#   SINGLE_FLIGHT=0   → disable (every caller runs its own upstream calls)
+#
+# Each flight records a "singleflight.<stage>" sample; cache hits are joined flights.
+
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") != "0"
+
+
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.chunks = []
+        self.subscribers = 0
+
+
+# 🧵 Thread flavour: Streamlit sessions and batch workers (pipeline.RagEngine)
+class SingleFlight:
+    def __init__(self, enabled=SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            with flight.cond:
+                flight.subscribers += 1
+        return flight, leader
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.done = True
+            flight.cond.notify_all()
+
+    def do(self, key, fn):
+        if not self.enabled:
+            return fn()
+        started = time.perf_counter()
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                self._land(key, flight)
+        else:
+            with flight.cond:
+                flight.cond.wait_for(lambda: flight.done)
+        record(f"singleflight.{key[0]}", time.perf_counter() - started, cache_hit=not leader)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    # 🌊 Shared stream: `factory()` returns the upstream iterator and runs once per flight
+    def stream(self, key, factory):
+        if not self.enabled:
+            return factory()
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(target=self._pump, args=(key, flight, factory), name="singleflight", daemon=True).start()
+        return self._replay(key, flight, leader)
+
+    def _pump(self, key, flight, factory):
+        chunks = None
+        try:
+            chunks = factory()
+            for chunk in chunks:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                    if not flight.subscribers:
+                        break
+        except BaseException as e:
+            flight.error = e
+        finally:
+            if chunks is not None and hasattr(chunks, "close"):
+                chunks.close()
+            self._land(key, flight)
+
+    def _replay(self, key, flight, leader):
+        started = time.perf_counter()
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    flight.cond.wait_for(lambda: flight.done or len(flight.chunks) > position)
+                    chunks = flight.chunks[position:]
+                    done = flight.done
+                position += len(chunks)
+                yield from chunks
+                if done:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            with flight.cond:
+                flight.subscribers -= 1
+            record(f"singleflight.{key[0]}", time.perf_counter() - started, cache_hit=not leader)
+
+
+class _AsyncFlight:
+    def __init__(self):
+        self.changed = asyncio.Event()
+        self.done = False
+        self.error = None
+        self.chunks = []
+        self.subscribers = 0
+        self.task = None
+
+
+# ⚡ asyncio flavour: one instance per event loop (async_pipeline.Upstreams)
+class AsyncSingleFlight:
+    def __init__(self, enabled=SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._tasks = {}
+        self._streams = {}
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an abandoned failure is not logged as unhandled
+
+    # The shared work runs as its own task, so a caller that disconnects does not cancel it for the others
+    async def do(self, key, fn):
+        if not self.enabled:
+            return await fn()
+        started = time.perf_counter()
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._forget(key, t))
+        try:
+            return await asyncio.shield(task)
+        finally:
+            record(f"singleflight.{key[0]}", time.perf_counter() - started, cache_hit=not leader)
+
+    async def stream(self, key, factory):
+        if not self.enabled:
+            async for chunk in factory():
+                yield chunk
+            return
+
+        started = time.perf_counter()
+        flight = self._streams.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._streams[key] = _AsyncFlight()
+            flight.task = asyncio.create_task(self._pump(key, flight, factory))
+        flight.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                if flight.done:
+                    break
+                await flight.changed.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            record(f"singleflight.{key[0]}", time.perf_counter() - started, cache_hit=not leader)
+
+    async def _pump(self, key, flight, factory):
+        chunks = factory()
+        try:
+            async for chunk in chunks:
+                flight.chunks.append(chunk)
+                self._notify(flight)
+                if not flight.subscribers:
+                    break
+        except Exception as e:
+            flight.error = e
+        finally:
+            await chunks.aclose()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.done = True
+            self._notify(flight)
+
+    @staticmethod
+    def _notify(flight):
+        changed, flight.changed = flight.changed, asyncio.Event()
+        changed.set()
@@ -0,0 +1,102 @@
+import streamlit as st
+
+from .arabic_normalize import normalize_arabic
+from .conversation import Conversation
+from .metrics import debug_rows, stage, start_exporters
+from .pipeline import Settings, get_engine
+from .rendering import render_articles, stream_answer
+from .resilience import UpstreamError
+from .warmup import start_warmup
+
+# 🖥️ The Streamlit flow every app script shares: engine + warm-up, the multi-turn toggle,
+# question → articles → answer, and the debug panel. The scripts keep their variant, their
+# texts and their layout. Only the apps import this module (it needs streamlit).
+
+SEARCHING = "🔍 يتم البحث في النصوص القانونية..."
+GENERATING = "🤖 يتم توليد الإجابة..."
+ANSWER_HEADING = "### 🧠 الإجابة"
+NO_ARTICLES = "لم يتم العثور على مواد قانونية مناسبة لهذا السؤال."
+SEARCH_UNAVAILABLE = "⚠️ خدمة البحث غير متاحة حالياً، يرجى إعادة المحاولة بعد قليل."
+
+
+# ✅ Shared pipeline engine of `variant`; clients connect lazily on the first question.
+# 🔥 Once per process the most asked questions (and the placeholder) are pre-run in the background.
+def start_app(variant, placeholder_question):
+    engine = get_engine(variant, Settings.from_secrets(st.secrets))
+    start_exporters()
+    return engine, start_warmup(engine, seeds=[placeholder_question])
+
+
+# 🆕 Drop the session's conversation state and clear the input (runs before the rerun)
+def _new_conversation():
+    st.session_state.conversation = Conversation()
+    st.session_state.query = ""
+
+
+# 💬 Multi-turn mode: follow-ups reuse the session's articles and prompt prefix.
+# Returns the session's Conversation, or None when the toggle is off.
+def conversation_toggle():
+    if not st.toggle("💬 وضع المحادثة (أسئلة متابعة)", key="conversation_mode"):
+        return None
+    conversation = st.session_state.setdefault("conversation", Conversation())
+    st.button("🆕 محادثة جديدة", on_click=_new_conversation)
+    return conversation
+
+
+# ▶️ Answer `question` (as the next turn of `conversation` when given): the RTL answer box
+# above the retrieved articles, served from the answer cache or streamed as it is generated.
+# Returns (answer, articles); answer is None when nothing was retrieved.
+def answer_question(engine, question, conversation=None, searching=SEARCHING, heading=ANSWER_HEADING,
+                    no_articles=NO_ARTICLES, style=None):
+    # 🔤 Normalize spelling variants before embedding / caching
+    normalized_question = normalize_arabic(question)
+    # 🔁 A rerun with the same input replays the last turn instead of asking again
+    turn = conversation.replay(question) if conversation is not None else None
+
+    if turn is not None:
+        articles = turn[1]
+    else:
+        with st.spinner(searching):
+            try:
+                articles = engine.retrieve_turn(conversation, question)
+            except UpstreamError:
+                # 🛡️ Search / embeddings still failing after retries (resilience.py)
+                st.error(SEARCH_UNAVAILABLE)
+                st.stop()
+
+    if not articles:
+        st.error(no_articles)
+        return None, []
+
+    st.markdown(heading, unsafe_allow_html=True)
+    # 🌊 Reserve the RTL answer box above the articles; tokens are streamed into it below
+    answer_box = st.empty()
+
+    with st.expander("📜 عرض المواد القانونية المسترجعة"), stage("render_articles"):
+        # 🧱 Cached per-article HTML, one markdown block for the whole result set
+        st.markdown(render_articles(articles, style or engine.variant.name), unsafe_allow_html=True)
+
+    if turn is not None:
+        return stream_answer(answer_box, [turn[2]]), articles
+
+    # 💾 Near-duplicate questions over the same articles are served from the answer cache
+    answer = engine.cached_turn_answer(conversation, normalized_question, articles)
+    generated = answer is None
+    if answer is not None:
+        stream_answer(answer_box, [answer])
+    else:
+        with st.spinner(GENERATING):
+            answer = stream_answer(answer_box, engine.generate_turn(conversation, question, articles, stream=True))
+    engine.finish_turn(conversation, question, normalized_question, articles, answer, generated)
+    return answer, articles
+
+
+# 🛠️ Hidden debug panel with per-stage latency percentiles (open the app with ?debug=1)
+def debug_panel(warmup):
+    if st.query_params.get("debug") != "1":
+        return
+    with st.expander("🛠️ Pipeline latency"):
+        st.dataframe(debug_rows(), use_container_width=True)
+        status = warmup.status()
+        st.caption(f"🔥 warm-up: {status['done']}/{status['total']} questions, {status['failed']} failed, {status['seconds']}s"
+                   + (" (running)" if status["running"] else ""))
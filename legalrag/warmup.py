@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .arabic_normalize import canonical_key, normalize_arabic
+from .metrics import stage
+
+# 🔥 Warm start after a deploy / restart.
+# Every question asked through the apps or the HTTP API is appended to a small query log
+# (by a background writer, so asking never waits on the disk); the writer compacts it to
+# its last QUERY_LOG_WINDOW lines whenever it has grown to twice that. At startup the most
+# frequent questions of each variant in the log, plus the app's placeholder question, are
+# pre-run on a background pool: embed, search and rerank the question as asked, without
+# rephrasing, so a warm-up makes no chat calls. Clients connect, the local index /
+# reranker / adjacency index load, and the question embeddings land in the embedding
+# cache (also on disk). Retrieval results are not cached anywhere; the searches only warm
+# connections. With WARMUP_GENERATE=1 the answers are pre-generated into the answer cache
+# as well: that is chat spend, and it retrieves as real requests do (rephrasing included)
+# so the cached answers are keyed by the articles those requests will get.
+# Nothing here blocks the first page render; progress is readable via warmup_status().
+#
+#   QUERY_LOG_PATH=.cache/queries.jsonl   ("" → no query log)
+#   WARMUP_QUESTIONS=20                   (0 → no warm-up)
+#   WARMUP_WORKERS=4, WARMUP_GENERATE=0, QUERY_LOG_WINDOW=20000 (lines kept and read)
+#
+# Each warmed question records a "warmup" sample.
+
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", os.path.join(".cache", "queries.jsonl"))
+QUERY_LOG_WINDOW = int(os.getenv("QUERY_LOG_WINDOW", "20000"))
+WARMUP_QUESTIONS = int(os.getenv("WARMUP_QUESTIONS", "20"))
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "4"))
+WARMUP_GENERATE = os.getenv("WARMUP_GENERATE", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+_log_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write_forever(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    lines = _count_lines(path)
+    while True:
+        with open(path, "a", encoding="utf-8") as f:
+            while lines < 2 * QUERY_LOG_WINDOW:
+                f.write(_log_queue.get())
+                lines += 1
+                # Drain whatever else arrived before flushing once
+                while not _log_queue.empty():
+                    f.write(_log_queue.get())
+                    lines += 1
+                f.flush()
+        lines = _compact(path, QUERY_LOG_WINDOW)
+
+
+def _count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+# ✂️ Keep the last `window` lines (all that top_questions() reads), swapped in atomically.
+# With several processes on one log, lines another process appends meanwhile are lost.
+def _compact(path, window):
+    with open(path, encoding="utf-8") as f:
+        lines = deque(f, maxlen=window)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(path + ".tmp", path)
+    return len(lines)
+
+
+# 📝 Append one asked question to the query log (never blocks the caller on I/O)
+def log_question(variant, question):
+    global _writer
+    if not QUERY_LOG_PATH or not question:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_forever, args=(QUERY_LOG_PATH,), name="query-log", daemon=True)
+            _writer.start()
+    entry = {"t": round(time.time()), "variant": variant, "question": question}
+    _log_queue.put(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# 📊 Most frequent questions of `variant` in the last `window` log lines, most asked first
+def top_questions(variant, limit=WARMUP_QUESTIONS, path=None, window=QUERY_LOG_WINDOW):
+    path = QUERY_LOG_PATH if path is None else path
+    if not path or limit <= 0 or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        lines = deque(f, maxlen=window)
+    counts = Counter()
+    spelling = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # torn last line from a killed process
+        if entry.get("variant") != variant or not entry.get("question"):
+            continue
+        key = canonical_key(entry["question"])
+        counts[key] += 1
+        spelling.setdefault(key, entry["question"])
+    return [spelling[key] for key, _ in counts.most_common(limit)]
+
+
+class Warmup:
+    def __init__(self, variant, questions=()):
+        self.variant = variant
+        self.questions = list(questions)
+        self.total = len(self.questions)
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    def status(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return {
+            "variant": self.variant,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "running": self.running,
+            "seconds": round(elapsed, 2),
+        }
+
+
+_warmups = {}
+_warmups_lock = threading.Lock()
+
+
+def _questions(variant, seeds):
+    questions = {}
+    for question in list(seeds) + top_questions(variant):
+        questions.setdefault(canonical_key(question), question)
+    return list(questions.values())[:max(WARMUP_QUESTIONS, len(seeds))]
+
+
+# Without `generate` the question is searched as asked (rephrase=False): no chat call
+def _warm_question(engine, question, generate):
+    with stage("warmup"):
+        normalized_question = normalize_arabic(question)
+        articles = engine.retrieve_articles(question, rephrase=generate)
+        if generate and articles and engine.cached_answer(normalized_question, articles) is None:
+            engine.remember_answer(normalized_question, articles, engine.generate_answer(question, articles))
+
+
+def _run(engine, warmup, seeds, generate, workers):
+    lock = threading.Lock()
+
+    def work(question):
+        try:
+            _warm_question(engine, question, generate)
+            failed = 0
+        except Exception:
+            failed = 1  # warm-up is best effort; the question is simply cold later
+        with lock:
+            warmup.done += 1
+            warmup.failed += failed
+
+    # Reading the log happens here too, so even a large log never delays the caller
+    warmup.questions = _questions(warmup.variant, seeds) if WARMUP_QUESTIONS > 0 else []
+    warmup.total = len(warmup.questions)
+    try:
+        # 🔌 Connect first so the workers do not race to open the shared clients
+        engine.openai
+        engine.weaviate
+    except Exception:
+        pass
+    with ThreadPoolExecutor(workers, thread_name_prefix="warmup") as pool:
+        list(pool.map(work, warmup.questions))
+    warmup.finished = time.monotonic()
+    _report(warmup)
+
+
+def _report(warmup):
+    status = warmup.status()
+    logger.info("warm-up of %s: %d questions in %.1fs (%d failed)", status["variant"], status["total"], status["seconds"], status["failed"])
+
+
+# 🚀 Start warming `engine` in the background, once per process and variant (safe on every rerun)
+def start_warmup(engine, seeds=(), generate=WARMUP_GENERATE, workers=WARMUP_WORKERS):
+    name = engine.variant.name
+    with _warmups_lock:
+        warmup = _warmups.get(name)
+        if warmup is not None:
+            return warmup
+        warmup = _warmups[name] = Warmup(name)
+    threading.Thread(target=_run, args=(engine, warmup, seeds, generate, workers), name=f"warmup-{name}", daemon=True).start()
+    return warmup
+
+
+# ⚡ asyncio flavour for the HTTP API: the same questions warmed as a background task,
+# at most `workers` at a time, on the server's own event loop
+async def warm_up_async(engines, generate=WARMUP_GENERATE, workers=WARMUP_WORKERS):
+    slots = asyncio.Semaphore(workers)
+
+    async def warm(engine, warmup, question):
+        async with slots:
+            try:
+                with stage("warmup"):
+                    normalized_question = normalize_arabic(question)
+                    articles = await engine.retrieve_articles(question, rephrase=generate)
+                    if generate and articles and await engine.cached_answer(normalized_question, articles) is None:
+                        answer = await engine.generate_answer(question, articles)
+                        await engine.remember_answer(normalized_question, articles, answer)
+            except Exception:
+                warmup.failed += 1
+            warmup.done += 1
+
+    warmups = []
+    jobs = []
+    for engine in engines:
+        name = engine.variant.name
+        warmup = Warmup(name, await asyncio.to_thread(top_questions, name))
+        with _warmups_lock:
+            _warmups[f"api:{name}"] = warmup
+        warmups.append(warmup)
+        jobs += [warm(engine, warmup, question) for question in warmup.questions]
+    await asyncio.gather(*jobs)
+    for warmup in warmups:
+        warmup.finished = time.monotonic()
+        _report(warmup)
+
+
+def warmup_status():
+    with _warmups_lock:
+        return {key: warmup.status() for key, warmup in _warmups.items()}